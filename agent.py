@@ -0,0 +1,379 @@
+"""
+Agent loop module for the AI Code Assistant.
+
+This module provides the conversation logic shared by the blocking command-line
+loop in main.py and an asyncio version of the loop that lets one process drive
+many agent sessions at once through a non-blocking ModelClient.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+from google.genai import types
+
+from call_function import ToolCallDispatcher, ToolResultCache, call_functions
+from config import MAX_ITERS
+from history import HistoryManager
+from model_client import ModelClient
+from prompts import system_prompt
+from response_cache import ResponseCacheMiss
+from tool_registry import registry
+from tracing import Span, span
+
+
+def build_config() -> types.GenerateContentConfig:
+    """
+    Build the generation config sent with every model request.
+
+    Returns:
+        A GenerateContentConfig with the registered tools and the system prompt.
+    """
+    return types.GenerateContentConfig(
+        tools=[registry.tool()], system_instruction=system_prompt
+    )
+
+
+def handle_response(
+    response: types.GenerateContentResponse,
+    messages: List[types.Content],
+    verbose: bool,
+    history: Optional[HistoryManager] = None,
+    cache: Optional[ToolResultCache] = None,
+) -> Optional[str]:
+    """
+    Record a model response in the conversation and run the functions it calls.
+
+    Args:
+        response: The model response.
+        messages: The conversation history, extended in place.
+        verbose: Whether to print verbose output.
+        history: The history manager that compacted the request, if any.
+        cache: The session's tool result cache, if any.
+
+    Returns:
+        The generated text response or None if a function call was made.
+
+    Raises:
+        Exception: If there's an error in function call processing.
+    """
+    if verbose:
+        print("Prompt tokens:", response.usage_metadata.prompt_token_count)
+        print("Response tokens:", response.usage_metadata.candidates_token_count)
+    if history:
+        history.record_usage(response.usage_metadata, verbose)
+
+    if response.candidates:
+        for candidate in response.candidates:
+            function_call_content = candidate.content
+            messages.append(function_call_content)
+
+    if not response.function_calls:
+        return response.text
+
+    record_function_responses(call_functions(response.function_calls, verbose, cache), messages, verbose)
+    return None
+
+
+def trace_usage(model_span: Span, usage_metadata: Optional[types.GenerateContentResponseUsageMetadata]) -> None:
+    """
+    Record a model response's token counts on its span.
+
+    Args:
+        model_span: The span of the model request.
+        usage_metadata: The usage metadata of the response, if any.
+    """
+    if usage_metadata:
+        model_span.set(
+            prompt_tokens=usage_metadata.prompt_token_count or 0,
+            response_tokens=usage_metadata.candidates_token_count or 0,
+        )
+
+
+def record_function_responses(
+    function_call_results: Sequence[types.Content], messages: List[types.Content], verbose: bool
+) -> None:
+    """
+    Append the results of a turn's function calls to the conversation.
+
+    Args:
+        function_call_results: The results of call_function, in request order.
+        messages: The conversation history, extended in place.
+        verbose: Whether to print verbose output.
+
+    Raises:
+        Exception: If a function call produced no function response.
+    """
+    function_responses = []
+    for function_call_result in function_call_results:
+        if (
+            not function_call_result.parts
+            or not function_call_result.parts[0].function_response
+        ):
+            raise Exception("empty function call result")
+        if verbose:
+            print(f"-> {function_call_result.parts[0].function_response.response}")
+        function_responses.append(function_call_result.parts[0])
+
+    if not function_responses:
+        raise Exception("no function responses generated, exiting.")
+
+    messages.append(types.Content(role="tool", parts=function_responses))
+
+
+class StreamedResponse:
+    """
+    Accumulate a streamed model response, acting on each part as it arrives.
+
+    Text is printed as soon as it is received, and each function call is handed
+    to a ToolCallDispatcher as soon as its part arrives, so tool I/O overlaps
+    with the rest of the model's generation.
+    """
+
+    def __init__(
+        self,
+        verbose: bool,
+        history: Optional[HistoryManager] = None,
+        cache: Optional[ToolResultCache] = None,
+    ) -> None:
+        """
+        Initialize the accumulator.
+
+        Args:
+            verbose: Whether to print verbose output.
+            history: The history manager that compacted the request, if any.
+            cache: The session's tool result cache, if any.
+        """
+        self.verbose = verbose
+        self.history = history
+        self.parts: List[types.Part] = []
+        self.usage_metadata: Optional[types.GenerateContentResponseUsageMetadata] = None
+        self.dispatcher = ToolCallDispatcher(verbose, cache=cache)
+        self.function_call_count = 0
+
+    def add_chunk(self, chunk: types.GenerateContentResponse) -> None:
+        """
+        Process one chunk of the streamed response.
+
+        Args:
+            chunk: A partial model response.
+        """
+        if chunk.usage_metadata:
+            self.usage_metadata = chunk.usage_metadata
+        if not chunk.candidates or not chunk.candidates[0].content:
+            return
+
+        for part in chunk.candidates[0].content.parts or []:
+            if part.function_call:
+                # Gemini delivers each function call part whole within one chunk
+                self.dispatcher.submit(part.function_call)
+                self.function_call_count += 1
+                self.parts.append(part)
+            elif part.text:
+                print(part.text, end="", flush=True)
+                if self.parts and self.parts[-1].text and not self.parts[-1].thought:
+                    self.parts[-1] = types.Part(text=self.parts[-1].text + part.text)
+                else:
+                    self.parts.append(part)
+
+    def finish(self, messages: List[types.Content]) -> Optional[str]:
+        """
+        Wait for the dispatched function calls and record the turn in the conversation.
+
+        Args:
+            messages: The conversation history, extended in place.
+
+        Returns:
+            The streamed text response or None if a function call was made.
+        """
+        try:
+            text = "".join(part.text for part in self.parts if part.text)
+            if text:
+                print()
+            if self.verbose and self.usage_metadata:
+                print("Prompt tokens:", self.usage_metadata.prompt_token_count)
+                print("Response tokens:", self.usage_metadata.candidates_token_count)
+            if self.history:
+                self.history.record_usage(self.usage_metadata, self.verbose)
+
+            if self.parts:
+                messages.append(types.Content(role="model", parts=self.parts))
+
+            if not self.function_call_count:
+                return text
+
+            record_function_responses(self.dispatcher.results(), messages, self.verbose)
+            return None
+        finally:
+            self.dispatcher.close()
+
+
+async def agenerate_content(
+    client: ModelClient,
+    messages: List[types.Content],
+    verbose: bool,
+    stream: bool = False,
+    history: Optional[HistoryManager] = None,
+    cache: Optional[ToolResultCache] = None,
+) -> Optional[str]:
+    """
+    Generate content without blocking the event loop.
+
+    Function calls run in worker threads so other sessions keep making progress
+    while this one waits on file or subprocess I/O.
+
+    Args:
+        client: The model client.
+        messages: The conversation history.
+        verbose: Whether to print verbose output.
+        stream: Whether to stream the response, printing text and starting
+                function calls as their parts arrive.
+        history: The history manager used to compact the request, if any.
+        cache: The session's tool result cache, if any.
+
+    Returns:
+        The generated text response or None if a function call was made.
+    """
+    contents = history.compact(messages) if history else messages
+    if not stream:
+        with span("generate_content", "model", messages=len(contents)) as model_span:
+            response = await client.generate_content(contents, build_config())
+            trace_usage(model_span, response.usage_metadata)
+        return await asyncio.to_thread(handle_response, response, messages, verbose, history, cache)
+
+    streamed_response = StreamedResponse(verbose, history, cache)
+    try:
+        with span("generate_content_stream", "model", messages=len(contents)) as model_span:
+            async for chunk in client.generate_content_stream(contents, build_config()):
+                streamed_response.add_chunk(chunk)
+            trace_usage(model_span, streamed_response.usage_metadata)
+    except BaseException:
+        streamed_response.dispatcher.close()
+        raise
+    return await asyncio.to_thread(streamed_response.finish, messages)
+
+
+@dataclass
+class SessionResult:
+    """The outcome of one agent session."""
+
+    prompt: str
+    response: Optional[str]
+    iterations: int
+    prompt_tokens: int
+    response_tokens: int
+    wall_time: float
+    error: Optional[str] = None
+
+    @property
+    def completed(self) -> bool:
+        """Whether the session produced a final response within its iteration limit."""
+        return self.response is not None
+
+
+async def run_session_result(
+    client: ModelClient,
+    user_prompt: str,
+    verbose: bool = False,
+    max_iters: int = MAX_ITERS,
+    stream: bool = False,
+) -> SessionResult:
+    """
+    Run one agent session to completion and report what it used.
+
+    Args:
+        client: The model client.
+        user_prompt: The prompt that starts the session.
+        verbose: Whether to print verbose output.
+        max_iters: The maximum number of model requests.
+        stream: Whether to stream model responses.
+
+    Returns:
+        The session's final response, with its iteration count, token usage,
+        wall time and the last error raised by a model request, if any.
+    """
+    messages = [
+        types.Content(role="user", parts=[types.Part(text=user_prompt)]),
+    ]
+    history = HistoryManager()
+    cache = ToolResultCache()
+    start = time.perf_counter()
+    final_response = None
+    error = None
+    iterations = 0
+
+    try:
+        with span("session", "session") as session_span:
+            while iterations < max_iters:
+                iterations += 1
+                try:
+                    with span("iteration", "agent", iteration=iterations):
+                        final_response = await agenerate_content(client, messages, verbose, stream, history, cache)
+                    if final_response:
+                        break
+                except ResponseCacheMiss as e:
+                    # Retrying would send the same unrecorded request again
+                    error = str(e)
+                    print(f"Error in generate_content: {e}")
+                    break
+                except Exception as e:
+                    error = str(e)
+                    print(f"Error in generate_content: {e}")
+            session_span.set(iterations=iterations)
+    finally:
+        if verbose:
+            print(cache.summary())
+
+    return SessionResult(
+        prompt=user_prompt,
+        response=final_response or None,
+        iterations=iterations,
+        prompt_tokens=sum(turn.prompt_tokens for turn in history.turns),
+        response_tokens=sum(turn.response_tokens for turn in history.turns),
+        wall_time=time.perf_counter() - start,
+        error=error,
+    )
+
+
+async def run_session(
+    client: ModelClient,
+    user_prompt: str,
+    verbose: bool = False,
+    max_iters: int = MAX_ITERS,
+    stream: bool = False,
+) -> Optional[str]:
+    """
+    Run one agent session to completion.
+
+    Args:
+        client: The model client.
+        user_prompt: The prompt that starts the session.
+        verbose: Whether to print verbose output.
+        max_iters: The maximum number of model requests.
+        stream: Whether to stream model responses.
+
+    Returns:
+        The final response, or None if the maximum number of iterations was reached.
+    """
+    result = await run_session_result(client, user_prompt, verbose, max_iters, stream)
+    return result.response
+
+
+async def run_sessions(
+    client: ModelClient, user_prompts: Sequence[str], verbose: bool = False
+) -> List[Optional[str]]:
+    """
+    Run several agent sessions concurrently on one model client.
+
+    Args:
+        client: The model client shared by all sessions.
+        user_prompts: The prompt for each session.
+        verbose: Whether to print verbose output.
+
+    Returns:
+        The final response of each session, in prompt order.
+    """
+    return await asyncio.gather(
+        *(run_session(client, user_prompt, verbose) for user_prompt in user_prompts)
+    )
@@ -0,0 +1,142 @@
+"""
+Batch mode module for the AI Code Assistant.
+
+This module runs many prompts as concurrent agent sessions in one process, on one
+shared model client. Prompts are read from JSONL, at most a fixed number of
+sessions run at a time, and each session's result is written as a JSONL record
+as soon as it completes.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, TextIO, Tuple
+
+from agent import SessionResult, run_session_result
+from config import BATCH_CONCURRENCY, MAX_ITERS
+from model_client import ModelClient
+from tracing import trace_session
+
+
+def read_prompts(lines: Iterable[str]) -> Iterator[Tuple[Any, str]]:
+    """
+    Parse batch prompts from JSONL.
+
+    Each non-blank line is either a JSON string, or an object with a "prompt" key
+    and an optional "id" key. Prompts without an id are numbered from 1 by line.
+
+    Args:
+        lines: The lines of the input.
+
+    Yields:
+        A tuple containing (id, prompt) for each prompt, in input order.
+
+    Raises:
+        ValueError: If a line is not valid JSON or has no prompt.
+    """
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {line_number}: invalid JSON: {e}") from e
+
+        if isinstance(record, str):
+            record = {"prompt": record}
+        if not isinstance(record, dict) or not isinstance(record.get("prompt"), str) or not record["prompt"]:
+            raise ValueError(f'line {line_number}: expected a string or an object with a "prompt" string')
+        yield record.get("id", line_number), record["prompt"]
+
+
+def result_record(prompt_id: Any, result: SessionResult) -> Dict[str, Any]:
+    """
+    Build the JSONL record written for one session.
+
+    Args:
+        prompt_id: The prompt's id.
+        result: The session's result.
+
+    Returns:
+        The record as a dictionary.
+    """
+    return {
+        "id": prompt_id,
+        "completed": result.completed,
+        "response": result.response,
+        "iterations": result.iterations,
+        "prompt_tokens": result.prompt_tokens,
+        "response_tokens": result.response_tokens,
+        "wall_time": round(result.wall_time, 3),
+        "error": result.error,
+    }
+
+
+async def run_batch(
+    client: ModelClient,
+    prompts: Iterable[Tuple[Any, str]],
+    output: TextIO,
+    concurrency: int = BATCH_CONCURRENCY,
+    verbose: bool = False,
+    max_iters: int = MAX_ITERS,
+    stream: bool = False,
+) -> Tuple[int, int]:
+    """
+    Run a batch of prompts as concurrent sessions, writing each result as it completes.
+
+    Prompts are pulled from the iterable only when a session slot frees up, so a
+    large input file is never held in memory. Results are written in completion
+    order; the id in each record ties it back to its prompt.
+
+    Args:
+        client: The model client shared by all sessions.
+        prompts: The (id, prompt) pairs to run, for example from read_prompts.
+        output: The stream the JSONL results are written to.
+        concurrency: The maximum number of sessions running at once.
+        verbose: Whether to print verbose output.
+        max_iters: The maximum number of model requests per session.
+        stream: Whether to stream model responses.
+
+    Returns:
+        A tuple containing (sessions_run, sessions_completed).
+
+    Raises:
+        ValueError: If concurrency is less than 1, or the input is invalid.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    pending: Set[asyncio.Task] = set()
+    prompt_iterator = iter(prompts)
+    sessions_run = 0
+    sessions_completed = 0
+
+    async def run_one(prompt_id: Any, prompt: str) -> Tuple[Any, SessionResult]:
+        # Each task runs in its own copy of the context, so this only labels this session's spans
+        trace_session.set(str(prompt_id))
+        return prompt_id, await run_session_result(client, prompt, verbose, max_iters, stream)
+
+    def start_next() -> bool:
+        next_prompt: Optional[Tuple[Any, str]] = next(prompt_iterator, None)
+        if next_prompt is None:
+            return False
+        pending.add(asyncio.create_task(run_one(*next_prompt)))
+        return True
+
+    try:
+        while len(pending) < concurrency and start_next():
+            pass
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                prompt_id, result = task.result()
+                sessions_run += 1
+                sessions_completed += result.completed
+                output.write(json.dumps(result_record(prompt_id, result)) + "\n")
+                output.flush()
+                start_next()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return sessions_run, sessions_completed
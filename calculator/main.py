@@ -2,15 +2,118 @@
 Command-line interface for the Calculator application.
 
 This module provides a simple CLI for evaluating mathematical expressions
-using the Calculator class and rendering the results.
+using the Calculator class and rendering the results, for evaluating one
+expression over the columns of a CSV file, and for evaluating a stream of
+expressions in bulk.
 """
 
+import argparse
 import sys
+import time
+from typing import Optional
 
+from pkg.batch import DEFAULT_CHUNK_SIZE, FORMATS, evaluate_expressions, evaluate_parallel, read_expressions, write_results
 from pkg.calculator import Calculator
+from pkg.lexer import CalculatorSyntaxError
 from pkg.render import render
 
 
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command line parser.
+
+    Returns:
+        The parser for main.py's arguments.
+    """
+    parser = argparse.ArgumentParser(prog="main.py", description="Calculator App")
+    parser.add_argument("expression", nargs="*", help="The expression to evaluate")
+    parser.add_argument("--csv", metavar="FILE", help="Evaluate the expression for every row of FILE, whose header names the variables")
+    parser.add_argument("--batch", metavar="FILE", help="Evaluate each line of FILE (- for stdin) as an expression")
+    parser.add_argument("--format", choices=FORMATS, default="plain", help="With --batch, the output format (default: plain)")
+    parser.add_argument("--workers", type=int, default=0, metavar="N", help="With --batch, evaluate in N worker processes (default: in this process)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, metavar="N", help=f"With --workers, expressions sent to a worker at a time (default: {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument("--output", metavar="FILE", help="With --csv or --batch, write the results to FILE instead of stdout")
+    return parser
+
+
+def evaluate_csv(calculator: Calculator, expression: str, csv_path: str, output_path: Optional[str] = None) -> None:
+    """
+    Evaluate an expression over the columns of a CSV file and report the throughput.
+
+    The results are written one per line, and the throughput to stderr.
+
+    Args:
+        calculator: The calculator that compiles the expression.
+        expression: The expression, whose variables name columns of the file.
+        csv_path: The path of the CSV file.
+        output_path: The path the results are written to. Defaults to stdout.
+
+    Raises:
+        ImportError: If NumPy, an optional dependency, is not installed.
+    """
+    from pkg.vectorized import count_csv_rows, read_csv_columns, require_numpy
+
+    require_numpy()
+    import numpy as np
+
+    compiled = calculator.compile(expression)
+    columns = read_csv_columns(csv_path, compiled.variables)
+    # Without variables, nothing read from the file gives the number of rows
+    shape = () if compiled.variables else (count_csv_rows(csv_path),)
+
+    start = time.perf_counter()
+    result = compiled.evaluate_arrays(columns, shape=shape)
+    elapsed = time.perf_counter() - start
+
+    np.savetxt(output_path or sys.stdout, result.reshape(-1), fmt="%.15g")
+    rate = result.size / elapsed if elapsed > 0 else float("inf")
+    print(f"Evaluated {result.size} rows in {elapsed * 1000:.1f} ms ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+def evaluate_batch(
+    calculator: Calculator,
+    input_path: str,
+    output_path: Optional[str] = None,
+    output_format: str = "plain",
+    workers: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> None:
+    """
+    Evaluate each line of a file as an expression and report the throughput.
+
+    Lines are read, evaluated and written as a stream, so files of any size are
+    evaluated in constant memory. The throughput is reported to stderr.
+
+    Args:
+        calculator: The calculator to evaluate with, when not using worker processes.
+        input_path: The path of the file of expressions, or "-" for stdin.
+        output_path: The path the results are written to. Defaults to stdout.
+        output_format: One of "plain", "csv" or "jsonl".
+        workers: The number of worker processes, or 0 to evaluate in this process.
+        chunk_size: The number of expressions sent to a worker at a time.
+    """
+    source = sys.stdin if input_path == "-" else open(input_path, encoding="utf-8")
+    output = sys.stdout if output_path is None else open(output_path, "w", encoding="utf-8", newline="")
+    try:
+        expressions = read_expressions(source)
+        if workers > 0:
+            results = evaluate_parallel(expressions, workers, chunk_size, calculator.cache_info().maxsize)
+        else:
+            results = evaluate_expressions(calculator, expressions)
+
+        start = time.perf_counter()
+        count = write_results(results, output, output_format)
+        elapsed = time.perf_counter() - start
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    rate = count / elapsed if elapsed > 0 else float("inf")
+    print(f"Evaluated {count} expressions in {elapsed * 1000:.1f} ms ({rate:,.0f} expressions/s)", file=sys.stderr)
+
+
 def main() -> None:
     """
     Parse command-line arguments and evaluate the given expression.
@@ -18,22 +121,46 @@ def main() -> None:
     If no expression is provided, display usage instructions.
     """
     calculator = Calculator()
+    parser = build_parser()
+    args = parser.parse_intermixed_args()
+    if args.workers < 0:
+        parser.error("--workers must not be negative")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
 
-    # Check if any arguments were provided
-    if len(sys.argv) <= 1:
+    if args.batch:
+        try:
+            evaluate_batch(calculator, args.batch, args.output, args.format, args.workers, args.chunk_size)
+        except Exception as e:
+            print(f"Error: {e}")
+        return
+
+    # Check if an expression was provided
+    if not args.expression:
         print("Calculator App")
         print('Usage: python main.py "<expression>"')
+        print('       python main.py --csv data.csv [--output results.txt] "<expression>"')
+        print('       python main.py --batch expressions.txt [--format plain|csv|jsonl] [--workers N]')
         print('Example: python main.py "3 + 5"')
         return
 
     # Join all arguments into a single expression string
-    expression = " ".join(sys.argv[1:])
+    expression = " ".join(args.expression)
 
     try:
+        if args.csv:
+            evaluate_csv(calculator, expression, args.csv, args.output)
+            return
+
         # Evaluate the expression and render the result
         result = calculator.evaluate(expression)
         to_print = render(expression, result)
         print(to_print)
+    except CalculatorSyntaxError as e:
+        # Point at the column the error was found at
+        print(f"Error: {e}")
+        print(f"  {expression}")
+        print(f"  {' ' * (e.column - 1)}^")
     except Exception as e:
         print(f"Error: {e}")
 
@@ -0,0 +1,191 @@
+"""
+Bulk evaluation of calculator expressions.
+
+This module evaluates a stream of expressions, one per line, and writes one result
+per expression as plain lines, CSV or JSONL. Expressions are read, evaluated and
+written as they arrive, so memory stays constant however long the input is. They
+can be spread across a process pool in chunks, with results still written in
+input order.
+"""
+
+import csv
+import json
+import math
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Deque, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+from pkg.calculator import Calculator
+
+FORMATS = ("plain", "csv", "jsonl")
+
+# Expressions sent to a worker process at a time
+DEFAULT_CHUNK_SIZE = 1000
+
+# Chunks queued per worker process, bounding how far reading runs ahead of writing
+CHUNKS_PER_WORKER = 2
+
+
+class BatchResult(NamedTuple):
+    """The result of evaluating one line of the input."""
+
+    line: int
+    expression: str
+    result: Optional[float]
+    error: Optional[str]
+
+
+def read_expressions(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """
+    Read expressions from lines of text, skipping blank lines.
+
+    Args:
+        lines: The lines of the input, such as an open file.
+
+    Yields:
+        A tuple containing (line number, expression) for each expression, in input order.
+    """
+    for line_number, line in enumerate(lines, 1):
+        expression = line.strip()
+        if expression:
+            yield line_number, expression
+
+
+def evaluate_expressions(calculator: Calculator, expressions: Iterable[Tuple[int, str]]) -> Iterator[BatchResult]:
+    """
+    Evaluate expressions one at a time with one calculator.
+
+    An expression that fails is reported in its result instead of stopping the batch.
+    Repeated expressions are compiled once, through the calculator's cache.
+
+    Args:
+        calculator: The calculator to evaluate with.
+        expressions: The (line number, expression) pairs to evaluate.
+
+    Yields:
+        The result of each expression, in input order.
+    """
+    for line_number, expression in expressions:
+        try:
+            yield BatchResult(line_number, expression, calculator.evaluate(expression), None)
+        except Exception as e:
+            yield BatchResult(line_number, expression, None, str(e))
+
+
+# Calculator of the current worker process, created by _init_worker
+_worker_calculator: Optional[Calculator] = None
+
+
+def _init_worker(cache_size: int) -> None:
+    global _worker_calculator
+    _worker_calculator = Calculator(cache_size)
+
+
+def _evaluate_chunk(chunk: List[Tuple[int, str]]) -> List[BatchResult]:
+    return list(evaluate_expressions(_worker_calculator, chunk))
+
+
+def evaluate_parallel(
+    expressions: Iterable[Tuple[int, str]],
+    workers: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    cache_size: int = 256,
+) -> Iterator[BatchResult]:
+    """
+    Evaluate expressions across a pool of worker processes.
+
+    Expressions are sent to the workers in chunks, each worker evaluating with its
+    own calculator. At most CHUNKS_PER_WORKER chunks per worker are in flight, and
+    chunks are yielded in the order they were read, so the input is consumed only as
+    fast as results are taken.
+
+    Args:
+        expressions: The (line number, expression) pairs to evaluate.
+        workers: The number of worker processes.
+        chunk_size: The number of expressions per chunk.
+        cache_size: The compiled expression cache size of each worker's calculator.
+
+    Yields:
+        The result of each expression, in input order.
+
+    Raises:
+        ValueError: If workers or chunk_size is less than 1.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be at least 1")
+
+    expressions = iter(expressions)
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_size,)) as pool:
+        while True:
+            while len(pending) < workers * CHUNKS_PER_WORKER:
+                chunk = list(islice(expressions, chunk_size))
+                if not chunk:
+                    break
+                pending.append(pool.submit(_evaluate_chunk, chunk))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+
+def format_value(value: Optional[float]) -> str:
+    """
+    Format a result for text output, writing integer-like floats as integers.
+
+    Args:
+        value: The result, or None if there is none.
+
+    Returns:
+        The formatted result.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def write_results(results: Iterable[BatchResult], output: TextIO, output_format: str = "plain") -> int:
+    """
+    Write results as they are produced.
+
+    Plain output has one line per expression, holding the result or "Error: <message>".
+    CSV output has a line, expression, result, error header. JSONL output has one
+    object per expression with the same keys. JSON has no inf or nan, so there a
+    non-finite result is written as null with an error.
+
+    Args:
+        results: The results to write.
+        output: The file to write to.
+        output_format: One of FORMATS.
+
+    Returns:
+        The number of results written.
+
+    Raises:
+        ValueError: If the format is not supported.
+    """
+    if output_format not in FORMATS:
+        raise ValueError(f"unsupported format: {output_format}")
+
+    writer = None
+    if output_format == "csv":
+        writer = csv.writer(output, lineterminator="\n")
+        writer.writerow(["line", "expression", "result", "error"])
+
+    count = 0
+    for result in results:
+        if output_format == "plain":
+            output.write(f"Error: {result.error}\n" if result.error is not None else format_value(result.result) + "\n")
+        elif output_format == "csv":
+            writer.writerow([result.line, result.expression, format_value(result.result), result.error or ""])
+        else:
+            record = result._asdict()
+            if result.result is not None and not math.isfinite(result.result):
+                record.update(result=None, error=f"result is not finite: {result.result}")
+            output.write(json.dumps(record, allow_nan=False) + "\n")
+        count += 1
+    return count
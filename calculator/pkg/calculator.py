@@ -1,137 +1,308 @@
-from typing import Callable, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Match, Optional, Tuple
+
+from pkg.lexer import COMMA, INVALID, LPAREN, NAME, NUMBER, OPERATOR, RPAREN, CalculatorSyntaxError, Lexer
+from pkg.operators import BINARY_OPERATORS, FIRST_BINARY, FUNCTIONS, LEFT, LOAD, NEGATION, PUSH, Operator
+
+# An instruction is (opcode, argument, token): the constant, variable name or
+# operator callable, and the source token it was compiled from
+Instruction = Tuple[int, Any, str]
+
+
+class CompiledExpression:
+    """
+    An expression parsed once into a flat RPN program.
+
+    The program is a sequence of (opcode, argument, token) instructions run on a value
+    stack, so evaluating it again with different variable values does no parsing at all.
+    """
+
+    def __init__(self, source: str, program: Tuple[Instruction, ...], variables: Tuple[str, ...]) -> None:
+        """
+        Initialize the compiled expression.
+
+        Args:
+            source: The expression it was compiled from.
+            program: The RPN instructions.
+            variables: The names of the variables it uses, in order of first use.
+        """
+        self.source = source
+        self.program = program
+        self.variables = variables
+
+    def evaluate(self, variables: Optional[Mapping[str, float]] = None, **values: float) -> float:
+        """
+        Evaluate the expression.
+
+        Args:
+            variables: The values of the expression's variables.
+            **values: Variable values given as keyword arguments.
+
+        Returns:
+            The result of the expression.
+
+        Raises:
+            ValueError: If a variable has no value.
+        """
+        if values:
+            variables = {**(variables or {}), **values}
+        stack: List[float] = []
+        push = stack.append
+        pop = stack.pop
+
+        for opcode, argument, _ in self.program:
+            if opcode == PUSH:
+                push(argument)
+            elif opcode == LOAD:
+                try:
+                    push(variables[argument])
+                except (KeyError, TypeError):
+                    raise ValueError(f"no value for variable: {argument}")
+            elif opcode >= FIRST_BINARY:
+                b = pop()
+                stack[-1] = argument(stack[-1], b)
+            else:
+                stack[-1] = argument(stack[-1])
+
+        return stack[0]
+
+    __call__ = evaluate
+
+    def evaluate_arrays(self, columns: Mapping[str, Any], out: Any = None, shape: Tuple[int, ...] = ()) -> Any:
+        """
+        Evaluate the expression over arrays of variable values in one pass.
+
+        Requires NumPy. See pkg.vectorized.evaluate_arrays.
+
+        Args:
+            columns: The values of each variable, as arrays or scalars that broadcast together.
+            out: An array to write the result to, instead of allocating one.
+            shape: A shape the result is broadcast to along with the variables.
+
+        Returns:
+            An array with the result for each row.
+        """
+        from pkg.vectorized import evaluate_arrays
+
+        return evaluate_arrays(self, columns, out, shape)
+
+    def __repr__(self) -> str:
+        return f"CompiledExpression({self.source!r})"
+
 
 class Calculator:
     """
     A calculator that evaluates mathematical expressions using infix notation.
 
-    Supports basic arithmetic operations (+, -, *, /) with proper operator precedence.
+    Supports the arithmetic operators +, -, *, /, //, % and ^ (or **) with proper
+    precedence and associativity, unary minus, the functions sqrt, min and max, and
+    named variables. Expressions are compiled once into an RPN program and kept
+    in an LRU cache, so evaluating the same expression again skips parsing.
     """
 
-    def __init__(self) -> None:
-        """Initialize the calculator with supported operators and their precedence."""
-        # Dictionary mapping operators to their implementation functions
-        self.operators: Dict[str, Callable[[float, float], float]] = {
-            "+": lambda a, b: a + b,
-            "-": lambda a, b: a - b,
-            "*": lambda a, b: a * b,
-            "/": lambda a, b: a / b,
-        }
-
-        # Dictionary defining operator precedence (higher number = higher precedence)
-        self.precedence: Dict[str, int] = {
-            "+": 1,
-            "-": 1,
-            "*": 2,
-            "/": 2,
-        }
-
-    def evaluate(self, expression: str) -> Optional[float]:
+    def __init__(self, cache_size: int = 256) -> None:
+        """
+        Initialize the calculator with its operator table.
+
+        Args:
+            cache_size: The number of compiled expressions kept.
+        """
+        # Binary operators by symbol, and functions by name
+        self.operators: Dict[str, Operator] = dict(BINARY_OPERATORS)
+        self.functions: Dict[str, Operator] = dict(FUNCTIONS)
+
+        # Tokenizer recognizing the operator symbols
+        self.lexer = Lexer(self.operators)
+
+        # Compiled expressions, keyed by their source string
+        self._compile_cached = lru_cache(maxsize=cache_size)(self._compile)
+
+    def evaluate(self, expression: str, variables: Optional[Mapping[str, float]] = None) -> Optional[float]:
         """
         Evaluate a mathematical expression and return the result.
 
         Args:
             expression: A string containing a mathematical expression in infix notation.
                         Example: "3 + 4 * 2"
+            variables: The values of the variables the expression uses, if any.
 
         Returns:
             The result of the expression as a float, or None if the expression is empty.
 
         Raises:
-            ValueError: If the expression contains invalid tokens or is malformed.
+            ValueError: If the expression contains invalid tokens or is malformed,
+                        or a variable has no value.
         """
         # Handle empty expressions
         if not expression or expression.isspace():
             return None
 
-        # Preprocess the expression to ensure parentheses are separated
-        # Add spaces around parentheses
-        for char in "()":
-            expression = expression.replace(char, f" {char} ")
+        return self.compile(expression).evaluate(variables)
 
-        # Split the expression into tokens and filter out empty tokens
-        tokens = [token for token in expression.strip().split() if token]
-
-        # Evaluate the infix expression
-        return self._evaluate_infix(tokens)
-
-    def _evaluate_infix(self, tokens: List[str]) -> float:
+    def compile(self, expression: str) -> CompiledExpression:
         """
-        Evaluate an infix expression using the shunting-yard algorithm.
+        Compile an expression for repeated evaluation.
+
+        Compiled expressions are cached by source string. Changes to the operator table
+        after an expression was compiled do not affect its cached program.
 
         Args:
-            tokens: A list of tokens (numbers and operators) from the expression.
+            expression: A string containing a mathematical expression in infix notation.
+                        Example: "price * (1 + rate)"
 
         Returns:
-            The result of evaluating the expression.
+            The compiled expression.
 
         Raises:
-            ValueError: If the expression is invalid or contains unsupported tokens.
+            ValueError: If the expression is empty, contains invalid tokens or is malformed.
         """
-        values: List[float] = []
-        operators: List[str] = []
-
-        for token in tokens:
-            if token == '(':
-                operators.append(token)
-            elif token == ')':
-                while operators and operators[-1] != '(':
-                    self._apply_operator(operators, values)
-                if not operators:
-                    raise ValueError("Unmatched ')'")
-                operators.pop()  # Remove the '('
-            elif token in self.operators:
-                # Process operators according to precedence
-                while (
-                    operators
-                    and operators[-1] != '('
-                    and operators[-1] in self.operators
-                    and self.precedence[operators[-1]] >= self.precedence[token]
-                ):
-                    self._apply_operator(operators, values)
-                operators.append(token)
-            else:
-                # Try to convert token to a number
-                try:
-                    values.append(float(token))
-                except ValueError:
-                    raise ValueError(f"invalid token: {token}")
-
-        # Process any remaining operators
-        while operators:
-            if operators[-1] == '(':
-                raise ValueError("Unmatched '('")
-            self._apply_operator(operators, values)
+        return self._compile_cached(expression)
 
-        # If we don't have exactly one value left, the expression was invalid
-        if len(values) != 1:
-            raise ValueError("invalid expression")
+    def cache_info(self) -> Any:
+        """
+        Report the compiled expression cache statistics.
 
-        return values[0]
+        Returns:
+            The hits, misses, maximum size and current size of the cache.
+        """
+        return self._compile_cached.cache_info()
 
-    def _apply_operator(self, operators: List[str], values: List[float]) -> None:
+    def _compile(self, expression: str) -> CompiledExpression:
         """
-        Apply an operator to the top values in the values stack.
+        Compile an infix expression to RPN using the shunting-yard algorithm.
+
+        The tokens must alternate between operands and operators, with parentheses,
+        unary minus and function calls in operand position, so malformed expressions
+        are rejected here, at the column where they go wrong, rather than on every
+        evaluation.
 
         Args:
-            operators: Stack of operators.
-            values: Stack of values.
+            expression: A string containing a mathematical expression in infix notation.
+
+        Returns:
+            The compiled expression.
 
         Raises:
-            ValueError: If there are not enough operands for the operator.
+            ValueError: If the expression is empty.
+            CalculatorSyntaxError: If the expression is invalid or contains unsupported tokens.
         """
-        if not operators:
-            return
+        if not expression or expression.isspace():
+            raise ValueError("empty expression")
 
-        # Get the operator to apply
-        operator = operators.pop()
+        program: List[Instruction] = []
+        variables: Dict[str, None] = {}
+        # Stack of pending operators and functions, with None for an open parenthesis,
+        # and the column of each
+        operators: List[Optional[Operator]] = []
+        columns: List[int] = []
+        # For each open parenthesis, the function it calls, if any, and the number of
+        # arguments read so far
+        calls: List[Optional[Operator]] = []
+        arguments: List[int] = []
+
+        def emit_operator() -> None:
+            operator = operators.pop()
+            columns.pop()
+            if operator is NEGATION and program[-1][0] == PUSH:
+                # Fold the sign into a literal operand
+                _, value, text = program.pop()
+                program.append((PUSH, -value, text[1:] if text[0] == "-" else "-" + text))
+            else:
+                program.append((operator.opcode, operator.function, operator.symbol))
 
-        # Check if we have enough operands
-        if len(values) < 2:
-            raise ValueError(f"not enough operands for operator {operator}")
+        def unexpected(match: Match[str], message: str) -> CalculatorSyntaxError:
+            # Characters that start no token are reported as invalid wherever they appear
+            if match.lastindex == INVALID:
+                message = f"invalid token: {match.group()}"
+            return CalculatorSyntaxError(message, match.start() + 1)
 
-        # Pop the operands (in reverse order)
-        b = values.pop()
-        a = values.pop()
+        # Alternate between expecting an operand and expecting an operator
+        expect_operand = True
+        # The function whose opening parenthesis must come next, if any
+        call: Optional[Operator] = None
+        for match in self.lexer.scan(expression):
+            kind = match.lastindex
+            text = match.group()
+            if call is not None:
+                if kind != LPAREN:
+                    raise unexpected(match, f"expected '(' after {call.symbol} but found '{text}'")
+                operators.append(None)
+                columns.append(match.start() + 1)
+                calls.append(call)
+                arguments.append(1)
+                call = None
+            elif expect_operand:
+                if kind == NUMBER:
+                    program.append((PUSH, float(text), text))
+                    expect_operand = False
+                elif kind == NAME and text in self.functions:
+                    call = self.functions[text]
+                    operators.append(call)
+                    columns.append(match.start() + 1)
+                elif kind == NAME:
+                    program.append((LOAD, text, text))
+                    variables[text] = None
+                    expect_operand = False
+                elif kind == LPAREN:
+                    operators.append(None)
+                    columns.append(match.start() + 1)
+                    calls.append(None)
+                    arguments.append(1)
+                elif kind == OPERATOR and text == "-":
+                    operators.append(NEGATION)
+                    columns.append(match.start() + 1)
+                elif kind == OPERATOR:
+                    raise unexpected(match, f"not enough operands for operator {text}")
+                else:
+                    raise unexpected(match, f"expected a number, variable or '(' but found '{text}'")
+            elif kind == OPERATOR:
+                # Pop operators that bind at least as tightly, or more tightly for right-associative ones
+                token = self.operators[text]
+                left = token.associativity == LEFT
+                while operators and operators[-1] is not None and (
+                    operators[-1].precedence > token.precedence
+                    or (left and operators[-1].precedence == token.precedence)
+                ):
+                    emit_operator()
+                operators.append(token)
+                columns.append(match.start() + 1)
+                expect_operand = True
+            elif kind == COMMA or kind == RPAREN:
+                while operators and operators[-1] is not None:
+                    emit_operator()
+                function = calls[-1] if calls else None
+                if kind == COMMA:
+                    if function is None:
+                        raise unexpected(match, "unexpected ','")
+                    if arguments[-1] == function.arity:
+                        raise CalculatorSyntaxError(f"too many arguments for {function.symbol}", match.start() + 1)
+                    arguments[-1] += 1
+                    expect_operand = True
+                    continue
+                if not operators:
+                    raise unexpected(match, "Unmatched ')'")
+                if function is not None and arguments[-1] != function.arity:
+                    raise CalculatorSyntaxError(f"not enough arguments for {function.symbol}", match.start() + 1)
+                operators.pop()  # Remove the '('
+                columns.pop()
+                calls.pop()
+                arguments.pop()
+                if function is not None:
+                    emit_operator()
+            else:
+                raise unexpected(match, f"expected an operator but found '{text}'")
+
+        if call is not None:
+            raise CalculatorSyntaxError(f"expected '(' after {call.symbol}", columns[-1])
+        if expect_operand:
+            if operators and operators[-1] is not None and operators[-1] is not NEGATION:
+                raise CalculatorSyntaxError(f"not enough operands for operator {operators[-1].symbol}", columns[-1])
+            raise CalculatorSyntaxError("unexpected end of expression", len(expression.rstrip()) + 1)
+
+        # Process any remaining operators
+        while operators:
+            if operators[-1] is None:
+                raise CalculatorSyntaxError("Unmatched '('", columns[-1])
+            emit_operator()
 
-        # Apply the operator and push the result back onto the values stack
-        values.append(self.operators[operator](a, b))
+        return CompiledExpression(expression, tuple(program), tuple(variables))
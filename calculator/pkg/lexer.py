@@ -0,0 +1,97 @@
+"""
+Lexer for calculator expressions.
+
+This module turns an expression into typed tokens with their source columns in a
+single regular-expression pass, without padding or splitting the expression first.
+"""
+
+import re
+from typing import Iterable, Iterator, Match, NamedTuple
+
+# Token kinds, numbered like the groups of the lexer pattern
+NUMBER = 1
+NAME = 2
+OPERATOR = 3
+LPAREN = 4
+RPAREN = 5
+COMMA = 6
+INVALID = 7
+
+NUMBER_PATTERN = r"(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?"
+NAME_PATTERN = r"[A-Za-z_]\w*"
+
+
+class Token(NamedTuple):
+    """A token of an expression."""
+
+    kind: int
+    text: str
+    column: int
+
+
+class CalculatorSyntaxError(ValueError):
+    """Raised when an expression cannot be parsed, pointing to the column at fault."""
+
+    def __init__(self, message: str, column: int) -> None:
+        """
+        Initialize the error.
+
+        Args:
+            message: What is wrong.
+            column: The 1-based column of the expression where the problem is.
+        """
+        super().__init__(f"{message} at column {column}")
+        self.column = column
+
+
+class Lexer:
+    """Single-pass tokenizer for a set of operator symbols."""
+
+    def __init__(self, operators: Iterable[str]) -> None:
+        """
+        Build the tokenizer's pattern.
+
+        Args:
+            operators: The operator symbols to recognize. Longer symbols are tried
+                       first, so "**" is not read as two "*".
+        """
+        symbols = sorted(operators, key=len, reverse=True)
+        operator_pattern = "|".join(re.escape(symbol) for symbol in symbols) or r"(?!)"
+        # Whitespace matches no group, so finditer skips it; every other character starts a token
+        self.pattern = re.compile(
+            rf"({NUMBER_PATTERN})|({NAME_PATTERN})|({operator_pattern})|(\()|(\))|(,)|(\S)"
+        )
+
+    def scan(self, expression: str) -> Iterator[Match[str]]:
+        """
+        Match the tokens of an expression without building Token objects.
+
+        The kind of each match is its lastindex and its column is start() + 1.
+        This is the compiler's hot path; tokenize wraps it for other callers.
+
+        Args:
+            expression: The expression.
+
+        Returns:
+            An iterator over the matches, including INVALID ones.
+        """
+        return self.pattern.finditer(expression)
+
+    def tokenize(self, expression: str) -> Iterator[Token]:
+        """
+        Tokenize an expression.
+
+        Args:
+            expression: The expression.
+
+        Yields:
+            The tokens, in order.
+
+        Raises:
+            CalculatorSyntaxError: At the first character that starts no token.
+        """
+        for match in self.scan(expression):
+            kind = match.lastindex
+            if kind == INVALID:
+                raise CalculatorSyntaxError(f"invalid token: {match.group()}", match.start() + 1)
+            yield Token(kind, match.group(), match.start() + 1)
@@ -0,0 +1,74 @@
+"""
+Operator table for calculator expressions.
+
+Each operator and function the calculator supports has one record holding its
+opcode, arity, precedence, associativity and the C-level callable that applies it,
+so compiled programs call it directly instead of looking it up by symbol.
+"""
+
+import math
+import operator
+from typing import Callable, Dict, NamedTuple
+
+# Opcodes of a compiled program. Operators are numbered by arity, unary ones first,
+# so the evaluator knows how many operands to pop from a single comparison
+PUSH = 0  # Push a constant
+LOAD = 1  # Push the value of a variable
+NEG = 2
+SQRT = 3
+ADD = 4
+SUB = 5
+MUL = 6
+DIV = 7
+FLOORDIV = 8
+MOD = 9
+POW = 10
+MIN = 11
+MAX = 12
+
+# Opcodes from here on pop two operands
+FIRST_BINARY = ADD
+
+LEFT = "left"
+RIGHT = "right"
+
+
+class Operator(NamedTuple):
+    """An operator or function, as the compiler and evaluator see it."""
+
+    symbol: str
+    opcode: int
+    arity: int
+    function: Callable[..., float]
+    precedence: int = 0  # Higher binds tighter; unused for functions
+    associativity: str = LEFT
+
+
+# Binary infix operators, by symbol. Powers use math.pow, which raises on a negative
+# base with a fractional exponent where operator.pow would return a complex number
+BINARY_OPERATORS: Dict[str, Operator] = {
+    op.symbol: op
+    for op in (
+        Operator("+", ADD, 2, operator.add, 1),
+        Operator("-", SUB, 2, operator.sub, 1),
+        Operator("*", MUL, 2, operator.mul, 2),
+        Operator("/", DIV, 2, operator.truediv, 2),
+        Operator("//", FLOORDIV, 2, operator.floordiv, 2),
+        Operator("%", MOD, 2, operator.mod, 2),
+        Operator("^", POW, 2, math.pow, 4, RIGHT),
+        Operator("**", POW, 2, math.pow, 4, RIGHT),
+    )
+}
+
+# Prefix minus binds tighter than multiplication and looser than powers, so -2^2 is -4
+NEGATION = Operator("-", NEG, 1, operator.neg, 3, RIGHT)
+
+# Functions, called as name(argument, ...), by name
+FUNCTIONS: Dict[str, Operator] = {
+    op.symbol: op
+    for op in (
+        Operator("sqrt", SQRT, 1, math.sqrt),
+        Operator("min", MIN, 2, min),
+        Operator("max", MAX, 2, max),
+    )
+}
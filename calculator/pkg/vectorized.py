@@ -0,0 +1,201 @@
+"""
+Vectorized evaluation of compiled calculator expressions.
+
+This module runs the RPN program of a compiled expression once over whole NumPy
+arrays, so one formula can be applied to millions of rows at array speed. NumPy is
+optional; the rest of the calculator works without it.
+"""
+
+import csv
+import warnings
+from typing import Any, Dict, List, Mapping, Optional, Sequence, TextIO, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pkg.calculator import CompiledExpression
+from pkg.operators import ADD, DIV, FIRST_BINARY, FLOORDIV, LOAD, MAX, MIN, MOD, MUL, NEG, POW, PUSH, SQRT, SUB
+
+# NumPy ufunc implementing each opcode, by name so the table exists without NumPy
+UFUNC_NAMES: Dict[int, str] = {
+    NEG: "negative",
+    SQRT: "sqrt",
+    ADD: "add",
+    SUB: "subtract",
+    MUL: "multiply",
+    DIV: "true_divide",
+    FLOORDIV: "floor_divide",
+    MOD: "remainder",
+    POW: "power",
+    MIN: "minimum",
+    MAX: "maximum",
+}
+
+
+def require_numpy() -> None:
+    """
+    Check that NumPy is installed.
+
+    Raises:
+        ImportError: If it is not.
+    """
+    if np is None:
+        raise ImportError("vectorized evaluation and --csv require NumPy, which is not installed (pip install numpy)")
+
+
+def evaluate_arrays(
+    compiled: CompiledExpression,
+    columns: Mapping[str, Any],
+    out: Optional["np.ndarray"] = None,
+    shape: Tuple[int, ...] = (),
+) -> "np.ndarray":
+    """
+    Evaluate a compiled expression over arrays of variable values in one pass.
+
+    Each operator is applied to whole arrays with a NumPy ufunc. Intermediate results
+    are written into scratch buffers that are reused as soon as they are consumed, and
+    into out when it is given, so an expression allocates at most a few arrays however
+    long it is. Constant subexpressions are computed once as scalars. Division, powers
+    and square roots follow IEEE rules, giving inf or nan instead of raising.
+
+    Args:
+        compiled: The compiled expression.
+        columns: The values of each variable, as arrays or scalars that broadcast together.
+        out: A float64 array of the broadcast shape to write the result to. It may be
+             one of the input arrays, for an in-place update.
+        shape: A shape the result is broadcast to along with the variables, such as
+               the number of rows for an expression without variables.
+
+    Returns:
+        The result for each row; out, if it was given.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+        ValueError: If a variable has no values, or out has the wrong shape or type.
+    """
+    require_numpy()
+
+    inputs: Dict[str, np.ndarray] = {}
+    for name in compiled.variables:
+        if name not in columns:
+            raise ValueError(f"no values for variable: {name}")
+        inputs[name] = np.asarray(columns[name], dtype=np.float64)
+    shape = np.broadcast_shapes(shape, *(values.shape for values in inputs.values()))
+
+    # Scratch buffers free for reuse; out is only used as scratch if no input aliases it
+    free: List[np.ndarray] = []
+    if out is not None:
+        if out.shape != shape or out.dtype != np.float64:
+            raise ValueError(f"out must be a float64 array of shape {shape}")
+        if not any(np.shares_memory(out, values) for values in inputs.values()):
+            free.append(out)
+
+    # Stack of (value, owned) pairs; owned values are scratch buffers that may be overwritten
+    stack: List[Tuple[Any, bool]] = []
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for opcode, argument, _ in compiled.program:
+            if opcode == PUSH:
+                stack.append((np.float64(argument), False))
+                continue
+            if opcode == LOAD:
+                stack.append((inputs[argument], False))
+                continue
+
+            ufunc = getattr(np, UFUNC_NAMES[opcode]) if opcode in UFUNC_NAMES else None
+            operands = [stack.pop() for _ in range(2 if opcode >= FIRST_BINARY else 1)][::-1]
+            if ufunc is None:
+                # Operators without a ufunc are applied to the whole arrays as given
+                result = np.asarray(argument(*(value for value, _ in operands)), dtype=np.float64)
+                stack.append((result, result.shape == shape))
+                free.extend(value for value, owned in operands if owned)
+            elif opcode < FIRST_BINARY:
+                a, a_owned = operands[0]
+                if np.ndim(a) == 0:
+                    stack.append((ufunc(a), False))
+                else:
+                    target = a if a_owned else free.pop() if free else np.empty(shape)
+                    ufunc(a, out=target)
+                    stack.append((target, True))
+            else:
+                (a, a_owned), (b, b_owned) = operands
+                if np.ndim(a) == 0 and np.ndim(b) == 0:
+                    stack.append((ufunc(a, b), False))
+                else:
+                    target = a if a_owned else b if b_owned else free.pop() if free else np.empty(shape)
+                    ufunc(a, b, out=target)
+                    if a_owned and b_owned:
+                        free.append(b)
+                    stack.append((target, True))
+
+    result, owned = stack[0]
+    if out is not None:
+        if result is not out:
+            np.copyto(out, result)
+        return out
+    if owned and np.shape(result) == shape:
+        return result
+    return np.broadcast_to(result, shape).astype(np.float64)
+
+
+def count_csv_rows(source: Union[str, TextIO]) -> int:
+    """
+    Count the data rows of a CSV file with a header row, as read_csv_columns reads them.
+
+    Blank lines and "#" comments are skipped, like np.loadtxt does.
+
+    Args:
+        source: The path of the file, or an open text file.
+
+    Returns:
+        The number of rows after the header.
+    """
+    if isinstance(source, str):
+        with open(source, newline="", encoding="utf-8") as f:
+            return count_csv_rows(f)
+
+    source.readline()
+    return sum(1 for line in source if line.split("#", 1)[0].strip())
+
+
+def read_csv_columns(
+    source: Union[str, TextIO], names: Optional[Sequence[str]] = None
+) -> Dict[str, "np.ndarray"]:
+    """
+    Read numeric columns from a CSV file with a header row.
+
+    Args:
+        source: The path of the file, or an open text file.
+        names: The columns to read. Defaults to all columns.
+
+    Returns:
+        A contiguous float64 array for each column, by name.
+
+    Raises:
+        ImportError: If NumPy is not installed.
+        ValueError: If a requested column is missing or a value is not a number.
+    """
+    require_numpy()
+
+    if isinstance(source, str):
+        with open(source, newline="", encoding="utf-8") as f:
+            return read_csv_columns(f, names)
+
+    header = [name.strip() for name in next(csv.reader([source.readline()]), [])]
+    if names is None:
+        names = header
+    indices = []
+    for name in names:
+        if name not in header:
+            raise ValueError(f"column not found: {name}")
+        indices.append(header.index(name))
+    if not indices:
+        return {}
+
+    with warnings.catch_warnings():
+        # An empty file is not an error: it just has no rows
+        warnings.simplefilter("ignore", UserWarning)
+        data = np.loadtxt(source, delimiter=",", usecols=indices, dtype=np.float64, ndmin=2)
+    data = data.reshape(-1, len(indices))
+    return {name: np.ascontiguousarray(data[:, column]) for column, name in enumerate(names)}
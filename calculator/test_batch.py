@@ -0,0 +1,96 @@
+"""
+Unit tests for the batch module.
+
+This module contains tests for reading, evaluating and writing streams of
+expressions, in this process and across worker processes.
+"""
+
+import io
+import json
+import unittest
+
+from pkg.batch import evaluate_expressions, evaluate_parallel, read_expressions, write_results
+from pkg.calculator import Calculator
+
+
+class TestBatch(unittest.TestCase):
+    """Test suite for bulk evaluation."""
+
+    def setUp(self) -> None:
+        """Initialize a Calculator instance before each test."""
+        self.calculator = Calculator()
+
+    def evaluate(self, text: str, output_format: str = "plain") -> str:
+        """Evaluate the lines of text in this process and return the output."""
+        output = io.StringIO()
+        results = evaluate_expressions(self.calculator, read_expressions(io.StringIO(text)))
+        write_results(results, output, output_format)
+        return output.getvalue()
+
+    def test_read_expressions(self) -> None:
+        """Test that blank lines are skipped and line numbers kept."""
+        lines = ["3 + 5\n", "\n", "  2 * 4  \n"]
+        self.assertEqual(list(read_expressions(lines)), [(1, "3 + 5"), (3, "2 * 4")])
+
+    def test_plain_output(self) -> None:
+        """Test one result per expression, with errors in place."""
+        output = self.evaluate("3 + 5\n1 / 0\n10 / 4\n3 $ 4\n")
+        self.assertEqual(
+            output.splitlines(),
+            ["8", "Error: float division by zero", "2.5", "Error: invalid token: $ at column 3"],
+        )
+
+    def test_csv_output(self) -> None:
+        """Test the CSV header and rows."""
+        output = self.evaluate("3 + 5\n\n2 * x\n", "csv")
+        self.assertEqual(
+            output.splitlines(),
+            ["line,expression,result,error", "1,3 + 5,8,", "3,2 * x,,no value for variable: x"],
+        )
+
+    def test_jsonl_output(self) -> None:
+        """Test one JSON object per expression."""
+        records = [json.loads(line) for line in self.evaluate("3 + 5\n1 +\n", "jsonl").splitlines()]
+        self.assertEqual(records[0], {"line": 1, "expression": "3 + 5", "result": 8.0, "error": None})
+        self.assertIsNone(records[1]["result"])
+        self.assertIn("at column", records[1]["error"])
+
+    def test_jsonl_non_finite_result(self) -> None:
+        """Test that overflowing results are written as valid JSON, with an error."""
+        output = self.evaluate("1e308 * 10\n", "jsonl")
+        record = json.loads(output, parse_constant=lambda name: self.fail(f"invalid JSON constant {name}"))
+        self.assertIsNone(record["result"])
+        self.assertEqual(record["error"], "result is not finite: inf")
+        self.assertEqual(self.evaluate("1e308 * 10\n"), "inf\n")
+
+    def test_unsupported_format(self) -> None:
+        """Test that unknown formats are rejected."""
+        with self.assertRaises(ValueError):
+            write_results([], io.StringIO(), "xml")
+
+    def test_stream_is_consumed_lazily(self) -> None:
+        """Test that results are produced before the whole input has been read."""
+        def lines():
+            yield "1 + 1\n"
+            raise AssertionError("read past the first result")
+
+        results = evaluate_expressions(self.calculator, read_expressions(lines()))
+        self.assertEqual(next(results).result, 2)
+
+    def test_parallel_preserves_order(self) -> None:
+        """Test that worker processes return the same results, in input order."""
+        expressions = [(n, f"{n} * 2 - 1 / {n % 3}") for n in range(1, 50)]
+        serial = list(evaluate_expressions(self.calculator, expressions))
+        parallel = list(evaluate_parallel(expressions, workers=2, chunk_size=4))
+        self.assertEqual(parallel, serial)
+
+    def test_parallel_rejects_empty_chunks(self) -> None:
+        """Test that a chunk size or worker count below 1 is an error rather than no output."""
+        with self.assertRaises(ValueError):
+            next(evaluate_parallel([(1, "1 + 1")], workers=2, chunk_size=0))
+        with self.assertRaises(ValueError):
+            next(evaluate_parallel([(1, "1 + 1")], workers=0))
+
+
+if __name__ == "__main__":
+    unittest.main()
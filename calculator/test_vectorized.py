@@ -0,0 +1,112 @@
+"""
+Unit tests for the vectorized module.
+
+This module contains tests for evaluating compiled expressions over NumPy
+arrays and reading the columns of CSV files.
+"""
+
+import io
+import unittest
+from unittest import mock
+
+from pkg.calculator import Calculator
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from pkg.vectorized import require_numpy
+
+if np is not None:
+    from pkg.vectorized import count_csv_rows, evaluate_arrays, read_csv_columns
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestVectorized(unittest.TestCase):
+    """Test suite for vectorized evaluation."""
+
+    def setUp(self) -> None:
+        """Initialize a Calculator instance before each test."""
+        self.calculator = Calculator()
+
+    def test_matches_scalar_evaluation(self) -> None:
+        """Test that every row matches evaluating the expression on its own."""
+        compiled = self.calculator.compile("(x + 2) * y - x / 4")
+        x = np.arange(10, dtype=float)
+        y = np.linspace(-1, 1, 10)
+        result = compiled.evaluate_arrays({"x": x, "y": y})
+        expected = [compiled.evaluate({"x": a, "y": b}) for a, b in zip(x, y)]
+        np.testing.assert_allclose(result, expected)
+
+    def test_out_buffer(self) -> None:
+        """Test that results are written into out, even when out is one of the inputs."""
+        compiled = self.calculator.compile("x * 2 + 1 - x")
+        x = np.arange(4, dtype=float)
+        out = np.empty(4)
+        self.assertIs(evaluate_arrays(compiled, {"x": x}, out=out), out)
+        np.testing.assert_array_equal(out, [1, 2, 3, 4])
+
+        evaluate_arrays(compiled, {"x": x}, out=x)
+        np.testing.assert_array_equal(x, [1, 2, 3, 4])
+
+    def test_scalars_and_constants_broadcast(self) -> None:
+        """Test that scalar variables and constant expressions broadcast to the rows."""
+        result = self.calculator.compile("x * rate + 2 * 3").evaluate_arrays({"x": [1.0, 2.0], "rate": 10})
+        np.testing.assert_array_equal(result, [16, 26])
+
+    def test_unary_minus(self) -> None:
+        """Test that negation is applied to whole arrays."""
+        result = self.calculator.compile("-x * 2 - -(y)").evaluate_arrays({"x": [1.0, 2.0], "y": [3.0, 4.0]})
+        np.testing.assert_array_equal(result, [1, 0])
+
+    def test_extended_operators(self) -> None:
+        """Test that every operator and function matches scalar evaluation."""
+        compiled = self.calculator.compile("max(x, 1) ^ 2 % 7 + sqrt(y) // 1 - min(x, y) ** 0.5 ^ 2")
+        x = np.arange(1, 8, dtype=float)
+        y = np.linspace(1, 20, 7)
+        result = compiled.evaluate_arrays({"x": x, "y": y})
+        expected = [compiled.evaluate({"x": a, "y": b}) for a, b in zip(x, y)]
+        np.testing.assert_allclose(result, expected)
+
+    def test_division_by_zero(self) -> None:
+        """Test that division by zero gives inf or nan instead of raising."""
+        result = self.calculator.compile("x / y").evaluate_arrays({"x": [1.0, 0.0], "y": [0.0, 0.0]})
+        self.assertTrue(np.isinf(result[0]))
+        self.assertTrue(np.isnan(result[1]))
+
+    def test_missing_variable(self) -> None:
+        """Test that a variable without values raises a ValueError."""
+        with self.assertRaises(ValueError):
+            self.calculator.compile("x + y").evaluate_arrays({"x": [1.0]})
+
+    def test_read_csv_columns(self) -> None:
+        """Test that the named columns of a CSV file are read as arrays."""
+        columns = read_csv_columns(io.StringIO("price, qty,unused\n2.5,4,x\n1,3,y\n"), ["price", "qty"])
+        np.testing.assert_array_equal(columns["price"], [2.5, 1])
+        result = self.calculator.compile("price * qty").evaluate_arrays(columns)
+        np.testing.assert_array_equal(result, [10, 3])
+
+        with self.assertRaises(ValueError):
+            read_csv_columns(io.StringIO("a,b\n1,2\n"), ["c"])
+
+    def test_constant_expression_per_row(self) -> None:
+        """Test that an expression without variables gives one result per CSV row."""
+        rows = count_csv_rows(io.StringIO("a,b\n1,2\n\n# note\n3,4\n5,6\n"))
+        self.assertEqual(rows, 3)
+        result = self.calculator.compile("2 + 3").evaluate_arrays({}, shape=(rows,))
+        np.testing.assert_array_equal(result, [5, 5, 5])
+
+
+class TestWithoutNumpy(unittest.TestCase):
+    """Test suite for vectorized evaluation when NumPy is not installed."""
+
+    def test_require_numpy(self) -> None:
+        """Test that the error names the CSV command and how to install NumPy."""
+        with mock.patch("pkg.vectorized.np", None):
+            with self.assertRaisesRegex(ImportError, "--csv require NumPy.*pip install numpy"):
+                require_numpy()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,9 +5,12 @@ This module contains tests for basic arithmetic operations and error handling
 in the Calculator class.
 """
 
+import math
 import unittest
 
 from pkg.calculator import Calculator
+from pkg.lexer import CalculatorSyntaxError
+from pkg.operators import POW
 
 
 class TestCalculator(unittest.TestCase):
@@ -82,6 +85,115 @@ class TestCalculator(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.calculator.evaluate("3 + 4) * 2")
 
+    def test_compile_with_variables(self) -> None:
+        """Test that a compiled expression can be evaluated with different variable values."""
+        compiled = self.calculator.compile("price * (1 + rate) - price")
+        self.assertEqual(compiled.variables, ("price", "rate"))
+        self.assertAlmostEqual(compiled.evaluate({"price": 100, "rate": 0.5}), 50)
+        self.assertAlmostEqual(compiled(price=10, rate=1), 10)
+
+    def test_evaluate_with_variables(self) -> None:
+        """Test that evaluate accepts variable values."""
+        result = self.calculator.evaluate("x * x + 1", {"x": 3})
+        self.assertEqual(result, 10)
+
+    def test_missing_variable(self) -> None:
+        """Test that evaluating without a variable's value raises a ValueError."""
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("x + 1")
+
+    def test_compile_rejects_malformed_expressions(self) -> None:
+        """Test that malformed expressions fail at compile time."""
+        for expression in ("", "+ 3", "3 4", "(3 + 4", "3 $ 4"):
+            with self.subTest(expression=expression):
+                with self.assertRaises(ValueError):
+                    self.calculator.compile(expression)
+
+    def test_compiled_expressions_are_cached(self) -> None:
+        """Test that repeated expressions are served from the compiled expression cache."""
+        first = self.calculator.compile("3 * 4 + 5")
+        self.assertEqual(self.calculator.evaluate("3 * 4 + 5"), 17)
+        self.assertIs(self.calculator.compile("3 * 4 + 5"), first)
+        info = self.calculator.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 1))
+
+    def test_unspaced_expression(self) -> None:
+        """Test that expressions without spaces are tokenized."""
+        result = self.calculator.evaluate("3+4*(2-1)")
+        self.assertEqual(result, 7)
+
+    def test_unary_minus(self) -> None:
+        """Test that a minus sign in operand position negates the operand."""
+        self.assertEqual(self.calculator.evaluate("-3 + 5"), 2)
+        self.assertEqual(self.calculator.evaluate("2 * -3"), -6)
+        self.assertEqual(self.calculator.evaluate("-(2 + 3) * 2"), -10)
+        self.assertEqual(self.calculator.evaluate("3 - -x", {"x": 2}), 5)
+
+    def test_scientific_notation(self) -> None:
+        """Test that numbers in scientific notation are read."""
+        result = self.calculator.evaluate("1e3 + 2.5E-1 + .5")
+        self.assertEqual(result, 1000.75)
+
+    def test_error_columns(self) -> None:
+        """Test that syntax errors point to the column at fault."""
+        cases = {
+            "3 $ 4": 3,
+            "3 4": 3,
+            "2x": 2,
+            "3 + 4) * 2": 6,
+            "  (3 + 4": 3,
+            "3 * (": 6,
+        }
+        for expression, column in cases.items():
+            with self.subTest(expression=expression):
+                with self.assertRaises(CalculatorSyntaxError) as context:
+                    self.calculator.evaluate(expression)
+                self.assertEqual(context.exception.column, column)
+                self.assertIn(f"at column {column}", str(context.exception))
+
+    def test_extended_operators(self) -> None:
+        """Test powers, floor division and modulo, with Python's semantics."""
+        self.assertEqual(self.calculator.evaluate("2 ^ 10"), 1024)
+        self.assertEqual(self.calculator.evaluate("2 ** 0.5 * 2 ** 0.5"), 2.0000000000000004)
+        self.assertEqual(self.calculator.evaluate("7 // 2"), 3)
+        self.assertEqual(self.calculator.evaluate("-7 // 2"), -4)
+        self.assertEqual(self.calculator.evaluate("-7 % 3"), 2)
+        self.assertEqual(self.calculator.evaluate("1 + 7 % 4 * 2"), 7)
+
+    def test_power_associativity(self) -> None:
+        """Test that powers are right-associative and bind tighter than unary minus."""
+        self.assertEqual(self.calculator.evaluate("2 ^ 3 ^ 2"), 512)
+        self.assertEqual(self.calculator.evaluate("(2 ^ 3) ^ 2"), 64)
+        self.assertEqual(self.calculator.evaluate("-2 ^ 2"), -4)
+        self.assertEqual(self.calculator.evaluate("2 ^ -1"), 0.5)
+        self.assertEqual(self.calculator.evaluate("10 - 2 - 3"), 5)
+
+    def test_functions(self) -> None:
+        """Test function calls, nested and mixed with operators."""
+        self.assertEqual(self.calculator.evaluate("sqrt(16) + 1"), 5)
+        self.assertEqual(self.calculator.evaluate("max(1, min(2 * 3, x)) ^ 2", {"x": 4}), 16)
+        self.assertEqual(self.calculator.evaluate("-sqrt(4)"), -2)
+
+    def test_function_errors(self) -> None:
+        """Test that calls with the wrong arguments are rejected where they go wrong."""
+        cases = {
+            "max(1)": ("not enough arguments for max", 6),
+            "max(1, 2, 3)": ("too many arguments for max", 9),
+            "sqrt 4": ("expected '(' after sqrt", 6),
+            "(1, 2)": ("unexpected ','", 3),
+        }
+        for expression, (message, column) in cases.items():
+            with self.subTest(expression=expression):
+                with self.assertRaises(CalculatorSyntaxError) as context:
+                    self.calculator.evaluate(expression)
+                self.assertIn(message, str(context.exception))
+                self.assertEqual(context.exception.column, column)
+
+    def test_program_uses_opcodes(self) -> None:
+        """Test that operators compile to their opcodes and callables."""
+        program = self.calculator.compile("x ^ 2").program
+        self.assertEqual(program[-1], (POW, math.pow, "^"))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -4,32 +4,41 @@ Function calling module for the AI Code Assistant.
 This module provides functionality to call external functions based on AI model requests.
 """
 
+import contextvars
+import hashlib
 import json
+import os
 import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from google.genai import types
 
-from functions.get_file_content import get_file_content, schema_get_file_content
-from functions.get_files_info import get_files_info, schema_get_files_info
-from functions.run_python import run_python_file, schema_run_python_file
-from functions.write_file import write_file, schema_write_file
+from config import MAX_TOOL_WORKERS, WORKING_DIR
+from tool_registry import ToolArgumentError, registry
+from tracing import span
 
-available_functions = types.Tool(
-    function_declarations=[
-        schema_get_files_info,
-        schema_get_file_content,
-        schema_write_file,
-        schema_run_python_file
-    ]
-)
 
-def call_function(function_call_part: types.FunctionCall, verbose: bool = False) -> types.Content | str:
+def __getattr__(name: str) -> Any:
+    """Build available_functions on first access, so importing this module imports no tool modules."""
+    if name == "available_functions":
+        return registry.tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def call_function(
+    function_call_part: types.FunctionCall,
+    verbose: bool = False,
+    cache: Optional["ToolResultCache"] = None,
+) -> types.Content | str:
     """
     Call a function based on the function call part from the AI model.
 
     Args:
         function_call_part: The function call part from the AI model.
         verbose: Whether to print verbose output.
+        cache: The session's tool result cache, if any.
 
     Returns:
         A Content object with the function response or an error string.
@@ -47,18 +56,30 @@ def call_function(function_call_part: types.FunctionCall, verbose: bool = False)
     else:
         print(f" - Calling function: {function_call_part.name}")
 
-    # Dictionary mapping function names to their corresponding functions
-    function_map = {
-        "get_file_content": get_file_content,
-        "write_file": write_file,
-        "get_files_info": get_files_info,
-        "run_python_file": run_python_file
-    }
+    with span(function_call_part.name, "call_function"):
+        return dispatch_function_call(function_call_part, verbose, cache)
 
-    # Get the function from the dictionary
-    func = function_map.get(function_call_part.name)
 
-    if func is None:
+def dispatch_function_call(
+    function_call_part: types.FunctionCall,
+    verbose: bool = False,
+    cache: Optional["ToolResultCache"] = None,
+) -> types.Content | str:
+    """
+    Validate a function call and run it, or serve it from the cache.
+
+    Args:
+        function_call_part: The function call part from the AI model.
+        verbose: Whether to print verbose output.
+        cache: The session's tool result cache, if any.
+
+    Returns:
+        A Content object with the function response or an error string.
+    """
+    # Look up the tool in the registry
+    spec = registry.get(function_call_part.name)
+
+    if spec is None:
         return types.Content(
             role="tool",
             parts=[
@@ -77,11 +98,37 @@ def call_function(function_call_part: types.FunctionCall, verbose: bool = False)
         else:
             args_dict = function_call_part.args
 
-        # Add the working_directory argument
-        args_dict["working_directory"] = "./calculator"
+        # Check and convert the arguments before anything runs
+        try:
+            args_dict = spec.validate(args_dict)
+        except ToolArgumentError as e:
+            return types.Content(
+                role="tool",
+                parts=[
+                    types.Part.from_function_response(
+                        name=function_call_part.name,
+                        response={"error": f"Invalid arguments for {function_call_part.name}: {e}"},
+                    )
+                ],
+            )
 
-        # Call the function with the arguments
-        function_result = func(**args_dict)
+        # Serve repeated calls from the session cache while their files are unchanged
+        cache_key = cache.key(function_call_part.name, args_dict) if cache else None
+        if cache_key is not None:
+            function_result = cache.get(cache_key)
+            if verbose:
+                print(f"Cache {'miss' if function_result is None else 'hit'}: {function_call_part.name}")
+        else:
+            function_result = None
+
+        if function_result is None:
+            # Call the function with the arguments and the working_directory argument
+            with span(function_call_part.name, "tool") as tool_span:
+                function_result = spec.function(**args_dict, working_directory=WORKING_DIR)
+                tool_span.set(payload_chars=len(function_result) if isinstance(function_result, str) else 0)
+
+            if cache:
+                cache.record(function_call_part, cache_key, function_result)
         return types.Content(
             role="tool",
             parts=[
@@ -93,3 +140,317 @@ def call_function(function_call_part: types.FunctionCall, verbose: bool = False)
         )
     except Exception as e:
         return f"Error: {str(e)}"
+
+
+def touched_path(function_call_part: types.FunctionCall) -> Tuple[str, bool]:
+    """
+    Determine which path a function call operates on and whether it writes to it.
+
+    Args:
+        function_call_part: The function call part from the AI model.
+
+    Returns:
+        A tuple containing (absolute_path, is_write). The path is resolved like the
+        tools resolve it, through symlinks, so a link and its target are the same
+        path. Calls that execute code, such as run_python_file, can read and write
+        any file, so they are treated as writing the whole working directory.
+    """
+    args = function_call_part.args or {}
+    if isinstance(args, str):
+        try:
+            args = json.loads(args)
+        except ValueError:
+            args = {}
+
+    spec = registry.get(function_call_part.name)
+    working_dir = working_directory()
+    if spec is not None and spec.executes:
+        return working_dir.root, True
+
+    path = "."
+    arg_name = spec.path_argument if spec else None
+    if arg_name and isinstance(args.get(arg_name), str):
+        path = args[arg_name]
+
+    # Paths outside the working directory fail in the tool; they still need a key
+    abs_path = working_dir.resolve(path) or os.path.realpath(os.path.join(working_dir.root, path))
+    return abs_path, spec is not None and spec.writes
+
+
+def working_directory() -> Any:
+    """
+    Get the WorkingDirectory the tools resolve their paths with.
+
+    Imported on first use, so importing this module imports no functions module.
+
+    Returns:
+        The shared WorkingDirectory of WORKING_DIR.
+    """
+    from functions.helper_functions import get_working_directory
+
+    return get_working_directory(WORKING_DIR)
+
+
+def paths_conflict(first: Tuple[str, bool], second: Tuple[str, bool]) -> bool:
+    """
+    Check whether two function calls must run in the order the model requested them.
+
+    Calls conflict when they target the same path, or when one path contains the
+    other and at least one of the calls writes.
+
+    Args:
+        first: The (absolute_path, is_write) tuple of the earlier call.
+        second: The (absolute_path, is_write) tuple of the later call.
+
+    Returns:
+        True if the calls must not run concurrently.
+    """
+    first_path, first_writes = first
+    second_path, second_writes = second
+    if first_path == second_path:
+        return True
+    overlap = (
+        first_path.startswith(second_path + os.path.sep)
+        or second_path.startswith(first_path + os.path.sep)
+    )
+    return overlap and (first_writes or second_writes)
+
+
+class ToolResultCache:
+    """
+    Per-session cache of function results.
+
+    File reads and directory listings are keyed by the function name, the
+    normalized arguments and the mtime and size of the path they read, and are
+    invalidated when write_file or patch_file changes that path or a file below
+    it. Runs of run_python_file are keyed by a fingerprint of the whole working
+    directory and are only stored when the run itself left the directory unchanged.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty cache."""
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[Tuple[str, str, Any], Tuple[str, Any]] = {}
+        self._run_fingerprints: Dict[Tuple[str, str, Any], str] = {}
+        self._lock = threading.Lock()
+
+    def key(self, name: str, args: Dict[str, Any]) -> Optional[Tuple[str, str, Any]]:
+        """
+        Build the cache key of a function call.
+
+        Args:
+            name: The function name.
+            args: The arguments from the AI model.
+
+        Returns:
+            The cache key, or None if the call cannot be cached.
+        """
+        spec = registry.get(name)
+        if spec is None or not spec.cacheable:
+            return None
+
+        normalized = {
+            arg: os.path.normpath(value) if arg == spec.path_argument and isinstance(value, str) else value
+            for arg, value in args.items()
+            if arg != "working_directory"
+        }
+        normalized_args = json.dumps(normalized, sort_keys=True, default=str)
+        abs_path, _ = touched_path(types.FunctionCall(name=name, args=args))
+
+        if spec.executes:
+            return name, normalized_args, working_directory_fingerprint()
+        try:
+            stat = os.stat(abs_path)
+        except OSError:
+            return None
+        return name, normalized_args, (stat.st_mtime_ns, stat.st_size)
+
+    def get(self, key: Tuple[str, str, Any]) -> Optional[Any]:
+        """
+        Look up a cached result and update the hit and miss counters.
+
+        Args:
+            key: The cache key.
+
+        Returns:
+            The cached result, or None on a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def record(self, function_call_part: types.FunctionCall, key: Optional[Tuple[str, str, Any]], result: Any) -> None:
+        """
+        Store a fresh result and drop the entries it made stale.
+
+        Args:
+            function_call_part: The function call that produced the result.
+            key: The cache key computed before the call, or None if it is not cacheable.
+            result: The function result.
+        """
+        abs_path, _ = touched_path(function_call_part)
+        spec = registry.get(function_call_part.name)
+        if spec is not None and spec.writes:
+            self.invalidate(abs_path)
+        if key is None or (isinstance(result, str) and result.startswith("Error")):
+            return
+
+        if spec is not None and spec.executes and working_directory_fingerprint() != key[2]:
+            # The run changed the working directory, so it is not repeatable and
+            # earlier reads may now be stale
+            self.invalidate(working_directory().root)
+            return
+
+        with self._lock:
+            self._entries[key] = (abs_path, result)
+
+    def invalidate(self, abs_path: str) -> None:
+        """
+        Drop the entries that read a path, a directory containing it or a file below it.
+
+        Args:
+            abs_path: The absolute path that changed.
+        """
+        with self._lock:
+            self._entries = {
+                key: entry
+                for key, entry in self._entries.items()
+                if entry[0] != abs_path
+                and not abs_path.startswith(entry[0] + os.path.sep)
+                and not entry[0].startswith(abs_path + os.path.sep)
+            }
+
+    def summary(self) -> str:
+        """
+        Describe the cache counters.
+
+        Returns:
+            A one-line summary of cache hits and misses.
+        """
+        return f"Tool cache: {self.hits} hits, {self.misses} misses"
+
+
+def working_directory_fingerprint() -> str:
+    """
+    Fingerprint the files of the working directory by path, mtime and size.
+
+    Compiled bytecode caches are ignored, since running a script creates them.
+
+    Returns:
+        A hex digest that changes whenever a file is added, removed or modified.
+    """
+    digest = hashlib.sha1()
+    for root, dirs, files in os.walk(WORKING_DIR):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        for file_name in sorted(files):
+            try:
+                stat = os.stat(os.path.join(root, file_name))
+            except OSError:
+                continue
+            digest.update(f"{root}/{file_name}:{stat.st_mtime_ns}:{stat.st_size}\n".encode())
+    return digest.hexdigest()
+
+
+class ToolCallDispatcher:
+    """
+    Run the function calls requested in one model turn concurrently.
+
+    Calls are submitted in the order the model requested them. Each call waits for
+    every earlier call it conflicts with, so reads and writes of the same path keep
+    their order while independent calls run at the same time on a thread pool.
+    """
+
+    def __init__(
+        self,
+        verbose: bool = False,
+        max_workers: int = MAX_TOOL_WORKERS,
+        cache: Optional[ToolResultCache] = None,
+    ) -> None:
+        """
+        Initialize the dispatcher.
+
+        Args:
+            verbose: Whether to print verbose output.
+            max_workers: The maximum number of function calls running at once.
+            cache: The session's tool result cache, if any.
+        """
+        self.verbose = verbose
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._submitted: List[Tuple[Tuple[str, bool], Future]] = []
+
+    def submit(self, function_call_part: types.FunctionCall) -> Future:
+        """
+        Schedule a function call after the earlier calls it conflicts with.
+
+        Args:
+            function_call_part: The function call part from the AI model.
+
+        Returns:
+            A Future resolving to the result of call_function.
+        """
+        touched = touched_path(function_call_part)
+        dependencies = [
+            future for earlier, future in self._submitted if paths_conflict(earlier, touched)
+        ]
+        # The executor starts tasks in submission order, so every dependency has
+        # already been picked up by a worker before this call can start waiting on it.
+        # Run in a copy of the caller's context, so the call's spans stay with its session
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, self._run, function_call_part, dependencies)
+        self._submitted.append((touched, future))
+        return future
+
+    def _run(self, function_call_part: types.FunctionCall, dependencies: List[Future]) -> Any:
+        """Wait for the conflicting earlier calls, then call the function."""
+        wait(dependencies)
+        return call_function(function_call_part, self.verbose, self.cache)
+
+    def results(self) -> List[Any]:
+        """
+        Wait for all submitted calls.
+
+        Returns:
+            The results of the submitted calls, in submission order.
+        """
+        return [future.result() for _, future in self._submitted]
+
+    def close(self) -> None:
+        """Shut down the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "ToolCallDispatcher":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+def call_functions(
+    function_call_parts: Sequence[types.FunctionCall],
+    verbose: bool = False,
+    cache: Optional[ToolResultCache] = None,
+) -> List[types.Content | str]:
+    """
+    Call several functions concurrently, keeping calls on the same path in order.
+
+    Args:
+        function_call_parts: The function call parts from the AI model.
+        verbose: Whether to print verbose output.
+        cache: The session's tool result cache, if any.
+
+    Returns:
+        The results of call_function, in the order the calls were requested.
+    """
+    if len(function_call_parts) == 1:
+        return [call_function(function_call_parts[0], verbose, cache)]
+
+    with ToolCallDispatcher(verbose, cache=cache) as dispatcher:
+        for function_call_part in function_call_parts:
+            dispatcher.submit(function_call_part)
+        return dispatcher.results()
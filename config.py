@@ -7,3 +7,38 @@ This module defines constants used throughout the application.
 MAX_CHARS = 10000
 WORKING_DIR = "./calculator"
 MAX_ITERS = 20
+MAX_TOOL_WORKERS = 8
+MODEL_NAME = "gemini-2.0-flash-001"
+HISTORY_TOKEN_BUDGET = 30000
+HISTORY_KEEP_RECENT_TURNS = 4
+HISTORY_TOOL_OUTPUT_CHARS = 500
+RESPONSE_CACHE_DIR = ".response_cache"
+RESPONSE_CACHE_MAX_BYTES = 100 * 1024 * 1024
+PYTHON_WORKER_POOL_SIZE = 2
+PYTHON_WORKER_MAX_RUNS = 50
+PYTHON_WORKER_PRELOAD = ("unittest", "pkg", "pkg.calculator", "pkg.render")
+RUN_OUTPUT_HEAD_BYTES = 4096
+RUN_OUTPUT_TAIL_BYTES = 4096
+RUN_OUTPUT_MAX_BYTES = 10 * 1024 * 1024
+RUN_TIMEOUT = 30
+SANDBOX_CPU_SECONDS = 10
+SANDBOX_MEMORY_BYTES = 512 * 1024 * 1024
+SANDBOX_MAX_OPEN_FILES = 64
+SANDBOX_MAX_PROCESSES = 256
+FILES_INFO_MAX_ENTRIES = 500
+LINE_INDEX_CACHE_FILES = 32
+SEARCH_MAX_FILE_BYTES = 1024 * 1024
+SEARCH_MAX_RESULTS = 100
+SEARCH_CONTEXT_LINES = 2
+FILES_CONTENT_MAX_CHARS = 30000
+FILES_CONTENT_MAX_FILES = 50
+FILES_CONTENT_WORKERS = 8
+PATH_CACHE_SIZE = 4096
+IMPORT_REPORT_TOP_MODULES = 15
+BATCH_CONCURRENCY = 16
+RATE_LIMIT_RPM = 0
+RATE_LIMIT_TPM = 1000000
+RATE_LIMIT_BURST = 0.1
+RETRY_MAX_RETRIES = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 60.0
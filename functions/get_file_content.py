@@ -7,40 +7,138 @@ accessing files outside the allowed scope.
 """
 
 import os
-from typing import Any
+from typing import Any, Optional
 
 from google.genai import types
 
-from functions.helper_functions import extract_absolute_paths
+from config import MAX_CHARS
+from functions.helper_functions import get_working_directory
+from functions.line_index import line_indexes
 
 
-def get_file_content(working_directory: str, file_path: str) -> str:
+def read_byte_range(abs_file_path: str, file_path: str, offset: int, length: int) -> str:
+    """
+    Read a range of bytes with a single seek.
+
+    Args:
+        abs_file_path: The absolute path of the file.
+        file_path: The path as given by the caller, for messages.
+        offset: The byte offset to start reading at.
+        length: The number of bytes to read, at most MAX_CHARS.
+
+    Returns:
+        The decoded bytes, followed by a note if the file continues past the range.
+    """
+    length = min(length, MAX_CHARS)
+    size = os.path.getsize(abs_file_path)
+    if offset > size:
+        return f'Error: offset {offset} is past the end of "{file_path}" ({size} bytes)'
+
+    with open(abs_file_path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+
+    content = data.decode(errors="replace")
+    end = offset + len(data)
+    if end < size:
+        content += f'\n[...File "{file_path}" continues at offset={end} of {size} bytes]'
+    return content
+
+
+def read_line_range(abs_file_path: str, file_path: str, start_line: int, end_line: Optional[int]) -> str:
+    """
+    Read a range of lines, seeking straight to the first one using the file's cached line index.
+
+    Args:
+        abs_file_path: The absolute path of the file.
+        file_path: The path as given by the caller, for messages.
+        start_line: The 1-based first line to read.
+        end_line: The 1-based last line to read, inclusive. None reads up to MAX_CHARS characters.
+
+    Returns:
+        The lines, followed by a note if they were cut at MAX_CHARS characters.
+    """
+    index = line_indexes.get(abs_file_path)
+    start = index.line_start(start_line)
+    if start is None:
+        return f'Error: start_line {start_line} is past the end of "{file_path}"'
+    end = index.line_start(end_line + 1) if end_line is not None else None
+    if end is None:
+        end = index.size
+
+    with open(abs_file_path, "rb") as f:
+        f.seek(start)
+        # Up to 4 bytes per character, so MAX_CHARS characters are always covered
+        data = f.read(min(end - start, MAX_CHARS * 4))
+
+    content = data.decode(errors="replace")
+    if len(content) > MAX_CHARS or start + len(data) < end:
+        content = content[:MAX_CHARS]
+        next_line = start_line + content.count("\n")
+        content += f'\n[...File "{file_path}" truncated at {MAX_CHARS} characters; continue with start_line={next_line}]'
+    return content
+
+
+def get_file_content(
+    working_directory: str,
+    file_path: str,
+    offset: Optional[int] = None,
+    length: Optional[int] = None,
+    start_line: Optional[int] = None,
+    end_line: Optional[int] = None,
+) -> str:
     """
     Read and return the content of a file within the permitted working directory.
 
+    Without a range the file is read from the start. A byte range is read with a
+    single seek; a line range seeks using a per-file index of line offsets, cached
+    until the file changes, so reading deep into a large file costs the same as
+    reading its head.
+
     Args:
         working_directory: The base directory that contains the file.
         file_path: The path to the file, relative to the working directory or absolute.
+        offset: The byte offset to start reading at.
+        length: The number of bytes to read from offset. Defaults to MAX_CHARS.
+        start_line: The 1-based first line to read. Cannot be combined with offset or length.
+        end_line: The 1-based last line to read, inclusive.
 
     Returns:
         The content of the file as a string, or an error message if the file cannot be read.
-        Files larger than 10000 characters will be truncated.
+        Content longer than MAX_CHARS characters will be truncated.
     """
     try:
-        abs_file_path, abs_working_dir = extract_absolute_paths(file_path, working_directory)
+        working_dir = get_working_directory(working_directory)
+        abs_file_path = working_dir.resolve(file_path)
 
         # Check if the file is within the permitted working directory
-        if not abs_file_path.startswith(abs_working_dir + os.path.sep) and abs_file_path != abs_working_dir:
+        if abs_file_path is None:
             return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory'
 
         # Check if the file_path exists and is a file
         if not os.path.isfile(abs_file_path):
             return f'Error: File not found or is not a regular file: "{file_path}"'
 
+        # Arguments from the model may arrive as floats
+        by_bytes = offset is not None or length is not None
+        by_lines = start_line is not None or end_line is not None
+        if by_bytes and by_lines:
+            return "Error: Use either offset/length or start_line/end_line, not both"
+        if by_bytes:
+            offset = int(offset or 0)
+            length = MAX_CHARS if length is None else int(length)
+            if offset < 0 or length < 0:
+                return "Error: offset and length must not be negative"
+            return read_byte_range(abs_file_path, file_path, offset, length)
+        if by_lines:
+            start_line = int(start_line or 1)
+            end_line = None if end_line is None else int(end_line)
+            if start_line < 1 or (end_line is not None and end_line < start_line):
+                return "Error: Lines are numbered from 1 and end_line must not be before start_line"
+            return read_line_range(abs_file_path, file_path, start_line, end_line)
+
         # Read the file and return its contents as a string
         # If the file is longer than MAX_CHARS, truncate it and append a message
-        MAX_CHARS = 10000
-
         with open(abs_file_path, "r") as f:
             file_content_string = f.read(MAX_CHARS)
             is_truncated = len(file_content_string) == MAX_CHARS
@@ -59,7 +157,7 @@ def get_file_content(working_directory: str, file_path: str) -> str:
 # Schema definition for the function to be used with Google's Generative AI API
 schema_get_file_content: types.FunctionDeclaration = types.FunctionDeclaration(
     name="get_file_content",
-    description="Read and return the content of a file within the permitted working directory, files larger than 10000 characters will be truncated.",
+    description=f"Read and return the content of a file within the permitted working directory, files larger than {MAX_CHARS} characters will be truncated. Pass offset/length (bytes) or start_line/end_line to read any part of a large file.",
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -70,7 +168,23 @@ schema_get_file_content: types.FunctionDeclaration = types.FunctionDeclaration(
             "file_path": types.Schema(
                 type=types.Type.STRING,
                 description="The path to the file, relative to the working directory or absolute.",
-            )
+            ),
+            "offset": types.Schema(
+                type=types.Type.INTEGER,
+                description="Optional byte offset to start reading at.",
+            ),
+            "length": types.Schema(
+                type=types.Type.INTEGER,
+                description=f"Optional number of bytes to read from offset, at most {MAX_CHARS}.",
+            ),
+            "start_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="Optional 1-based first line to read. Use instead of offset/length.",
+            ),
+            "end_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="Optional 1-based last line to read, inclusive.",
+            ),
         },
     ),
 )
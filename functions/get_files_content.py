@@ -0,0 +1,162 @@
+"""
+Batch file content retrieval module.
+
+This module provides functionality to read many files within a permitted
+working directory in one call, concurrently, sharing one character budget
+between them, with safeguards against accessing files outside the allowed scope.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from google.genai import types
+
+from config import FILES_CONTENT_MAX_CHARS, FILES_CONTENT_MAX_FILES, FILES_CONTENT_WORKERS
+from functions.helper_functions import get_working_directory
+from functions.ignore_rules import compile_glob, iter_tree
+
+
+def read_one(working_directory: str, file_path: str, max_chars: int) -> Tuple[str, bool]:
+    """
+    Read the start of one file within the permitted working directory.
+
+    Args:
+        working_directory: The base directory that contains the file.
+        file_path: The path to the file, relative to the working directory.
+        max_chars: The maximum number of characters to read.
+
+    Returns:
+        A tuple containing (content, is_error). The content holds at most
+        max_chars + 1 characters, so callers can tell whether the file is longer.
+    """
+    try:
+        working_dir = get_working_directory(working_directory)
+        abs_file_path = working_dir.resolve(file_path)
+
+        # Check if the file is within the permitted working directory
+        if abs_file_path is None:
+            return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory', True
+
+        # Check if the file_path exists and is a file
+        if not os.path.isfile(abs_file_path):
+            return f'Error: File not found or is not a regular file: "{file_path}"', True
+
+        with open(abs_file_path, "r") as f:
+            return f.read(max_chars + 1), False
+
+    except Exception as e:
+        return f"Error: {e}", True
+
+
+def share_budget(lengths: List[int], budget: int) -> List[int]:
+    """
+    Split a character budget between files by water-filling.
+
+    Files shorter than an equal share keep their full length, and what they leave
+    unused is shared equally by the longer files.
+
+    Args:
+        lengths: The length of each file.
+        budget: The total number of characters to return.
+
+    Returns:
+        The number of characters allotted to each file, in the same order.
+    """
+    allotted = [0] * len(lengths)
+    remaining = budget
+    pending = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    while pending:
+        share = remaining // len(pending)
+        i = pending.pop(0)
+        allotted[i] = min(lengths[i], share)
+        remaining -= allotted[i]
+    return allotted
+
+
+def get_files_content(
+    working_directory: str,
+    file_paths: Optional[List[str]] = None,
+    pattern: Optional[str] = None,
+) -> str:
+    """
+    Read several files within the permitted working directory in one call.
+
+    Files are read concurrently and share a budget of FILES_CONTENT_MAX_CHARS
+    characters: short files are returned whole and the rest of the budget is split
+    equally between the longer ones, which are truncated. A file that cannot be read
+    gets an error in its own section without failing the others.
+
+    Args:
+        working_directory: The base directory that contains the files.
+        file_paths: The paths of the files, relative to the working directory.
+        pattern: A glob selecting files, such as "pkg/*.py". Patterns without "/"
+                 match file names anywhere in the working directory. Files ignored
+                 by .gitignore are skipped.
+
+    Returns:
+        A section per file, headed "==> path <==", or an error message if no
+        files were selected.
+    """
+    try:
+        paths: List[str] = list(file_paths or [])
+        if pattern:
+            root = get_working_directory(working_directory).root
+            glob = compile_glob(pattern)
+            # Symlinks are skipped, since they may point outside the working directory
+            paths += [
+                rel_path
+                for rel_path, entry in iter_tree(root, None)
+                if entry.is_file(follow_symlinks=False) and glob.match(rel_path)
+            ]
+
+        # Drop duplicates, keeping the requested order
+        paths = list(dict.fromkeys(paths))
+        if not paths:
+            return "Error: No files selected; pass file_paths or a pattern matching at least one file"
+
+        skipped = len(paths) - FILES_CONTENT_MAX_FILES
+        paths = paths[:FILES_CONTENT_MAX_FILES]
+
+        with ThreadPoolExecutor(max_workers=min(FILES_CONTENT_WORKERS, len(paths))) as executor:
+            results = list(executor.map(
+                lambda file_path: read_one(working_directory, file_path, FILES_CONTENT_MAX_CHARS), paths
+            ))
+
+        # Errors are returned whole and take no part in the budget
+        lengths = [0 if is_error else len(content) for content, is_error in results]
+        allotted = share_budget(lengths, FILES_CONTENT_MAX_CHARS)
+
+        sections: List[str] = []
+        for file_path, (content, is_error), chars in zip(paths, results, allotted):
+            if not is_error and len(content) > chars:
+                content = content[:chars] + f'\n[...File "{file_path}" truncated at {chars} characters]'
+            sections.append(f"==> {file_path} <==\n{content}")
+
+        if skipped > 0:
+            sections.append(f"[...{skipped} more files not read; at most {FILES_CONTENT_MAX_FILES} files per call]")
+        return "\n".join(sections)
+
+    except Exception as e:
+        return f"Error: {e}"
+
+
+# Schema definition for the function to be used with Google's Generative AI API
+schema_get_files_content: types.FunctionDeclaration = types.FunctionDeclaration(
+    name="get_files_content",
+    description=f"Read several files within the permitted working directory in one call, given a list of paths and/or a glob. The files share a budget of {FILES_CONTENT_MAX_CHARS} characters; long files are truncated.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_paths": types.Schema(
+                type=types.Type.ARRAY,
+                items=types.Schema(type=types.Type.STRING),
+                description="The paths of the files to read, relative to the working directory.",
+            ),
+            "pattern": types.Schema(
+                type=types.Type.STRING,
+                description="Optional glob selecting files to read, such as 'pkg/*.py' or '*.py'.",
+            ),
+        },
+    ),
+)
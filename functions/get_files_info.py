@@ -11,7 +11,9 @@ from typing import Any, List, Optional
 
 from google.genai import types
 
-from functions.helper_functions import extract_absolute_paths
+from config import FILES_INFO_MAX_ENTRIES
+from functions.helper_functions import get_working_directory
+from functions.ignore_rules import compile_glob, iter_tree
 
 
 def formatter(file_name: str, file_size: int, is_dir: bool) -> str:
@@ -29,14 +31,32 @@ def formatter(file_name: str, file_size: int, is_dir: bool) -> str:
     return f"- {file_name}: file_size={file_size}, is_dir={is_dir}\n"
 
 
-def get_files_info(working_directory: str, directory: Optional[str] = None) -> str:
+def get_files_info(
+    working_directory: str,
+    directory: Optional[str] = None,
+    recursive: bool = False,
+    max_depth: Optional[int] = None,
+    pattern: Optional[str] = None,
+    offset: int = 0,
+    max_entries: int = FILES_INFO_MAX_ENTRIES,
+) -> str:
     """
     Get information about files in a directory within the permitted working directory.
 
+    Entries are read with os.scandir, so the type and size of each entry come from a
+    single stat. Entries matched by .gitignore files inside the listed tree are skipped.
+    Listings longer than max_entries end with a note giving the offset of the next page.
+
     Args:
         working_directory: The base directory that contains the target directory.
         directory: The path to the directory to list, relative to the working directory or absolute.
                   If None, defaults to the working directory itself.
+        recursive: Whether to list subdirectories too, with paths relative to the directory.
+        max_depth: The number of levels to list when recursive. None lists the whole tree.
+        pattern: A glob that listed entries must match. Patterns containing "/" are matched
+                 against the relative path, others against the entry name.
+        offset: The number of matching entries to skip, for paging.
+        max_entries: The maximum number of entries to list.
 
     Returns:
         A string containing information about each file in the directory,
@@ -47,32 +67,55 @@ def get_files_info(working_directory: str, directory: Optional[str] = None) -> s
         if directory is None:
             directory = "."
 
-        abs_directory, abs_working_dir = extract_absolute_paths(directory, working_directory)
+        working_dir = get_working_directory(working_directory)
+        abs_directory = working_dir.resolve(directory)
 
         # Check if the directory is outside the working directory
-        if not abs_directory.startswith(abs_working_dir + os.path.sep) and abs_directory != abs_working_dir:
+        if abs_directory is None:
             return f'Error: Cannot list "{directory}" as it is outside the permitted working directory'
 
         # Check if the directory exists and is a directory
         if not os.path.isdir(abs_directory):
             return f'Error: "{directory}" is not a directory'
 
-        # Use the absolute directory path for listing files
-        files = os.listdir(abs_directory)
+        # Arguments from the model may arrive as floats
+        offset = max(int(offset), 0)
+        max_entries = max(int(max_entries), 1)
+        if not recursive:
+            depth = 1
+        elif max_depth is None:
+            depth = None
+        else:
+            depth = max(int(max_depth), 1)
+
+        glob = compile_glob(pattern) if pattern else None
         contents: List[str] = []
-
-        for file_name in files:
-            # Create the full path for the file
-            file_path = os.path.join(abs_directory, file_name)
-
-            # Check if it's a directory
-            is_dir = os.path.isdir(file_path)
-
-            # Get the file size
-            file_size = os.path.getsize(file_path)
-
-            # Add the formatted information to contents
-            contents.append(formatter(file_name, file_size, is_dir))
+        matched = 0
+        unreadable: List[str] = []
+
+        for rel_path, entry in iter_tree(abs_directory, depth, unreadable=unreadable):
+            if glob and not glob.match(rel_path):
+                continue
+
+            matched += 1
+            if matched <= offset:
+                continue
+            if len(contents) == max_entries:
+                contents.append(f"[... more entries not shown; call again with offset={offset + max_entries} ...]\n")
+                break
+
+            # DirEntry caches its stat, so type and size cost at most one system call
+            is_dir = entry.is_dir()
+            try:
+                file_size = entry.stat().st_size
+            except OSError:
+                # A broken symlink
+                file_size = entry.stat(follow_symlinks=False).st_size
+            contents.append(formatter(rel_path, file_size, is_dir))
+
+        # Note the subdirectories whose contents could not be listed
+        for rel_path in unreadable:
+            contents.append(f'[... contents of "{rel_path}" not listed: the directory could not be read ...]\n')
 
         # Join all the formatted strings and return
         return ''.join(contents)
@@ -84,7 +127,7 @@ def get_files_info(working_directory: str, directory: Optional[str] = None) -> s
 # Schema definition for the function to be used with Google's Generative AI API
 schema_get_files_info: types.FunctionDeclaration = types.FunctionDeclaration(
     name="get_files_info",
-    description="Lists files in the specified directory along with their sizes, constrained to the working directory.",
+    description="Lists files in the specified directory along with their sizes, constrained to the working directory. Can list a whole tree in one call, filtered by a glob, skipping .gitignore'd files, in pages.",
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -92,6 +135,26 @@ schema_get_files_info: types.FunctionDeclaration = types.FunctionDeclaration(
                 type=types.Type.STRING,
                 description="The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
             ),
+            "recursive": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Whether to also list the contents of subdirectories, with paths relative to the directory. Defaults to false.",
+            ),
+            "max_depth": types.Schema(
+                type=types.Type.INTEGER,
+                description="When recursive, the number of directory levels to list. 1 lists only the directory itself. Defaults to the whole tree.",
+            ),
+            "pattern": types.Schema(
+                type=types.Type.STRING,
+                description="Optional glob such as '*.py' that listed entries must match. Patterns containing '/' are matched against the relative path.",
+            ),
+            "offset": types.Schema(
+                type=types.Type.INTEGER,
+                description="The number of entries to skip, to get the next page of a long listing. Defaults to 0.",
+            ),
+            "max_entries": types.Schema(
+                type=types.Type.INTEGER,
+                description=f"The maximum number of entries to list. Defaults to {FILES_INFO_MAX_ENTRIES}.",
+            ),
         },
     ),
 )
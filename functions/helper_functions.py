@@ -2,11 +2,17 @@
 Helper functions for file path operations.
 
 This module provides utility functions for handling file paths,
-including converting relative paths to absolute paths.
+including converting relative paths to absolute paths, resolving
+paths within a working directory, and writing files atomically.
 """
 
 import os
-from typing import Tuple
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config import PATH_CACHE_SIZE
 
 
 def extract_absolute_paths(file_path: str, working_directory: str) -> Tuple[str, str]:
@@ -31,3 +37,158 @@ def extract_absolute_paths(file_path: str, working_directory: str) -> Tuple[str,
     abs_file_path = os.path.abspath(full_file_path)
 
     return abs_file_path, abs_working_dir
+
+
+class WorkingDirectory:
+    """
+    A working directory whose root is resolved once, with memoized path validation.
+
+    Paths are resolved with os.path.realpath, so a symlink inside the working
+    directory that points outside it is rejected. Resolutions are cached until
+    invalidate() is called, which tools do after anything that may have created,
+    replaced or removed a symlink.
+    """
+
+    def __init__(self, working_directory: str, cache_size: int = PATH_CACHE_SIZE) -> None:
+        """
+        Resolve the root of the working directory.
+
+        Args:
+            working_directory: The working directory, relative to the current directory or absolute.
+            cache_size: The number of path resolutions kept.
+        """
+        self.root = os.path.realpath(working_directory)
+        self.cache_size = cache_size
+        self._resolved: "OrderedDict[str, Optional[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, file_path: str) -> Optional[str]:
+        """
+        Resolve a path and check that it stays within the working directory.
+
+        Args:
+            file_path: The path, relative to the working directory or absolute.
+
+        Returns:
+            The absolute path with all symlinks resolved, or None if it is outside
+            the working directory.
+        """
+        with self._lock:
+            if file_path in self._resolved:
+                self._resolved.move_to_end(file_path)
+                return self._resolved[file_path]
+
+        real_path = os.path.realpath(os.path.join(self.root, file_path))
+        if real_path != self.root and not real_path.startswith(self.root + os.path.sep):
+            real_path = None
+
+        with self._lock:
+            self._resolved[file_path] = real_path
+            while len(self._resolved) > self.cache_size:
+                self._resolved.popitem(last=False)
+        return real_path
+
+    def invalidate(self) -> None:
+        """Forget all cached resolutions."""
+        with self._lock:
+            self._resolved.clear()
+
+
+_working_directories: Dict[str, WorkingDirectory] = {}
+_working_directories_lock = threading.Lock()
+
+
+def get_working_directory(working_directory: str) -> WorkingDirectory:
+    """
+    Get the shared WorkingDirectory for a working directory path.
+
+    Args:
+        working_directory: The working directory, as passed to the tools.
+
+    Returns:
+        The WorkingDirectory, created on first use.
+    """
+    with _working_directories_lock:
+        resolver = _working_directories.get(working_directory)
+        if resolver is None:
+            resolver = _working_directories[working_directory] = WorkingDirectory(working_directory)
+        return resolver
+
+
+def atomic_write(abs_file_path: str, data: bytes) -> None:
+    """
+    Write a file atomically, so a crash mid-write never leaves it truncated.
+
+    The data is written and fsynced to a temporary file in the same directory,
+    which then replaces the target with os.replace. An existing file keeps its
+    permissions; a new file gets the default permissions for the current umask.
+
+    Args:
+        abs_file_path: The absolute path of the file to write.
+        data: The new content of the file.
+    """
+    directory = os.path.dirname(abs_file_path)
+    try:
+        mode: Optional[int] = os.stat(abs_file_path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = None
+
+    # Created like open() creates files, so the kernel applies the umask to a new file
+    # and the umask, which can only be read by changing it, is never read
+    while True:
+        temp_path = os.path.join(directory, f".{os.path.basename(abs_file_path)}.{secrets.token_hex(4)}.tmp")
+        try:
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600 if mode is not None else 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        if mode is not None:
+            os.chmod(temp_path, mode)
+        os.replace(temp_path, abs_file_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def count_changed_bytes(old: bytes, new: bytes) -> int:
+    """
+    Count the bytes changed between two versions of a file.
+
+    Args:
+        old: The previous content.
+        new: The new content.
+
+    Returns:
+        The length of the longer of the two differing spans left after
+        removing the common prefix and suffix.
+    """
+    limit = min(len(old), len(new))
+
+    # Binary search on slice comparisons, which run in C, rather than comparing byte by byte
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[:middle] == new[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    prefix = low
+
+    low, high = 0, limit - prefix
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[len(old) - middle:] == new[len(new) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+    suffix = low
+
+    return max(len(old), len(new)) - prefix - suffix
@@ -0,0 +1,214 @@
+"""
+Ignore rules module.
+
+This module provides a small .gitignore-style matcher used when walking the
+working directory, so generated and vendored files can be left out of listings
+and searches.
+"""
+
+import os
+import re
+from typing import List, Optional, Pattern, Tuple
+
+# Directories that are never listed or searched
+ALWAYS_IGNORED = (".git",)
+
+
+def translate_pattern(pattern: str) -> str:
+    """
+    Translate a gitignore glob into a regular expression matching relative paths.
+
+    Supports "*", "?", character classes and "**" spanning directories.
+
+    Args:
+        pattern: The glob, without negation, anchoring or trailing slash.
+
+    Returns:
+        A regular expression source string.
+    """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(pattern[i])
+                i += 1
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+def compile_glob(pattern: str) -> Pattern[str]:
+    """
+    Compile a glob filter for relative paths.
+
+    Patterns containing "/" must match the whole relative path, others only its last component.
+
+    Args:
+        pattern: The glob, such as "*.py" or "pkg/**/*.py".
+
+    Returns:
+        A compiled regular expression to use with match().
+    """
+    regex = translate_pattern(pattern.lstrip("/"))
+    if "/" not in pattern:
+        regex = "(?:.*/)?" + regex
+    return re.compile(regex + r"\Z")
+
+
+class IgnoreRules:
+    """
+    Gitignore-style rules collected from the .gitignore files of a directory tree.
+
+    Patterns without a slash match a name at any depth below the .gitignore that
+    declares them; patterns with a slash are anchored to that directory. A trailing
+    slash restricts a pattern to directories, a leading "!" re-includes a path, and
+    the last matching rule wins.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty rule set."""
+        # (base relative directory, regex, negated, directories only)
+        self.rules: List[Tuple[str, Pattern[str], bool, bool]] = []
+
+    def add_file(self, abs_directory: str, rel_directory: str) -> None:
+        """
+        Load the .gitignore of a directory, if it has one.
+
+        Args:
+            abs_directory: The absolute path of the directory.
+            rel_directory: The directory's path relative to the walk root, "" for the root.
+        """
+        try:
+            with open(os.path.join(abs_directory, ".gitignore"), "r") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        for line in lines:
+            self.add_pattern(line, rel_directory)
+
+    def add_pattern(self, line: str, rel_directory: str = "") -> None:
+        """
+        Add one .gitignore line.
+
+        Args:
+            line: The line, which may be blank or a comment.
+            rel_directory: The relative directory of the .gitignore declaring it.
+        """
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            return
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.strip("/") if dir_only else line
+        anchored = "/" in line
+        line = line.lstrip("/")
+
+        regex = translate_pattern(line)
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        self.rules.append((rel_directory, re.compile(regex + r"\Z"), negated, dir_only))
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """
+        Check whether a path is ignored.
+
+        Args:
+            rel_path: The path relative to the walk root, with "/" separators.
+            is_dir: Whether the path is a directory.
+
+        Returns:
+            True if the last matching rule ignores the path.
+        """
+        if os.path.basename(rel_path) in ALWAYS_IGNORED:
+            return True
+
+        ignored = False
+        for base, regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                candidate = rel_path[len(base) + 1:]
+            else:
+                candidate = rel_path
+            if regex.match(candidate):
+                ignored = not negated
+        return ignored
+
+
+def iter_tree(
+    abs_directory: str,
+    max_depth: Optional[int] = 1,
+    rules: Optional[IgnoreRules] = None,
+    rel_directory: str = "",
+    unreadable: Optional[List[str]] = None,
+):
+    """
+    Walk a directory tree with os.scandir, in sorted order, skipping ignored entries.
+
+    Entries are yielded before the contents of the directories they name, and
+    ignored directories are not descended into. .gitignore files found along the
+    way are added to the rules for their subtree. Subdirectories that cannot be
+    read, such as ones without permission, are skipped rather than failing the walk.
+
+    Args:
+        abs_directory: The absolute path of the directory to walk.
+        max_depth: The number of levels to walk; 1 lists only the directory itself.
+                   None walks the whole tree.
+        rules: The ignore rules of the walk. A new rule set is used if None.
+        rel_directory: The directory's path relative to the walk root, used when recursing.
+        unreadable: A list the relative paths of skipped subdirectories are appended to.
+
+    Yields:
+        Tuples of (relative_path, DirEntry) with "/" separated relative paths.
+
+    Raises:
+        OSError: If the walk root itself cannot be read.
+    """
+    if rules is None:
+        rules = IgnoreRules()
+    rules.add_file(abs_directory, rel_directory)
+
+    try:
+        with os.scandir(abs_directory) as scanner:
+            entries = sorted(scanner, key=lambda entry: entry.name)
+    except OSError:
+        if not rel_directory:
+            raise
+        if unreadable is not None:
+            unreadable.append(rel_directory)
+        return
+
+    for entry in entries:
+        rel_path = f"{rel_directory}/{entry.name}" if rel_directory else entry.name
+        is_dir = entry.is_dir()
+        if rules.is_ignored(rel_path, is_dir):
+            continue
+        yield rel_path, entry
+        if is_dir and not entry.is_symlink() and (max_depth is None or max_depth > 1):
+            yield from iter_tree(entry.path, None if max_depth is None else max_depth - 1, rules, rel_path, unreadable)
@@ -0,0 +1,109 @@
+"""
+Line offset index module.
+
+This module provides per-file indexes of the byte offsets at which lines start,
+so a range of lines deep inside a large file can be read with a single seek.
+Indexes are built lazily, only as far as the lines requested so far, and are
+cached per file until the file's mtime or size changes.
+"""
+
+import mmap
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from config import LINE_INDEX_CACHE_FILES
+
+
+class LineIndex:
+    """The byte offsets of the line starts of one file version, extended on demand."""
+
+    def __init__(self, abs_file_path: str, size: int) -> None:
+        """
+        Initialize an index that only knows the first line.
+
+        Args:
+            abs_file_path: The absolute path of the file.
+            size: The size of the file in bytes.
+        """
+        self.abs_file_path = abs_file_path
+        self.size = size
+        self.starts = array("Q", [0])
+        self.complete = size == 0
+        self._lock = threading.Lock()
+
+    def line_start(self, line: int) -> Optional[int]:
+        """
+        Get the byte offset at which a line starts.
+
+        Args:
+            line: The 1-based line number.
+
+        Returns:
+            The offset of the line's first byte, or None if the file has fewer lines.
+        """
+        with self._lock:
+            if len(self.starts) < line and not self.complete:
+                self._extend(line)
+        if len(self.starts) < line or self.starts[line - 1] >= self.size:
+            return None
+        return self.starts[line - 1]
+
+    def _extend(self, line: int) -> None:
+        """Scan the file for newlines until the start of line is known or the file ends."""
+        with open(self.abs_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # The file may have been replaced since it was stat'ed; the index is dropped on the next lookup
+            end = min(len(mm), self.size)
+            position = self.starts[-1]
+            while len(self.starts) < line:
+                newline = mm.find(b"\n", position, end)
+                if newline == -1:
+                    self.complete = True
+                    return
+                position = newline + 1
+                self.starts.append(position)
+
+
+class LineIndexCache:
+    """Least recently used cache of line indexes, validated against each file's mtime and size."""
+
+    def __init__(self, max_files: int = LINE_INDEX_CACHE_FILES) -> None:
+        """
+        Initialize an empty cache.
+
+        Args:
+            max_files: The number of file indexes kept.
+        """
+        self.max_files = max_files
+        self._indexes: "OrderedDict[str, Tuple[Tuple[int, int], LineIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, abs_file_path: str) -> LineIndex:
+        """
+        Get the index of a file, starting a new one if the file changed.
+
+        Args:
+            abs_file_path: The absolute path of the file.
+
+        Returns:
+            The line index of the file's current version.
+        """
+        stat = os.stat(abs_file_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._indexes.get(abs_file_path)
+            if cached is not None and cached[0] == version:
+                self._indexes.move_to_end(abs_file_path)
+                return cached[1]
+
+            index = LineIndex(abs_file_path, stat.st_size)
+            self._indexes[abs_file_path] = (version, index)
+            self._indexes.move_to_end(abs_file_path)
+            while len(self._indexes) > self.max_files:
+                self._indexes.popitem(last=False)
+            return index
+
+
+line_indexes = LineIndexCache()
@@ -0,0 +1,129 @@
+"""
+Bounded output capture module.
+
+This module provides buffers that keep only the head and tail of a process's
+output, so capturing a script that floods stdout or stderr uses a fixed amount
+of memory, and reports how much output was dropped in between.
+
+It has no dependencies outside the standard library, since warm workers import
+it before the working directory is on their path.
+"""
+
+import io
+import subprocess
+from typing import Any, List
+
+
+class OutputLimitExceeded(BaseException):
+    """
+    Raised inside a warm worker when a script exceeds the output limit.
+
+    Derives from BaseException so that scripts catching Exception cannot
+    swallow it and keep printing.
+    """
+
+
+class HeadTailBuffer:
+    """Keep the first head_bytes and the last tail_bytes written, counting the rest."""
+
+    def __init__(self, head_bytes: int, tail_bytes: int) -> None:
+        """
+        Initialize an empty buffer.
+
+        Args:
+            head_bytes: The number of bytes kept from the start of the output.
+            tail_bytes: The number of bytes kept from the end of the output.
+        """
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.total_bytes = 0
+        self._head = bytearray()
+        self._tail = bytearray()
+
+    def write(self, data: bytes) -> None:
+        """
+        Append output to the buffer.
+
+        Args:
+            data: The output bytes.
+        """
+        self.total_bytes += len(data)
+        room = self.head_bytes - len(self._head)
+        if room > 0:
+            self._head += data[:room]
+            data = data[room:]
+        if not data or not self.tail_bytes:
+            return
+
+        self._tail += data[-self.tail_bytes:]
+        excess = len(self._tail) - self.tail_bytes
+        if excess > 0:
+            del self._tail[:excess]
+
+    @property
+    def dropped_bytes(self) -> int:
+        """The number of bytes written but not kept."""
+        return self.total_bytes - len(self._head) - len(self._tail)
+
+    def getvalue(self) -> str:
+        """
+        Decode the kept output, marking where bytes were dropped.
+
+        Returns:
+            The head and tail of the output, with universal newlines as in text mode.
+        """
+        text = self._head.decode(errors="replace")
+        if self.dropped_bytes:
+            text += f"\n[... {self.dropped_bytes} bytes dropped ...]\n"
+        text += self._tail.decode(errors="replace")
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+class BoundedTextWriter(io.TextIOBase):
+    """
+    Text stream that writes into a HeadTailBuffer and enforces a shared output limit.
+
+    Used by warm workers in place of sys.stdout and sys.stderr.
+    """
+
+    def __init__(self, buffer: HeadTailBuffer, streams: List["BoundedTextWriter"], max_bytes: int) -> None:
+        """
+        Initialize the writer.
+
+        Args:
+            buffer: The buffer receiving the output.
+            streams: All writers sharing the output limit, including this one.
+            max_bytes: The combined output size above which the script is stopped.
+        """
+        self.buffer_ = buffer
+        self.streams = streams
+        self.max_bytes = max_bytes
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self.buffer_.write(text.encode(errors="replace"))
+        if sum(stream.buffer_.total_bytes for stream in self.streams) > self.max_bytes:
+            raise OutputLimitExceeded()
+        return len(text)
+
+
+class BoundedCompletedProcess(subprocess.CompletedProcess):
+    """
+    A CompletedProcess that also records whether the output limit stopped the process,
+    and the resources it used when they were measured.
+    """
+
+    def __init__(
+        self,
+        args: Any,
+        returncode: int,
+        stdout: str,
+        stderr: str,
+        output_limit_exceeded: bool = False,
+        resource_usage: Any = None,
+    ) -> None:
+        super().__init__(args, returncode, stdout, stderr)
+        self.output_limit_exceeded = output_limit_exceeded
+        self.resource_usage = resource_usage
@@ -0,0 +1,259 @@
+"""
+File patching module.
+
+This module provides functionality to change part of a file within a permitted
+working directory, by applying a unified diff or a list of search/replace edits,
+so small changes to large files do not require sending the whole file. Files are
+replaced atomically, and nothing is written unless every hunk or edit applies.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from functions.helper_functions import atomic_write, count_changed_bytes, get_working_directory
+
+HUNK_HEADER = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(Exception):
+    """Raised when a diff or edit cannot be applied."""
+
+
+def parse_unified_diff(diff: str) -> List[Tuple[int, List[str], List[str]]]:
+    """
+    Parse the hunks of a unified diff for a single file.
+
+    File headers ("---", "+++", "diff ...") before the first hunk are skipped. Blank
+    lines inside a hunk are taken as blank context lines, since they often lose their
+    leading space.
+
+    Args:
+        diff: The unified diff.
+
+    Returns:
+        A list of (old_start, old_lines, new_lines) tuples, with 1-based old_start and
+        lines without line endings.
+
+    Raises:
+        PatchError: If the diff contains no hunks or a hunk is malformed.
+    """
+    hunks: List[Tuple[int, List[str], List[str]]] = []
+    lines = diff.replace("\r\n", "\n").split("\n")
+    i = 0
+    while i < len(lines):
+        match = HUNK_HEADER.match(lines[i])
+        i += 1
+        if not match:
+            continue
+
+        old_start = int(match.group(1))
+        old_count = int(match.group(2)) if match.group(2) is not None else 1
+        new_count = int(match.group(4)) if match.group(4) is not None else 1
+        old_lines: List[str] = []
+        new_lines: List[str] = []
+
+        while (len(old_lines) < old_count or len(new_lines) < new_count) and i < len(lines):
+            line = lines[i]
+            i += 1
+            if line.startswith("\\"):
+                # "\ No newline at end of file"
+                continue
+            tag, text = (line[0], line[1:]) if line else (" ", "")
+            if tag == " ":
+                old_lines.append(text)
+                new_lines.append(text)
+            elif tag == "-":
+                old_lines.append(text)
+            elif tag == "+":
+                new_lines.append(text)
+            else:
+                raise PatchError(f"hunk {len(hunks) + 1}: unexpected line {line!r}")
+
+        if len(old_lines) != old_count or len(new_lines) != new_count:
+            raise PatchError(
+                f"hunk {len(hunks) + 1}: expected {old_count} old and {new_count} new lines, "
+                f"found {len(old_lines)} and {len(new_lines)}"
+            )
+        hunks.append((old_start, old_lines, new_lines))
+
+    if not hunks:
+        raise PatchError("the diff contains no hunks")
+    return hunks
+
+
+def apply_hunks(lines: List[str], hunks: List[Tuple[int, List[str], List[str]]]) -> List[str]:
+    """
+    Apply parsed hunks to the lines of a file.
+
+    Each hunk is applied where its header says, shifted by the net change of the
+    hunks before it. If its old lines are not found there, they are searched for
+    anywhere in the file and the closest occurrence is used.
+
+    Args:
+        lines: The lines of the file, without line endings.
+        hunks: The hunks returned by parse_unified_diff.
+
+    Returns:
+        The patched lines.
+
+    Raises:
+        PatchError: If the old lines of a hunk do not occur in the file.
+    """
+    result = list(lines)
+    shift = 0
+    for number, (old_start, old_lines, new_lines) in enumerate(hunks, 1):
+        # A hunk with no old lines inserts after line old_start
+        expected = old_start + shift - (1 if old_lines else 0)
+        size = len(old_lines)
+
+        if 0 <= expected <= len(result) and result[expected:expected + size] == old_lines:
+            position = expected
+        else:
+            positions = [p for p in range(len(result) - size + 1) if result[p:p + size] == old_lines]
+            if not positions:
+                raise PatchError(f"hunk {number} (line {old_start}) does not match the file")
+            position = min(positions, key=lambda p: abs(p - expected))
+
+        result[position:position + size] = new_lines
+        shift += len(new_lines) - size
+    return result
+
+
+def apply_edits(content: str, edits: List[Dict[str, Any]]) -> str:
+    """
+    Apply search/replace edits in order.
+
+    Args:
+        content: The content of the file.
+        edits: Dictionaries with "search" and "replace" strings. Each search string
+               must occur exactly once in the content left by the edits before it.
+
+    Returns:
+        The edited content.
+
+    Raises:
+        PatchError: If an edit is malformed or its search string is missing or ambiguous.
+    """
+    for number, edit in enumerate(edits, 1):
+        search = edit.get("search")
+        replace = edit.get("replace")
+        if not isinstance(search, str) or not search or not isinstance(replace, str):
+            raise PatchError(f"edit {number} needs a non-empty search string and a replace string")
+
+        count = content.count(search)
+        if count != 1:
+            problem = "was not found" if count == 0 else f"occurs {count} times; add surrounding lines to make it unique"
+            raise PatchError(f"edit {number}: the search text {problem}")
+        content = content.replace(search, replace, 1)
+    return content
+
+
+def patch_file(
+    working_directory: str,
+    file_path: str,
+    diff: Optional[str] = None,
+    edits: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """
+    Change part of a file within the permitted working directory.
+
+    Args:
+        working_directory: The base directory that contains the file.
+        file_path: The path to the file, relative to the working directory or absolute.
+        diff: A unified diff of the file. A diff adding lines to an empty file can create it.
+        edits: Search/replace edits, as dictionaries with "search" and "replace" strings.
+
+    Returns:
+        A success message with the number of bytes changed, or an error message.
+        Nothing is written unless the whole patch applies.
+    """
+    try:
+        working_dir = get_working_directory(working_directory)
+        abs_file_path = working_dir.resolve(file_path)
+
+        # Check if the file is within the permitted working directory
+        if abs_file_path is None:
+            return f'Error: Cannot patch "{file_path}" as it is outside the permitted working directory'
+
+        if (diff is None) == (edits is None):
+            return "Error: Pass either diff or edits"
+
+        try:
+            with open(abs_file_path, "rb") as f:
+                old_data = f.read()
+        except FileNotFoundError:
+            if edits is not None:
+                return f'Error: File not found: "{file_path}"'
+            old_data = b""
+
+        content = old_data.decode()
+        try:
+            if edits is not None:
+                new_content = apply_edits(content, list(edits))
+                applied = f"{len(edits)} edits"
+            else:
+                hunks = parse_unified_diff(diff)
+                # Split on the file's own line ending only, keeping other control characters intact
+                newline = "\r\n" if "\r\n" in content else "\n"
+                lines = content.split(newline) if content else []
+                trailing = not content or content.endswith(newline)
+                if content and trailing:
+                    lines.pop()
+                new_lines = apply_hunks(lines, hunks)
+                new_content = newline.join(new_lines) + (newline if trailing and new_lines else "")
+                applied = f"{len(hunks)} hunks"
+        except PatchError as e:
+            return f'Error: Cannot patch "{file_path}": {e}. The file was not changed.'
+
+        # Check if the directory for the file exists and create it if not
+        directory = os.path.dirname(abs_file_path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        new_data = new_content.encode()
+        atomic_write(abs_file_path, new_data)
+
+        return f'Successfully patched "{file_path}" ({applied} applied, {count_changed_bytes(old_data, new_data)} bytes changed)'
+
+    except Exception as e:
+        return f"Error: {e}"
+
+
+# Schema definition for the function to be used with Google's Generative AI API
+schema_patch_file: types.FunctionDeclaration = types.FunctionDeclaration(
+    name="patch_file",
+    description="Change part of a file within the permitted working directory by applying a unified diff or search/replace edits, instead of rewriting the whole file with write_file. Nothing is written unless the whole patch applies.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_path": types.Schema(
+                type=types.Type.STRING,
+                description="The path to the file, relative to the working directory.",
+            ),
+            "diff": types.Schema(
+                type=types.Type.STRING,
+                description="A unified diff of the file, with @@ -start,count +start,count @@ hunk headers. Use either diff or edits.",
+            ),
+            "edits": types.Schema(
+                type=types.Type.ARRAY,
+                description="Search/replace edits applied in order. Each search text must occur exactly once in the file.",
+                items=types.Schema(
+                    type=types.Type.OBJECT,
+                    properties={
+                        "search": types.Schema(
+                            type=types.Type.STRING,
+                            description="The exact text to replace, including enough surrounding lines to be unique.",
+                        ),
+                        "replace": types.Schema(
+                            type=types.Type.STRING,
+                            description="The text to put in its place.",
+                        ),
+                    },
+                ),
+            ),
+        },
+    ),
+)
@@ -0,0 +1,177 @@
+"""
+Warm Python worker process.
+
+This script is started by PythonWorkerPool as a long-lived interpreter that
+imports commonly used modules once and then runs Python files on request, each
+in a fresh __main__ namespace, so repeated runs skip interpreter startup.
+
+Usage: python python_worker.py <working_directory> [module_to_preload ...]
+
+Requests are read from the original stdin and responses written to the original
+stdout, one JSON object per line. File descriptors 0 and 1 are then pointed at
+/dev/null and stderr, so the files being run cannot read or corrupt the protocol.
+"""
+
+import contextlib
+import importlib
+import json
+import os
+import runpy
+import signal
+import sys
+import traceback
+from typing import Any, Dict
+
+# Imported from this script's directory, before the working directory replaces it on sys.path
+from output_buffer import BoundedTextWriter, HeadTailBuffer, OutputLimitExceeded
+
+
+def module_mtimes(working_directory: str) -> Dict[str, int]:
+    """
+    Collect the source mtimes of the imported modules that live in the working directory.
+
+    Args:
+        working_directory: The absolute working directory.
+
+    Returns:
+        A dictionary mapping module names to the mtime of their source file, or -1
+        if the file no longer exists.
+    """
+    mtimes = {}
+    for name, module in list(sys.modules.items()):
+        file_name = getattr(module, "__file__", None)
+        if not file_name or not os.path.abspath(file_name).startswith(working_directory + os.path.sep):
+            continue
+        try:
+            mtimes[name] = os.stat(file_name).st_mtime_ns
+        except OSError:
+            mtimes[name] = -1
+    return mtimes
+
+
+def purge_stale_modules(working_directory: str, known_mtimes: Dict[str, int]) -> None:
+    """
+    Forget the working directory's modules if any of their sources changed since import.
+
+    All of them are dropped together, since modules importing a changed module
+    hold references to its old version.
+
+    Args:
+        working_directory: The absolute working directory.
+        known_mtimes: The source mtimes recorded when the modules were imported,
+                      updated in place.
+    """
+    current = module_mtimes(working_directory)
+    if all(current.get(name) == mtime for name, mtime in known_mtimes.items()):
+        return
+    for name in current:
+        sys.modules.pop(name, None)
+    known_mtimes.clear()
+
+
+def run_file(abs_file_path: str, working_directory: str, head_bytes: int, tail_bytes: int, max_bytes: int) -> Dict[str, Any]:
+    """
+    Run a Python file as __main__ and capture the head and tail of its output.
+
+    Args:
+        abs_file_path: The absolute path of the file to run.
+        working_directory: The absolute working directory.
+        head_bytes: The number of bytes kept from the start of each stream.
+        tail_bytes: The number of bytes kept from the end of each stream.
+        max_bytes: The combined output size at which the run is stopped.
+
+    Returns:
+        A dictionary with the captured stdout, stderr, the exit code and whether
+        the output limit stopped the run.
+    """
+    streams: list = []
+    stdout = BoundedTextWriter(HeadTailBuffer(head_bytes, tail_bytes), streams, max_bytes)
+    stderr = BoundedTextWriter(HeadTailBuffer(head_bytes, tail_bytes), streams, max_bytes)
+    streams.extend([stdout, stderr])
+    returncode = 0
+    output_limit_exceeded = False
+    saved_argv, saved_path0 = sys.argv, sys.path[0]
+    sys.argv = [abs_file_path]
+    sys.path[0] = os.path.dirname(abs_file_path)
+
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                try:
+                    runpy.run_path(abs_file_path, run_name="__main__")
+                except OutputLimitExceeded:
+                    raise
+                except SystemExit as e:
+                    if e.code is None:
+                        returncode = 0
+                    elif isinstance(e.code, int):
+                        returncode = e.code
+                    else:
+                        print(e.code, file=sys.stderr)
+                        returncode = 1
+                except BaseException as e:
+                    # Report the traceback the way the interpreter would, starting at the file's own frame
+                    tb = e.__traceback__
+                    while tb and tb.tb_frame.f_code.co_filename != abs_file_path:
+                        tb = tb.tb_next
+                    traceback.print_exception(type(e), e, tb)
+                    returncode = 1
+            except OutputLimitExceeded:
+                # Report the run like a child process killed for flooding its output, also
+                # when the limit is reached while reporting how the file exited
+                output_limit_exceeded = True
+                returncode = -signal.SIGKILL
+    finally:
+        sys.argv = saved_argv
+        sys.path[0] = saved_path0
+        os.chdir(working_directory)
+
+    return {
+        "stdout": stdout.buffer_.getvalue(),
+        "stderr": stderr.buffer_.getvalue(),
+        "returncode": returncode,
+        "output_limit_exceeded": output_limit_exceeded,
+    }
+
+
+def main() -> None:
+    """Preload modules, then serve run requests until stdin is closed."""
+    requests = os.fdopen(os.dup(0), "r")
+    protocol = os.fdopen(os.dup(1), "w")
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+    sys.stdin = open(os.devnull, "r")
+
+    working_directory = os.path.abspath(sys.argv[1])
+    os.chdir(working_directory)
+    # Replace this script's directory, as if the interpreter had started in the working directory
+    sys.path[0] = working_directory
+
+    for name in sys.argv[2:]:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            pass
+    known_mtimes = module_mtimes(working_directory)
+
+    for line in requests:
+        request = json.loads(line)
+        purge_stale_modules(working_directory, known_mtimes)
+        response = run_file(
+            request["file_path"],
+            working_directory,
+            request["head_bytes"],
+            request["tail_bytes"],
+            request["max_bytes"],
+        )
+        for name, mtime in module_mtimes(working_directory).items():
+            known_mtimes.setdefault(name, mtime)
+
+        protocol.write(json.dumps(response) + "\n")
+        protocol.flush()
+
+
+if __name__ == "__main__":
+    main()
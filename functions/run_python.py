@@ -7,12 +7,151 @@ executing files outside the allowed scope.
 """
 
 import os
+import selectors
+import signal
 import subprocess
-from typing import Any
+import threading
+import time
+from typing import Any, List, Optional, Tuple
 
 from google.genai import types
 
-from functions.helper_functions import extract_absolute_paths
+from config import RUN_OUTPUT_HEAD_BYTES, RUN_OUTPUT_MAX_BYTES, RUN_OUTPUT_TAIL_BYTES, RUN_TIMEOUT
+from functions.helper_functions import get_working_directory
+from functions.output_buffer import BoundedCompletedProcess, HeadTailBuffer
+from functions.sandbox import ResourceUsage, SandboxLimits, get_sandbox_limits
+from functions.worker_pool import WorkerError, get_worker_pool
+
+# Size of each read from the child's pipes
+READ_CHUNK_BYTES = 64 * 1024
+
+
+def wait_with_usage(process: subprocess.Popen, deadline: float) -> Tuple[int, Optional[ResourceUsage]]:
+    """
+    Wait for a child process and collect the resources it used.
+
+    Args:
+        process: The child process.
+        deadline: The time.monotonic() value after which to stop waiting.
+
+    Returns:
+        A tuple containing (returncode, resource_usage). The usage is None on
+        platforms without os.wait4.
+
+    Raises:
+        subprocess.TimeoutExpired: If the child is still running at the deadline.
+    """
+    if not hasattr(os, "wait4") or not hasattr(os, "waitid"):
+        return process.wait(timeout=max(deadline - time.monotonic(), 0)), None
+
+    # Block until the child exits, killing it at the deadline
+    timed_out = threading.Event()
+
+    def kill() -> None:
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(max(deadline - time.monotonic(), 0), kill)
+    timer.start()
+    try:
+        # Wait without reaping, so the timer can never signal a reused pid
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+    finally:
+        timer.cancel()
+        timer.join()
+
+    _, status, rusage = os.wait4(process.pid, 0)
+    # Record the exit status so Popen does not try to reap the child again
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if timed_out.is_set() and process.returncode == -signal.SIGKILL:
+        raise subprocess.TimeoutExpired(process.args, 0)
+    return process.returncode, ResourceUsage.from_rusage(rusage)
+
+
+def run_with_bounded_output(
+    args: List[str],
+    cwd: str,
+    timeout: float,
+    head_bytes: int = RUN_OUTPUT_HEAD_BYTES,
+    tail_bytes: int = RUN_OUTPUT_TAIL_BYTES,
+    max_bytes: int = RUN_OUTPUT_MAX_BYTES,
+    limits: Optional[SandboxLimits] = None,
+) -> BoundedCompletedProcess:
+    """
+    Run a command, reading its output incrementally into bounded head and tail buffers.
+
+    Memory use stays flat no matter how much the child prints. A child whose combined
+    output exceeds max_bytes is killed early. The child's peak RSS and CPU time are
+    recorded on the result.
+
+    Args:
+        args: The command to run.
+        cwd: The working directory of the command.
+        timeout: The number of seconds the command may run.
+        head_bytes: The number of bytes kept from the start of each stream.
+        tail_bytes: The number of bytes kept from the end of each stream.
+        max_bytes: The combined output size at which the child is killed.
+        limits: The sandbox limits to apply to the child, if any.
+
+    Returns:
+        A BoundedCompletedProcess with the decoded stdout and stderr.
+
+    Raises:
+        subprocess.TimeoutExpired: If the command runs longer than timeout.
+    """
+    deadline = time.monotonic() + timeout
+    process = subprocess.Popen(
+        limits.command(args) if limits else args,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    buffers = {
+        process.stdout: HeadTailBuffer(head_bytes, tail_bytes),
+        process.stderr: HeadTailBuffer(head_bytes, tail_bytes),
+    }
+    output_limit_exceeded = False
+
+    try:
+        with selectors.DefaultSelector() as selector:
+            for pipe in buffers:
+                selector.register(pipe, selectors.EVENT_READ)
+
+            while selector.get_map() and not output_limit_exceeded:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(args, timeout)
+                for key, _ in selector.select(remaining):
+                    data = os.read(key.fd, READ_CHUNK_BYTES)
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        continue
+                    buffers[key.fileobj].write(data)
+
+                if sum(buffer.total_bytes for buffer in buffers.values()) > max_bytes:
+                    output_limit_exceeded = True
+                    process.kill()
+
+        try:
+            returncode, resource_usage = wait_with_usage(process, deadline)
+        except subprocess.TimeoutExpired:
+            raise subprocess.TimeoutExpired(args, timeout)
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        process.stdout.close()
+        process.stderr.close()
+
+    return BoundedCompletedProcess(
+        args,
+        returncode,
+        buffers[process.stdout].getvalue(),
+        buffers[process.stderr].getvalue(),
+        output_limit_exceeded,
+        resource_usage,
+    )
 
 
 def run_python_file(working_directory: str, file_path: str) -> str:
@@ -21,7 +160,12 @@ def run_python_file(working_directory: str, file_path: str) -> str:
 
     This function runs a Python file specified by file_path within the context of 
     the working_directory. It captures and returns the standard output, standard error,
-    and exit code of the executed Python process.
+    and exit code of the executed Python process. When a warm worker pool is enabled,
+    the file runs on a pre-started interpreter instead of a new one; a file that ends
+    that interpreter itself is run again on a new one. Only the head and
+    tail of each stream are kept, and a process flooding its output is killed early.
+    In sandbox mode the process runs under resource limits, and its peak RSS and CPU
+    time are reported with the output.
 
     Args:
         working_directory (str): The directory to use as the working directory for execution.
@@ -36,12 +180,12 @@ def run_python_file(working_directory: str, file_path: str) -> str:
     Raises:
         No exceptions are raised as they are caught and returned as error messages.
     """
-    TIMEOUT = 30
     try:
-        abs_file_path, abs_working_dir = extract_absolute_paths(file_path, working_directory)
+        working_dir = get_working_directory(working_directory)
+        abs_file_path = working_dir.resolve(file_path)
 
         # Check if the file is within the permitted working directory
-        if not abs_file_path.startswith(abs_working_dir + os.path.sep) and abs_file_path != abs_working_dir:
+        if abs_file_path is None:
             return f'Error: Cannot execute "{file_path}" as it is outside the permitted working directory'
 
         # Check if the file_path exists and is a file
@@ -53,7 +197,29 @@ def run_python_file(working_directory: str, file_path: str) -> str:
             return f'Error: "{file_path}" is not a Python file.'
 
         try:
-            result = subprocess.run(["python", abs_file_path], cwd=abs_working_dir, capture_output=True, timeout=TIMEOUT, text=True)
+            sandbox_limits = get_sandbox_limits()
+            worker_pool = get_worker_pool()
+            deadline = time.monotonic() + RUN_TIMEOUT
+            result = None
+            try:
+                if worker_pool is not None and sandbox_limits is None:
+                    try:
+                        result = worker_pool.run(working_dir.root, abs_file_path, RUN_TIMEOUT)
+                    except WorkerError:
+                        # The script ended the worker itself, with os._exit, a crash or an
+                        # abort, losing the output the worker had captured. Run it again on a
+                        # new interpreter, which reports its output and exit code as usual.
+                        pass
+                if result is None:
+                    result = run_with_bounded_output(
+                        ["python", abs_file_path],
+                        cwd=working_dir.root,
+                        timeout=max(deadline - time.monotonic(), 0),
+                        limits=sandbox_limits,
+                    )
+            finally:
+                # The script may have created or replaced symlinks
+                working_dir.invalidate()
 
             # Format the output
             output_parts = []
@@ -70,6 +236,16 @@ def run_python_file(working_directory: str, file_path: str) -> str:
             if result.returncode != 0:
                 output_parts.append(f"Process exited with code {result.returncode}")
 
+            # Explain why a runaway process was stopped
+            if result.output_limit_exceeded:
+                output_parts.append(f"Process killed after exceeding the output limit of {RUN_OUTPUT_MAX_BYTES} bytes")
+
+            if sandbox_limits is not None:
+                if result.returncode == -signal.SIGXCPU:
+                    output_parts.append(f"Process stopped by the sandbox CPU time limit of {sandbox_limits.cpu_seconds} s")
+                if result.resource_usage is not None:
+                    output_parts.append(result.resource_usage.describe())
+
             # If no output was produced
             if not output_parts:
                 return "No output produced."
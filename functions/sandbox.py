@@ -0,0 +1,150 @@
+"""
+Sandbox module for Python file execution.
+
+This module provides per-run resource limits for the processes started by
+run_python_file, and the measurement of the resources a run actually used, so
+one runaway script cannot starve the other agent sessions on the host.
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from config import (
+    SANDBOX_CPU_SECONDS,
+    SANDBOX_MAX_OPEN_FILES,
+    SANDBOX_MAX_PROCESSES,
+    SANDBOX_MEMORY_BYTES,
+)
+
+# Applies the limits given as arguments, then replaces itself with the command that
+# follows them, which inherits the limits across exec
+LAUNCHER = """
+import os, resource, sys
+cpu_seconds, memory_bytes, max_open_files, max_processes = map(int, sys.argv[1:5])
+resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+resource.setrlimit(resource.RLIMIT_NOFILE, (max_open_files, max_open_files))
+resource.setrlimit(resource.RLIMIT_NPROC, (max_processes, max_processes))
+os.execvp(sys.argv[5], sys.argv[5:])
+"""
+
+
+@dataclass(frozen=True)
+class SandboxLimits:
+    """
+    Resource limits applied to each sandboxed run.
+
+    max_processes limits the number of processes of the user running the agent,
+    not just the child's own descendants, since that is what RLIMIT_NPROC counts.
+    It is not enforced for root.
+    """
+
+    cpu_seconds: int = SANDBOX_CPU_SECONDS
+    memory_bytes: int = SANDBOX_MEMORY_BYTES
+    max_open_files: int = SANDBOX_MAX_OPEN_FILES
+    max_processes: int = SANDBOX_MAX_PROCESSES
+
+    def command(self, args: List[str]) -> List[str]:
+        """
+        Wrap a command so it runs under the limits.
+
+        The limits are applied by a launcher interpreter that then execs the command,
+        rather than by a preexec_fn, which is unsafe in a process with threads. The
+        hard CPU limit is one second above the soft one, so the child gets SIGXCPU
+        rather than an indistinguishable SIGKILL. The launcher's own startup counts
+        towards the CPU limit.
+
+        Args:
+            args: The command to run.
+
+        Returns:
+            The command that runs args under the limits.
+
+        Raises:
+            RuntimeError: If resource limits are not supported on this platform.
+        """
+        if resource is None:
+            raise RuntimeError("sandbox mode requires the resource module, which is not available on this platform")
+
+        limits = [self.cpu_seconds, self.memory_bytes, self.max_open_files, self.max_processes]
+        return [sys.executable, "-c", LAUNCHER, *(str(limit) for limit in limits), *args]
+
+
+@dataclass(frozen=True)
+class ResourceUsage:
+    """Resources used by a finished child process."""
+
+    peak_rss_bytes: int
+    cpu_seconds: float
+
+    @classmethod
+    def from_rusage(cls, rusage: "resource.struct_rusage") -> "ResourceUsage":
+        """
+        Build the usage from the rusage returned by os.wait4.
+
+        Args:
+            rusage: The child's resource usage.
+
+        Returns:
+            The peak resident set size and the user plus system CPU time.
+        """
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return cls(rusage.ru_maxrss * scale, rusage.ru_utime + rusage.ru_stime)
+
+    def describe(self) -> str:
+        """
+        Describe the usage for the model.
+
+        Returns:
+            A one-line summary of the peak RSS and CPU time.
+        """
+        return f"Resource usage: peak RSS {self.peak_rss_bytes / (1024 * 1024):.1f} MB, CPU time {self.cpu_seconds:.2f} s"
+
+
+_sandbox_limits: Optional[SandboxLimits] = None
+
+
+def enable_sandbox(limits: Optional[SandboxLimits] = None) -> SandboxLimits:
+    """
+    Make run_python_file apply resource limits to every run.
+
+    Sandboxed runs always start a new interpreter, bypassing any warm worker pool,
+    since limits cannot be lifted from a process once applied.
+
+    Args:
+        limits: The limits to apply. Defaults to the limits configured in config.py.
+
+    Returns:
+        The enabled limits.
+
+    Raises:
+        RuntimeError: If resource limits are not supported on this platform.
+    """
+    global _sandbox_limits
+    limits = limits or SandboxLimits()
+    limits.command([])
+    _sandbox_limits = limits
+    return limits
+
+
+def disable_sandbox() -> None:
+    """Stop applying resource limits to runs."""
+    global _sandbox_limits
+    _sandbox_limits = None
+
+
+def get_sandbox_limits() -> Optional[SandboxLimits]:
+    """
+    Get the enabled sandbox limits.
+
+    Returns:
+        The limits applied to each run, or None if sandbox mode is off.
+    """
+    return _sandbox_limits
@@ -0,0 +1,213 @@
+"""
+Code search module.
+
+This module provides functionality to search the text files within a permitted
+working directory for a string or regular expression, returning the matching
+lines with surrounding context in a single call.
+"""
+
+import os
+import re
+from typing import List, Optional
+
+from google.genai import types
+
+from config import MAX_CHARS, SEARCH_CONTEXT_LINES, SEARCH_MAX_RESULTS
+from functions.helper_functions import get_working_directory
+from functions.ignore_rules import compile_glob
+from functions.search_index import get_search_index
+
+
+def format_matches(rel_path: str, lines: List[str], matches: List[int], context_lines: int) -> List[str]:
+    """
+    Format the matching lines of a file grep-style, merging overlapping context.
+
+    Matching lines are written as "path:line: text", context lines as "path-line- text",
+    and non-adjacent groups are separated by "--".
+
+    Args:
+        rel_path: The path of the file, relative to the working directory.
+        lines: The lines of the file.
+        matches: The 0-based indexes of the matching lines, in order.
+        context_lines: The number of lines shown before and after each match.
+
+    Returns:
+        The formatted groups.
+    """
+    groups: List[str] = []
+    matching = set(matches)
+    start = end = None
+    for index in matches + [None]:
+        if index is not None and end is not None and index - context_lines <= end + 1:
+            end = min(index + context_lines, len(lines) - 1)
+            continue
+        if start is not None:
+            groups.append("".join(
+                f"{rel_path}{':' if i in matching else '-'}{i + 1}{':' if i in matching else '-'} {lines[i]}\n"
+                for i in range(start, end + 1)
+            ))
+        if index is not None:
+            start = max(index - context_lines, 0)
+            end = min(index + context_lines, len(lines) - 1)
+    return groups
+
+
+def search_files(
+    working_directory: str,
+    pattern: str,
+    directory: Optional[str] = None,
+    glob: Optional[str] = None,
+    regex: bool = False,
+    case_sensitive: bool = True,
+    context_lines: int = SEARCH_CONTEXT_LINES,
+    max_results: int = SEARCH_MAX_RESULTS,
+) -> str:
+    """
+    Search the files within the permitted working directory for matching lines.
+
+    Plain-string searches only read the files that contain every trigram of the
+    pattern, according to an index of the working directory whose searched directory
+    is refreshed by mtime before each search. Files ignored by .gitignore, binary files and very
+    large files are not searched.
+
+    Args:
+        working_directory: The base directory to search.
+        pattern: The string, or regular expression if regex is set, to search for.
+        directory: The directory to search in, relative to the working directory.
+                  If None, searches the whole working directory.
+        glob: A glob that searched files must match, such as "*.py". Patterns
+              containing "/" are matched against the path relative to directory.
+        regex: Whether pattern is a regular expression.
+        case_sensitive: Whether matching is case sensitive.
+        context_lines: The number of lines shown before and after each match.
+        max_results: The maximum number of matching lines returned.
+
+    Returns:
+        The matching lines with context, paths relative to the working directory,
+        or an error message if the search cannot be run.
+    """
+    try:
+        if not pattern:
+            return "Error: pattern must not be empty"
+
+        # If directory is None, use "." to represent the current directory
+        if directory is None:
+            directory = "."
+
+        working_dir = get_working_directory(working_directory)
+        abs_directory = working_dir.resolve(directory)
+
+        # Check if the directory is outside the working directory
+        if abs_directory is None:
+            return f'Error: Cannot search "{directory}" as it is outside the permitted working directory'
+
+        # Check if the directory exists and is a directory
+        if not os.path.isdir(abs_directory):
+            return f'Error: "{directory}" is not a directory'
+
+        try:
+            matcher = re.compile(pattern if regex else re.escape(pattern), 0 if case_sensitive else re.IGNORECASE)
+        except re.error as e:
+            return f"Error: Invalid regular expression: {e}"
+
+        # Arguments from the model may arrive as floats
+        context_lines = max(int(context_lines), 0)
+        max_results = max(int(max_results), 1)
+
+        prefix = os.path.relpath(abs_directory, working_dir.root).replace(os.path.sep, "/")
+        prefix = "" if prefix == "." else prefix + "/"
+        file_glob = compile_glob(glob) if glob else None
+
+        index = get_search_index(working_dir.root)
+        with index.lock:
+            index.refresh(prefix.rstrip("/"))
+            # Regular expressions have no required literal to look up
+            candidates = index.candidates(None if regex else pattern)
+
+        output: List[str] = []
+        output_chars = 0
+        match_count = 0
+        file_count = 0
+        truncated = False
+
+        for rel_path in candidates:
+            if not rel_path.startswith(prefix):
+                continue
+            if file_glob and not file_glob.match(rel_path[len(prefix):]):
+                continue
+
+            try:
+                with open(os.path.join(working_dir.root, rel_path), "r", errors="replace") as f:
+                    lines = f.read().splitlines()
+            except OSError:
+                continue
+
+            matches = [i for i, line in enumerate(lines) if matcher.search(line)]
+            if not matches:
+                continue
+            if match_count + len(matches) > max_results:
+                matches = matches[:max_results - match_count]
+                truncated = True
+
+            file_count += 1
+            match_count += len(matches)
+            for group in format_matches(rel_path, lines, matches, context_lines):
+                if output_chars + len(group) > MAX_CHARS:
+                    truncated = True
+                    break
+                output.append(group)
+                output_chars += len(group)
+            if truncated:
+                break
+
+        if not match_count:
+            return f'No matches found for "{pattern}"'
+
+        result = f"Found {match_count} matching lines in {file_count} files:\n" + "--\n".join(output)
+        if truncated:
+            result += "[...Search stopped early; narrow it with directory or glob, or raise max_results]"
+        return result
+
+    except Exception as e:
+        return f"Error: {e}"
+
+
+# Schema definition for the function to be used with Google's Generative AI API
+schema_search_files: types.FunctionDeclaration = types.FunctionDeclaration(
+    name="search_files",
+    description="Search the files in the working directory for a string or regular expression, returning each matching line with surrounding context. Much cheaper than listing and reading files one by one to find a symbol.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "pattern": types.Schema(
+                type=types.Type.STRING,
+                description="The text to search for. Treated as a plain string unless regex is true.",
+            ),
+            "directory": types.Schema(
+                type=types.Type.STRING,
+                description="Optional directory to search in, relative to the working directory. Defaults to the whole working directory.",
+            ),
+            "glob": types.Schema(
+                type=types.Type.STRING,
+                description="Optional glob such as '*.py' that searched files must match.",
+            ),
+            "regex": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Whether pattern is a Python regular expression. Defaults to false.",
+            ),
+            "case_sensitive": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Whether matching is case sensitive. Defaults to true.",
+            ),
+            "context_lines": types.Schema(
+                type=types.Type.INTEGER,
+                description=f"The number of lines shown before and after each match. Defaults to {SEARCH_CONTEXT_LINES}.",
+            ),
+            "max_results": types.Schema(
+                type=types.Type.INTEGER,
+                description=f"The maximum number of matching lines returned. Defaults to {SEARCH_MAX_RESULTS}.",
+            ),
+        },
+        required=["pattern"],
+    ),
+)
@@ -0,0 +1,291 @@
+"""
+Code search index module.
+
+This module provides a trigram index of the text files in a working directory.
+A search only reads the files containing every trigram of its query. Before each
+search, the searched directory is refreshed: directories whose mtime and ignore
+rules are unchanged are not listed again, and files are read again only when
+their mtime or size changed.
+"""
+
+import os
+import threading
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+from config import SEARCH_MAX_FILE_BYTES
+from functions.ignore_rules import IgnoreRules
+
+# Number of leading bytes checked for NUL bytes to detect binary files
+BINARY_CHECK_BYTES = 8192
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Get the case-folded trigrams of a text.
+
+    Args:
+        text: The text.
+
+    Returns:
+        The set of all three-character substrings of the lowercased text.
+    """
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class DirectoryListing(NamedTuple):
+    """The indexed entries of one directory, as of its last listing."""
+
+    mtime_ns: int
+    # Versions of the .gitignore files of the directory and those above it, which decide what is listed
+    rules_version: Tuple[Optional[Tuple[int, int]], ...]
+    ignore_lines: Tuple[str, ...]
+    files: Tuple[str, ...]
+    subdirectories: Tuple[str, ...]
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigrams to the files of a directory tree that contain them.
+
+    Files ignored by .gitignore rules are skipped. Binary files and files larger
+    than max_file_bytes are tracked, so they are not read again until they change,
+    but never returned as candidates.
+    """
+
+    def __init__(self, abs_root: str, max_file_bytes: int = SEARCH_MAX_FILE_BYTES) -> None:
+        """
+        Initialize an empty index.
+
+        Args:
+            abs_root: The absolute path of the indexed directory.
+            max_file_bytes: The size above which files are not indexed.
+        """
+        self.abs_root = abs_root
+        self.max_file_bytes = max_file_bytes
+        # Relative path -> ((mtime_ns, size), trigrams, or None if the file is not searchable)
+        self.files: Dict[str, Tuple[Tuple[int, int], Optional[FrozenSet[str]]]] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        # Relative directory, "" for the root -> its entries as of its last listing
+        self.directories: Dict[str, DirectoryListing] = {}
+        self.lock = threading.Lock()
+
+    def refresh(self, rel_directory: str = "") -> int:
+        """
+        Bring the index of a directory's subtree up to date.
+
+        A directory is listed again only when its mtime, which changes as entries are
+        added, removed or renamed, or the .gitignore files that apply to it changed.
+        The files of the other directories are only stat'ed.
+
+        Args:
+            rel_directory: The directory to refresh, relative to the indexed directory
+                           with "/" separators. Defaults to the whole tree.
+
+        Returns:
+            The number of files (re)indexed or dropped.
+        """
+        parts = rel_directory.split("/") if rel_directory else []
+        rules = IgnoreRules()
+        rules_version: Tuple[Optional[Tuple[int, int]], ...] = ()
+        seen: Set[str] = set()
+        seen_directories: Set[str] = set()
+
+        # Apply the rules of the directories above, which may ignore the directory itself
+        ancestor = ""
+        ignored = False
+        for name in parts:
+            ignore_version, ignore_lines = self._ignore_file(ancestor)
+            for line in ignore_lines:
+                rules.add_pattern(line, ancestor)
+            rules_version += (ignore_version,)
+            ancestor = f"{ancestor}/{name}" if ancestor else name
+            if rules.is_ignored(ancestor, True):
+                ignored = True
+                break
+
+        changed = 0
+        if not ignored:
+            changed += self._refresh_directory(rel_directory, rules, rules_version, seen, seen_directories)
+
+        prefix = rel_directory + "/" if rel_directory else ""
+        for rel_path in [rel_path for rel_path in self.files if rel_path.startswith(prefix) and rel_path not in seen]:
+            self._remove(rel_path)
+            del self.files[rel_path]
+            changed += 1
+        for rel_path in [rel_path for rel_path in self.directories if rel_path == rel_directory or rel_path.startswith(prefix)]:
+            if rel_path not in seen_directories:
+                del self.directories[rel_path]
+        return changed
+
+    def candidates(self, literal: Optional[str] = None) -> List[str]:
+        """
+        Get the searchable files that may contain a literal, ignoring case.
+
+        Args:
+            literal: A string every match contains, or None to get all searchable files.
+
+        Returns:
+            The sorted relative paths of the candidate files.
+        """
+        query = trigrams(literal) if literal else set()
+        if not query:
+            return sorted(rel_path for rel_path, (_, file_trigrams) in self.files.items() if file_trigrams is not None)
+
+        # Intersect the smallest posting lists first
+        postings = sorted((self.postings.get(trigram, set()) for trigram in query), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            result &= posting
+        return sorted(result)
+
+    def _refresh_directory(
+        self,
+        rel_directory: str,
+        rules: IgnoreRules,
+        rules_version: Tuple[Optional[Tuple[int, int]], ...],
+        seen: Set[str],
+        seen_directories: Set[str],
+    ) -> int:
+        """Refresh a directory and those below it, collecting the paths still present."""
+        abs_directory = os.path.join(self.abs_root, rel_directory) if rel_directory else self.abs_root
+        try:
+            mtime_ns = os.stat(abs_directory).st_mtime_ns
+        except OSError:
+            return 0
+
+        ignore_version, ignore_lines = self._ignore_file(rel_directory)
+        for line in ignore_lines:
+            rules.add_pattern(line, rel_directory)
+        rules_version += (ignore_version,)
+
+        listing = self.directories.get(rel_directory)
+        if listing is None or listing.mtime_ns != mtime_ns or listing.rules_version != rules_version:
+            listing = self._list_directory(abs_directory, rel_directory, rules, mtime_ns, rules_version, ignore_lines)
+            if listing is None:
+                return 0
+            self.directories[rel_directory] = listing
+        seen_directories.add(rel_directory)
+
+        changed = 0
+        for name in listing.files:
+            rel_path = f"{rel_directory}/{name}" if rel_directory else name
+            abs_path = os.path.join(abs_directory, name)
+            try:
+                stat = os.stat(abs_path, follow_symlinks=False)
+            except OSError:
+                continue
+            version = (stat.st_mtime_ns, stat.st_size)
+            seen.add(rel_path)
+            cached = self.files.get(rel_path)
+            if cached is not None and cached[0] == version:
+                continue
+
+            self._remove(rel_path)
+            file_trigrams = self._read_trigrams(abs_path, stat.st_size)
+            self.files[rel_path] = (version, file_trigrams)
+            for trigram in file_trigrams or ():
+                self.postings.setdefault(trigram, set()).add(rel_path)
+            changed += 1
+
+        for name in listing.subdirectories:
+            rel_path = f"{rel_directory}/{name}" if rel_directory else name
+            changed += self._refresh_directory(rel_path, rules, rules_version, seen, seen_directories)
+        return changed
+
+    def _list_directory(
+        self,
+        abs_directory: str,
+        rel_directory: str,
+        rules: IgnoreRules,
+        mtime_ns: int,
+        rules_version: Tuple[Optional[Tuple[int, int]], ...],
+        ignore_lines: Tuple[str, ...],
+    ) -> Optional[DirectoryListing]:
+        """List the files and subdirectories of a directory that are not ignored, or None if it cannot be read."""
+        try:
+            with os.scandir(abs_directory) as scanner:
+                entries = sorted(scanner, key=lambda entry: entry.name)
+        except OSError:
+            return None
+
+        files: List[str] = []
+        subdirectories: List[str] = []
+        for entry in entries:
+            rel_path = f"{rel_directory}/{entry.name}" if rel_directory else entry.name
+            is_dir = entry.is_dir()
+            # Symlinks are skipped, since they may point outside the indexed directory
+            if rules.is_ignored(rel_path, is_dir) or entry.is_symlink():
+                continue
+            if is_dir:
+                subdirectories.append(entry.name)
+            elif entry.is_file(follow_symlinks=False):
+                files.append(entry.name)
+        return DirectoryListing(mtime_ns, rules_version, ignore_lines, tuple(files), tuple(subdirectories))
+
+    def _ignore_file(self, rel_directory: str) -> Tuple[Optional[Tuple[int, int]], Tuple[str, ...]]:
+        """Get the (mtime_ns, size) and lines of a directory's .gitignore, reading it only if it changed."""
+        abs_directory = os.path.join(self.abs_root, rel_directory) if rel_directory else self.abs_root
+        path = os.path.join(abs_directory, ".gitignore")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, ()
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        listing = self.directories.get(rel_directory)
+        if listing is not None and listing.rules_version and listing.rules_version[-1] == version:
+            return version, listing.ignore_lines
+        try:
+            with open(path, "r") as f:
+                return version, tuple(f.read().splitlines())
+        except OSError:
+            return None, ()
+
+    def _read_trigrams(self, abs_file_path: str, size: int) -> Optional[FrozenSet[str]]:
+        """Read the trigrams of a file, or None if it is too large, binary or unreadable."""
+        if size > self.max_file_bytes:
+            return None
+        try:
+            with open(abs_file_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if b"\0" in data[:BINARY_CHECK_BYTES]:
+            return None
+        return frozenset(trigrams(data.decode(errors="replace")))
+
+    def _remove(self, rel_path: str) -> None:
+        """Remove a file from the posting lists."""
+        cached = self.files.get(rel_path)
+        if cached is None or cached[1] is None:
+            return
+        for trigram in cached[1]:
+            posting = self.postings.get(trigram)
+            if posting is not None:
+                posting.discard(rel_path)
+                if not posting:
+                    del self.postings[trigram]
+
+
+_indexes: Dict[str, TrigramIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(abs_root: str) -> TrigramIndex:
+    """
+    Get the index of a directory, kept for the lifetime of the process.
+
+    Args:
+        abs_root: The absolute path of the directory.
+
+    Returns:
+        The directory's index. Callers refresh it under its lock before searching.
+    """
+    with _indexes_lock:
+        index = _indexes.get(abs_root)
+        if index is None:
+            index = _indexes[abs_root] = TrigramIndex(abs_root)
+        return index
@@ -0,0 +1,103 @@
+"""
+Unit tests for the get_file_content module.
+
+This module contains tests for byte-range and line-range reads and the line offset index.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from config import MAX_CHARS
+from functions.get_file_content import get_file_content
+from functions.line_index import LineIndexCache
+
+
+class TestGetFileContent(unittest.TestCase):
+    """Test suite for the get_file_content function."""
+
+    def setUp(self) -> None:
+        """Create a file of numbered lines."""
+        self.working_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.working_dir, "big.log")
+        with open(self.file_path, "w") as f:
+            f.writelines(f"line {i}\n" for i in range(1, 60001))
+
+    def tearDown(self) -> None:
+        """Remove the file."""
+        shutil.rmtree(self.working_dir)
+
+    def test_default_read_is_truncated(self) -> None:
+        """Test that an unranged read keeps the original truncation message."""
+        result = get_file_content(self.working_dir, "big.log")
+        self.assertTrue(result.startswith("line 1\nline 2\n"))
+        self.assertTrue(result.endswith(f'[...File "big.log" truncated at {MAX_CHARS} characters]'))
+
+    def test_line_range(self) -> None:
+        """Test that a line range deep in the file is returned exactly."""
+        result = get_file_content(self.working_dir, "big.log", start_line=50000, end_line=50200)
+        lines = result.splitlines()
+        self.assertEqual(lines[0], "line 50000")
+        self.assertEqual(lines[-1], "line 50200")
+        self.assertEqual(len(lines), 201)
+
+    def test_line_range_is_paged(self) -> None:
+        """Test that an open-ended line range is cut at MAX_CHARS with the next start_line."""
+        result = get_file_content(self.working_dir, "big.log", start_line=10)
+        self.assertIn("continue with start_line=", result)
+        next_line = int(result.rsplit("start_line=", 1)[1].rstrip("]"))
+        self.assertTrue(get_file_content(self.working_dir, "big.log", start_line=next_line).startswith(f"line {next_line}"))
+
+    def test_line_past_end(self) -> None:
+        """Test that a start_line past the end of the file is an error."""
+        self.assertTrue(get_file_content(self.working_dir, "big.log", start_line=60001).startswith("Error:"))
+        self.assertEqual(get_file_content(self.working_dir, "big.log", start_line=60000), "line 60000\n")
+
+    def test_byte_range(self) -> None:
+        """Test that offset and length read a byte range and report where the file continues."""
+        result = get_file_content(self.working_dir, "big.log", offset=7, length=7)
+        self.assertTrue(result.startswith("line 2\n"))
+        self.assertIn("continues at offset=14", result)
+
+    def test_mixed_ranges_rejected(self) -> None:
+        """Test that byte and line ranges cannot be combined."""
+        self.assertTrue(get_file_content(self.working_dir, "big.log", offset=0, start_line=1).startswith("Error:"))
+
+    def test_index_follows_file_changes(self) -> None:
+        """Test that a rewritten file gets a new index."""
+        get_file_content(self.working_dir, "big.log", start_line=3, end_line=3)
+        with open(self.file_path, "w") as f:
+            f.write("a\nb\nc-changed\n")
+        self.assertEqual(get_file_content(self.working_dir, "big.log", start_line=3, end_line=3), "c-changed\n")
+
+
+class TestLineIndexCache(unittest.TestCase):
+    """Test suite for the LineIndexCache class."""
+
+    def test_lru_bound_and_lazy_scan(self) -> None:
+        """Test that indexes are only extended as far as needed and the cache is bounded."""
+        working_dir = tempfile.mkdtemp()
+        try:
+            paths = []
+            for i in range(3):
+                path = os.path.join(working_dir, f"f{i}.txt")
+                with open(path, "w") as f:
+                    f.write("x\n" * 100)
+                paths.append(path)
+
+            cache = LineIndexCache(max_files=2)
+            index = cache.get(paths[0])
+            self.assertEqual(index.line_start(5), 8)
+            self.assertEqual(len(index.starts), 5)
+            self.assertIs(cache.get(paths[0]), index)
+
+            cache.get(paths[1])
+            cache.get(paths[2])
+            self.assertIsNot(cache.get(paths[0]), index)
+        finally:
+            shutil.rmtree(working_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
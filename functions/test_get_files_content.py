@@ -0,0 +1,70 @@
+"""
+Unit tests for the get_files_content module.
+
+This module contains tests for batch reads and the shared character budget.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from functions import get_files_content as batch
+from functions.get_files_content import get_files_content, share_budget
+
+
+class TestShareBudget(unittest.TestCase):
+    """Test suite for the share_budget function."""
+
+    def test_short_files_kept_whole(self) -> None:
+        """Test that short files keep their length and long files split the rest."""
+        self.assertEqual(share_budget([10, 500, 1000], 310), [10, 150, 150])
+        self.assertEqual(share_budget([10, 20], 100), [10, 20])
+        self.assertEqual(share_budget([], 100), [])
+
+
+class TestGetFilesContent(unittest.TestCase):
+    """Test suite for the get_files_content function."""
+
+    def setUp(self) -> None:
+        """Create a few files."""
+        self.working_dir = tempfile.mkdtemp()
+        for rel_path, content in [("pkg/a.py", "a = 1\n"), ("pkg/b.py", "b = 2\n"), ("big.txt", "x" * 5000)]:
+            path = os.path.join(self.working_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(content)
+
+    def tearDown(self) -> None:
+        """Remove the files."""
+        shutil.rmtree(self.working_dir)
+
+    def test_paths_and_errors(self) -> None:
+        """Test that each file gets a section and errors do not fail the others."""
+        result = get_files_content(self.working_dir, ["pkg/a.py", "missing.py", "../outside.py"])
+        self.assertIn("==> pkg/a.py <==\na = 1\n", result)
+        self.assertIn('==> missing.py <==\nError: File not found', result)
+        self.assertIn("==> ../outside.py <==\nError: Cannot read", result)
+
+    def test_glob(self) -> None:
+        """Test that a glob selects files, merged with explicit paths without duplicates."""
+        result = get_files_content(self.working_dir, ["pkg/b.py"], pattern="pkg/*.py")
+        self.assertEqual(result.count("==> pkg/b.py <=="), 1)
+        self.assertIn("==> pkg/a.py <==", result)
+        self.assertNotIn("big.txt", result)
+
+    def test_shared_budget(self) -> None:
+        """Test that long files are truncated to their share of the budget."""
+        with mock.patch.object(batch, "FILES_CONTENT_MAX_CHARS", 1012):
+            result = get_files_content(self.working_dir, pattern="*")
+        self.assertIn("a = 1\n", result)
+        self.assertIn('[...File "big.txt" truncated at 1000 characters]', result)
+
+    def test_nothing_selected(self) -> None:
+        """Test that an empty selection is an error."""
+        self.assertTrue(get_files_content(self.working_dir, pattern="*.rs").startswith("Error: No files selected"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit tests for the get_files_info module.
+
+This module contains tests for recursive listing, glob filters, ignore rules and paging.
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from functions.get_files_info import get_files_info
+from functions.ignore_rules import IgnoreRules
+
+
+class TestGetFilesInfo(unittest.TestCase):
+    """Test suite for the get_files_info function."""
+
+    def setUp(self) -> None:
+        """Create a small tree with a .gitignore."""
+        self.working_dir = tempfile.mkdtemp()
+        for rel_path in ["main.py", "pkg/calc.py", "pkg/deep/util.py", "pkg/notes.txt", "build/out.py", "debug.log"]:
+            path = os.path.join(self.working_dir, rel_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write("x" * 10)
+        with open(os.path.join(self.working_dir, ".gitignore"), "w") as f:
+            f.write("# generated\nbuild/\n*.log\n")
+
+    def tearDown(self) -> None:
+        """Remove the tree."""
+        shutil.rmtree(self.working_dir)
+
+    def test_unreadable_subdirectory_is_skipped(self) -> None:
+        """Test that a subdirectory that cannot be read is noted instead of failing the listing."""
+        unreadable = os.path.join(self.working_dir, "pkg", "deep")
+        scandir = os.scandir
+
+        def failing_scandir(path):
+            if path == unreadable:
+                raise PermissionError(13, "Permission denied", path)
+            return scandir(path)
+
+        with mock.patch("functions.ignore_rules.os.scandir", failing_scandir):
+            result = get_files_info(self.working_dir, recursive=True)
+        self.assertIn("- pkg/calc.py: ", result)
+        self.assertIn("- pkg/deep: ", result)
+        self.assertNotIn("util.py", result)
+        self.assertIn('contents of "pkg/deep" not listed', result)
+
+    def test_single_level_keeps_format(self) -> None:
+        """Test that a plain listing shows one level in the original format."""
+        result = get_files_info(self.working_dir)
+        self.assertIn("- main.py: file_size=10, is_dir=False\n", result)
+        self.assertIn("- pkg: ", result)
+        self.assertNotIn("calc.py", result)
+
+    def test_recursive_with_depth_limit(self) -> None:
+        """Test that recursion lists relative paths down to max_depth."""
+        result = get_files_info(self.working_dir, recursive=True, max_depth=2)
+        self.assertIn("- pkg/calc.py: file_size=10, is_dir=False\n", result)
+        self.assertNotIn("util.py", result)
+        self.assertIn("pkg/deep/util.py", get_files_info(self.working_dir, recursive=True))
+
+    def test_gitignore_rules_are_applied(self) -> None:
+        """Test that ignored files and directories are skipped."""
+        result = get_files_info(self.working_dir, recursive=True)
+        self.assertNotIn("build", result)
+        self.assertNotIn("debug.log", result)
+
+    def test_glob_filter(self) -> None:
+        """Test that a glob filters entries by name, or by path when it contains a slash."""
+        result = get_files_info(self.working_dir, recursive=True, pattern="*.py")
+        self.assertEqual(result.count("\n"), 3)
+        self.assertNotIn("notes.txt", result)
+        result = get_files_info(self.working_dir, recursive=True, pattern="pkg/*")
+        self.assertIn("pkg/notes.txt", result)
+        self.assertNotIn("pkg/deep/util.py", result)
+
+    def test_paging(self) -> None:
+        """Test that long listings are capped and can be paged with offset."""
+        first = get_files_info(self.working_dir, recursive=True, max_entries=3)
+        self.assertIn("call again with offset=3", first)
+        second = get_files_info(self.working_dir, recursive=True, offset=3, max_entries=3)
+        listed = [line for line in (first + second).splitlines() if line.startswith("- ")]
+        self.assertEqual(len(listed), 6)
+        self.assertEqual(len(set(listed)), 6)
+
+    def test_outside_working_directory(self) -> None:
+        """Test that listing outside the working directory is refused."""
+        self.assertTrue(get_files_info(self.working_dir, "..").startswith("Error: Cannot list"))
+
+
+class TestIgnoreRules(unittest.TestCase):
+    """Test suite for the IgnoreRules matcher."""
+
+    def test_negation_and_anchoring(self) -> None:
+        """Test that the last matching rule wins and slashes anchor patterns."""
+        rules = IgnoreRules()
+        for line in ["*.txt", "!keep.txt", "/top.py", "docs/**/*.md"]:
+            rules.add_pattern(line)
+        self.assertTrue(rules.is_ignored("a/b.txt", False))
+        self.assertFalse(rules.is_ignored("a/keep.txt", False))
+        self.assertTrue(rules.is_ignored("top.py", False))
+        self.assertFalse(rules.is_ignored("sub/top.py", False))
+        self.assertTrue(rules.is_ignored("docs/x/y/z.md", False))
+        self.assertTrue(rules.is_ignored("docs/z.md", False))
+
+    def test_nested_gitignore_applies_to_its_subtree(self) -> None:
+        """Test that rules from a subdirectory only match below it."""
+        rules = IgnoreRules()
+        rules.add_pattern("data.json", "sub")
+        self.assertTrue(rules.is_ignored("sub/x/data.json", False))
+        self.assertFalse(rules.is_ignored("data.json", False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,10 +5,13 @@ This module contains tests for the utility functions that handle file paths.
 """
 
 import os
+import shutil
+import tempfile
 import unittest
 from pathlib import Path
 
-from functions.helper_functions import extract_absolute_paths
+from functions.get_file_content import get_file_content
+from functions.helper_functions import WorkingDirectory, extract_absolute_paths
 
 
 class TestHelperFunctions(unittest.TestCase):
@@ -68,5 +71,54 @@ class TestHelperFunctions(unittest.TestCase):
         self.assertEqual(actual_working_dir, expected_working_dir)
 
 
+class TestWorkingDirectory(unittest.TestCase):
+    """Test suite for the WorkingDirectory resolver."""
+
+    def setUp(self) -> None:
+        """Create a working directory with symlinks pointing inside and outside it."""
+        self.base = tempfile.mkdtemp()
+        self.working_dir = os.path.join(self.base, "work")
+        os.makedirs(os.path.join(self.working_dir, "pkg"))
+        with open(os.path.join(self.working_dir, "pkg", "inside.py"), "w") as f:
+            f.write("inside")
+        with open(os.path.join(self.base, "secret.txt"), "w") as f:
+            f.write("secret")
+        os.symlink(os.path.join(self.base, "secret.txt"), os.path.join(self.working_dir, "escape.txt"))
+        os.symlink(os.path.join(self.working_dir, "pkg", "inside.py"), os.path.join(self.working_dir, "alias.py"))
+
+    def tearDown(self) -> None:
+        """Remove the directories."""
+        shutil.rmtree(self.base)
+
+    def test_symlink_outside_is_rejected(self) -> None:
+        """Test that a symlink pointing outside the working directory is rejected."""
+        working_dir = WorkingDirectory(self.working_dir)
+        self.assertIsNone(working_dir.resolve("escape.txt"))
+        self.assertIsNone(working_dir.resolve("../secret.txt"))
+        self.assertIn("outside the permitted working directory", get_file_content(self.working_dir, "escape.txt"))
+
+    def test_paths_inside_are_resolved(self) -> None:
+        """Test that paths and symlinks within the working directory resolve to their real paths."""
+        working_dir = WorkingDirectory(self.working_dir)
+        real_inside = os.path.realpath(os.path.join(self.working_dir, "pkg", "inside.py"))
+        self.assertEqual(working_dir.resolve("alias.py"), real_inside)
+        self.assertEqual(working_dir.resolve("pkg/../pkg/inside.py"), real_inside)
+        self.assertEqual(working_dir.resolve("."), working_dir.root)
+        self.assertEqual(working_dir.resolve("new/file.py"), os.path.join(working_dir.root, "new", "file.py"))
+
+    def test_resolutions_are_cached_until_invalidated(self) -> None:
+        """Test that resolutions are memoized, bounded, and refreshed after invalidate()."""
+        working_dir = WorkingDirectory(self.working_dir, cache_size=2)
+        self.assertIsNotNone(working_dir.resolve("link.txt"))
+        os.symlink(os.path.join(self.base, "secret.txt"), os.path.join(self.working_dir, "link.txt"))
+        self.assertIsNotNone(working_dir.resolve("link.txt"))
+        working_dir.invalidate()
+        self.assertIsNone(working_dir.resolve("link.txt"))
+
+        working_dir.resolve("a")
+        working_dir.resolve("b")
+        self.assertEqual(list(working_dir._resolved), ["a", "b"])
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Unit tests for the patch_file module and atomic writes.
+
+This module contains tests for unified diffs, search/replace edits and the atomic write helper.
+"""
+
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from functions.helper_functions import atomic_write, count_changed_bytes
+from functions.patch_file import patch_file
+from functions.write_file import write_file
+
+ORIGINAL = "def add(a, b):\n    return a + b\n\n\ndef sub(a, b):\n    return a - b\n"
+
+
+class TestPatchFile(unittest.TestCase):
+    """Test suite for the patch_file function."""
+
+    def setUp(self) -> None:
+        """Create a file to patch."""
+        self.working_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.working_dir, "ops.py")
+        with open(self.path, "w") as f:
+            f.write(ORIGINAL)
+
+    def tearDown(self) -> None:
+        """Remove the file."""
+        shutil.rmtree(self.working_dir)
+
+    def read(self) -> str:
+        """Read the patched file."""
+        with open(self.path) as f:
+            return f.read()
+
+    def test_unified_diff(self) -> None:
+        """Test that a unified diff with several hunks is applied."""
+        diff = (
+            "--- a/ops.py\n+++ b/ops.py\n"
+            "@@ -1,2 +1,3 @@\n def add(a, b):\n+    # Sum\n     return a + b\n"
+            "@@ -5,2 +6,2 @@\n def sub(a, b):\n-    return a - b\n+    return a - b - 0\n"
+        )
+        result = patch_file(self.working_dir, "ops.py", diff=diff)
+        self.assertTrue(result.startswith('Successfully patched "ops.py" (2 hunks applied'), result)
+        self.assertEqual(self.read(), ORIGINAL.replace("b):\n    return a + b", "b):\n    # Sum\n    return a + b").replace("a - b\n", "a - b - 0\n"))
+
+    def test_diff_with_wrong_line_numbers(self) -> None:
+        """Test that a hunk whose header is off is applied where its lines match."""
+        diff = "@@ -40,1 +40,1 @@\n-    return a - b\n+    return b - a\n"
+        self.assertTrue(patch_file(self.working_dir, "ops.py", diff=diff).startswith("Successfully"))
+        self.assertIn("return b - a", self.read())
+
+    def test_failed_patch_leaves_file_unchanged(self) -> None:
+        """Test that nothing is written when one hunk does not apply."""
+        diff = "@@ -1,1 +1,1 @@\n-def add(a, b):\n+def plus(a, b):\n@@ -5,1 +5,1 @@\n-def mul(a, b):\n+def times(a, b):\n"
+        result = patch_file(self.working_dir, "ops.py", diff=diff)
+        self.assertIn("hunk 2", result)
+        self.assertEqual(self.read(), ORIGINAL)
+
+    def test_search_replace_edits(self) -> None:
+        """Test that edits are applied in order and must match exactly once."""
+        edits = [{"search": "def add", "replace": "def plus"}, {"search": "a + b", "replace": "b + a"}]
+        result = patch_file(self.working_dir, "ops.py", edits=edits)
+        self.assertEqual(result, 'Successfully patched "ops.py" (2 edits applied, 28 bytes changed)')
+        ambiguous = patch_file(self.working_dir, "ops.py", edits=[{"search": "return", "replace": "yield"}])
+        self.assertIn("occurs 2 times", ambiguous)
+
+    def test_diff_creates_file(self) -> None:
+        """Test that a diff adding lines to a missing file creates it."""
+        diff = "--- /dev/null\n+++ b/new.py\n@@ -0,0 +1,2 @@\n+x = 1\n+y = 2\n"
+        self.assertTrue(patch_file(self.working_dir, "pkg/new.py", diff=diff).startswith("Successfully"))
+        with open(os.path.join(self.working_dir, "pkg/new.py")) as f:
+            self.assertEqual(f.read(), "x = 1\ny = 2\n")
+
+    def test_outside_working_directory(self) -> None:
+        """Test that patching outside the working directory is refused."""
+        self.assertTrue(patch_file(self.working_dir, "../x.py", edits=[]).startswith("Error: Cannot patch"))
+
+
+class TestAtomicWrite(unittest.TestCase):
+    """Test suite for atomic writes and change counting."""
+
+    def test_keeps_mode_and_leaves_no_temp_files(self) -> None:
+        """Test that an existing file keeps its permissions and no temporary file is left."""
+        working_dir = tempfile.mkdtemp()
+        try:
+            path = os.path.join(working_dir, "run.sh")
+            with open(path, "w") as f:
+                f.write("old")
+            os.chmod(path, 0o751)
+            atomic_write(path, b"new")
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o751)
+            self.assertEqual(os.listdir(working_dir), ["run.sh"])
+            self.assertIn("3 bytes changed", write_file(working_dir, "run.sh", "abc"))
+        finally:
+            shutil.rmtree(working_dir)
+
+    def test_new_file_follows_umask(self) -> None:
+        """Test that a new file gets the default permissions for the current umask."""
+        working_dir = tempfile.mkdtemp()
+        umask = os.umask(0o027)
+        try:
+            path = os.path.join(working_dir, "new.txt")
+            atomic_write(path, b"new")
+            self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o640)
+            self.assertEqual(os.listdir(working_dir), ["new.txt"])
+        finally:
+            os.umask(umask)
+            shutil.rmtree(working_dir)
+
+    def test_count_changed_bytes(self) -> None:
+        """Test that only the span between the common prefix and suffix counts."""
+        self.assertEqual(count_changed_bytes(b"hello world", b"hello there world"), 6)
+        self.assertEqual(count_changed_bytes(b"same", b"same"), 0)
+        self.assertEqual(count_changed_bytes(b"", b"abc"), 3)
+        self.assertEqual(count_changed_bytes(b"aaa", b"aa"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
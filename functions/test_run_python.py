@@ -0,0 +1,155 @@
+"""
+Unit tests for the run_python module.
+
+This module contains tests for running Python files with bounded output capture.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from functions.output_buffer import HeadTailBuffer
+from functions.run_python import run_python_file, run_with_bounded_output
+from functions.sandbox import SandboxLimits, disable_sandbox, enable_sandbox
+
+
+class TestHeadTailBuffer(unittest.TestCase):
+    """Test suite for the HeadTailBuffer class."""
+
+    def test_keeps_everything_when_small(self) -> None:
+        """Test that output shorter than the head and tail is kept whole."""
+        buffer = HeadTailBuffer(4, 4)
+        buffer.write(b"abc")
+        buffer.write(b"def")
+        self.assertEqual(buffer.getvalue(), "abcdef")
+        self.assertEqual(buffer.dropped_bytes, 0)
+
+    def test_drops_the_middle(self) -> None:
+        """Test that only the head and tail are kept, with the dropped count reported."""
+        buffer = HeadTailBuffer(3, 3)
+        for chunk in (b"head", b"-middle-", b"tail"):
+            buffer.write(chunk)
+        self.assertEqual(buffer.dropped_bytes, 10)
+        self.assertEqual(buffer.getvalue(), "hea\n[... 10 bytes dropped ...]\nail")
+
+
+class TestRunWithBoundedOutput(unittest.TestCase):
+    """Test suite for the run_with_bounded_output function."""
+
+    def setUp(self) -> None:
+        """Create a temporary working directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.working_dir = self.tmp.name
+
+    def tearDown(self) -> None:
+        """Remove the temporary working directory."""
+        self.tmp.cleanup()
+
+    def run_script(self, source: str, **limits: int) -> subprocess.CompletedProcess:
+        """Run a Python snippet with the given limits."""
+        return run_with_bounded_output([sys.executable, "-c", source], self.working_dir, 10, **limits)
+
+    def test_matches_subprocess_run(self) -> None:
+        """Test that small outputs match subprocess.run in text mode."""
+        source = "import sys\nprint('out')\nprint('err', file=sys.stderr)\nsys.exit(2)"
+        expected = subprocess.run([sys.executable, "-c", source], capture_output=True, text=True)
+        result = self.run_script(source)
+        self.assertEqual((result.stdout, result.stderr, result.returncode),
+                         (expected.stdout, expected.stderr, expected.returncode))
+        self.assertFalse(result.output_limit_exceeded)
+
+    def test_bounded_capture(self) -> None:
+        """Test that a large output keeps its head and tail and reports the rest as dropped."""
+        result = self.run_script("print('first'); print('x' * 100000); print('last')", head_bytes=10, tail_bytes=10)
+        self.assertTrue(result.stdout.startswith("first\nxxxx"))
+        self.assertTrue(result.stdout.endswith("xxxx\nlast\n"))
+        self.assertIn("bytes dropped", result.stdout)
+        self.assertEqual(result.returncode, 0)
+
+    def test_kills_runaway_output(self) -> None:
+        """Test that a process flooding its output is killed once it passes the limit."""
+        result = self.run_script("while True: print('y' * 1000)", max_bytes=100000)
+        self.assertTrue(result.output_limit_exceeded)
+        self.assertNotEqual(result.returncode, 0)
+
+    def test_timeout(self) -> None:
+        """Test that a process running past its timeout is killed."""
+        with self.assertRaises(subprocess.TimeoutExpired):
+            run_with_bounded_output([sys.executable, "-c", "import time; time.sleep(5)"], self.working_dir, 0.2)
+
+    def test_timeout_after_closing_output(self) -> None:
+        """Test that a process still running after closing its pipes is killed at the deadline."""
+        source = "import os, time; os.close(1); os.close(2); time.sleep(5)"
+        start = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            run_with_bounded_output([sys.executable, "-c", source], self.working_dir, 0.5)
+        self.assertLess(time.monotonic() - start, 4)
+
+    def test_run_python_file_reports_limit(self) -> None:
+        """Test that run_python_file explains why a flooding script was stopped."""
+        with open(os.path.join(self.working_dir, "flood.py"), "w") as f:
+            f.write("while True:\n    print('z' * 100000)\n")
+        result = run_python_file(self.working_dir, "flood.py")
+        self.assertIn("bytes dropped", result)
+        self.assertIn("exceeding the output limit", result)
+
+
+class TestSandbox(unittest.TestCase):
+    """Test suite for sandboxed runs."""
+
+    def setUp(self) -> None:
+        """Create a temporary working directory."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.working_dir = self.tmp.name
+
+    def tearDown(self) -> None:
+        """Turn sandbox mode off and remove the temporary working directory."""
+        disable_sandbox()
+        self.tmp.cleanup()
+
+    def run_script(self, source: str, limits: SandboxLimits) -> subprocess.CompletedProcess:
+        """Run a Python snippet under the given limits."""
+        return run_with_bounded_output([sys.executable, "-c", source], self.working_dir, 10, limits=limits)
+
+    def test_memory_limit(self) -> None:
+        """Test that allocations past the address-space limit fail."""
+        result = self.run_script("b = bytearray(400 * 1024 * 1024)", SandboxLimits(memory_bytes=256 * 1024 * 1024))
+        self.assertIn("MemoryError", result.stderr)
+
+    def test_open_files_limit(self) -> None:
+        """Test that opening more files than allowed fails."""
+        result = self.run_script("files = [open(__import__('os').devnull) for _ in range(100)]", SandboxLimits(max_open_files=32))
+        self.assertIn("Too many open files", result.stderr)
+
+    def test_cpu_limit(self) -> None:
+        """Test that a busy loop is stopped by the CPU time limit."""
+        result = self.run_script("while True: pass", SandboxLimits(cpu_seconds=1))
+        self.assertNotEqual(result.returncode, 0)
+        self.assertGreaterEqual(result.resource_usage.cpu_seconds, 0.9)
+
+    def test_limits_survive_exec(self) -> None:
+        """Test that the launcher's limits are inherited by the command it execs, from any thread."""
+        source = "import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE))"
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda _: self.run_script(source, SandboxLimits(max_open_files=32)), range(8)))
+        for result in results:
+            self.assertEqual(result.stdout.strip(), "(32, 32)")
+
+    def test_reports_resource_usage(self) -> None:
+        """Test that run_python_file reports peak RSS and CPU time in sandbox mode."""
+        with open(os.path.join(self.working_dir, "hello.py"), "w") as f:
+            f.write("print('hello')\n")
+        self.assertNotIn("Resource usage", run_python_file(self.working_dir, "hello.py"))
+
+        enable_sandbox()
+        result = run_python_file(self.working_dir, "hello.py")
+        self.assertIn("STDOUT:\nhello", result)
+        self.assertIn("Resource usage: peak RSS", result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Unit tests for the search_files module.
+
+This module contains tests for the search tool and its trigram index.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from functions.search_files import search_files
+from functions.search_index import TrigramIndex
+
+
+class TestSearchFiles(unittest.TestCase):
+    """Test suite for the search_files function."""
+
+    def setUp(self) -> None:
+        """Create a small source tree."""
+        self.working_dir = tempfile.mkdtemp()
+        self.write("pkg/calculator.py", "class Calculator:\n    def evaluate(self, expression):\n        return None\n")
+        self.write("pkg/render.py", "def render(expression, result):\n    return str(result)\n")
+        self.write("main.py", "from pkg.calculator import Calculator\n\nCalculator().evaluate('1 + 2')\n")
+        self.write("notes/todo.txt", "evaluate precedence\n")
+        self.write("data.bin", "evaluate\0\0\0")
+
+    def tearDown(self) -> None:
+        """Remove the tree."""
+        shutil.rmtree(self.working_dir)
+
+    def write(self, rel_path: str, content: str) -> None:
+        """Write a file of the tree."""
+        path = os.path.join(self.working_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(content)
+
+    def test_matches_with_context(self) -> None:
+        """Test that matching lines are returned grep-style with context."""
+        result = search_files(self.working_dir, "def evaluate", context_lines=1)
+        self.assertIn("Found 1 matching lines in 1 files", result)
+        self.assertIn("pkg/calculator.py-1- class Calculator:\n", result)
+        self.assertIn("pkg/calculator.py:2:     def evaluate(self, expression):\n", result)
+        self.assertIn("pkg/calculator.py-3- ", result)
+
+    def test_binary_files_skipped_and_filters(self) -> None:
+        """Test that binary files are skipped and directory and glob narrow the search."""
+        result = search_files(self.working_dir, "evaluate")
+        self.assertNotIn("data.bin", result)
+        self.assertIn("notes/todo.txt", result)
+        self.assertNotIn("notes/", search_files(self.working_dir, "evaluate", glob="*.py"))
+        self.assertNotIn("main.py", search_files(self.working_dir, "evaluate", directory="pkg"))
+
+    def test_regex_and_case(self) -> None:
+        """Test regular expression and case-insensitive searches."""
+        self.assertIn("pkg/render.py:1:", search_files(self.working_dir, r"def \w+\(expression, result", regex=True))
+        self.assertIn("main.py:1:", search_files(self.working_dir, "CALCULATOR import", case_sensitive=False))
+        self.assertTrue(search_files(self.working_dir, "CALCULATOR import").startswith("No matches"))
+        self.assertTrue(search_files(self.working_dir, "(", regex=True).startswith("Error: Invalid regular expression"))
+
+    def test_index_sees_changes(self) -> None:
+        """Test that edits, new files and deletions are picked up between searches."""
+        self.assertTrue(search_files(self.working_dir, "multiply").startswith("No matches"))
+        time.sleep(0.01)
+        self.write("pkg/render.py", "def multiply(a, b):\n    return a * b\n")
+        self.write("pkg/extra.py", "multiply(2, 3)\n")
+        self.assertIn("Found 2 matching lines in 2 files", search_files(self.working_dir, "multiply"))
+        os.remove(os.path.join(self.working_dir, "pkg/extra.py"))
+        self.assertIn("Found 1 matching lines in 1 files", search_files(self.working_dir, "multiply"))
+
+    def test_unreadable_subdirectory_is_skipped(self) -> None:
+        """Test that a subdirectory that cannot be read does not fail the search."""
+        unreadable = os.path.join(self.working_dir, "notes")
+        scandir = os.scandir
+
+        def failing_scandir(path):
+            if path == unreadable:
+                raise PermissionError(13, "Permission denied", path)
+            return scandir(path)
+
+        with mock.patch("functions.ignore_rules.os.scandir", failing_scandir):
+            result = search_files(self.working_dir, "evaluate")
+        self.assertIn("pkg/calculator.py:2:", result)
+        self.assertNotIn("notes/todo.txt", result)
+
+    def test_max_results(self) -> None:
+        """Test that the number of matching lines is capped."""
+        self.write("many.txt", "hit\n" * 50)
+        result = search_files(self.working_dir, "hit", max_results=5, context_lines=0)
+        self.assertEqual(result.count("many.txt:"), 5)
+        self.assertIn("Search stopped early", result)
+
+    def test_outside_working_directory(self) -> None:
+        """Test that searching outside the working directory is refused."""
+        self.assertTrue(search_files(self.working_dir, "x", directory="..").startswith("Error: Cannot search"))
+
+
+class TestTrigramIndex(unittest.TestCase):
+    """Test suite for the TrigramIndex class."""
+
+    def test_candidates_and_incremental_refresh(self) -> None:
+        """Test that only files containing the query's trigrams are candidates, and unchanged files are not re-read."""
+        working_dir = tempfile.mkdtemp()
+        try:
+            for name, content in [("a.py", "alpha beta"), ("b.py", "gamma delta"), ("c.py", "Alphabet")]:
+                with open(os.path.join(working_dir, name), "w") as f:
+                    f.write(content)
+            index = TrigramIndex(working_dir)
+            self.assertEqual(index.refresh(), 3)
+            self.assertEqual(index.candidates("alpha"), ["a.py", "c.py"])
+            self.assertEqual(index.candidates("delta"), ["b.py"])
+            self.assertEqual(index.candidates("zzz"), [])
+            self.assertEqual(index.refresh(), 0)
+        finally:
+            shutil.rmtree(working_dir)
+
+    def test_unchanged_directories_are_not_listed_again(self) -> None:
+        """Test that a refresh lists only changed directories, and only below the refreshed one."""
+        working_dir = tempfile.mkdtemp()
+        try:
+            for rel_path in ["a/one.py", "b/two.py", "b/notes.txt"]:
+                os.makedirs(os.path.join(working_dir, os.path.dirname(rel_path)), exist_ok=True)
+                with open(os.path.join(working_dir, rel_path), "w") as f:
+                    f.write("alpha")
+            with open(os.path.join(working_dir, ".gitignore"), "w") as f:
+                f.write("# nothing ignored\n")
+            index = TrigramIndex(working_dir)
+            self.assertEqual(index.refresh(), 4)
+
+            scandir = os.scandir
+            listed = []
+
+            def counting_scandir(path):
+                listed.append(os.path.relpath(path, working_dir))
+                return scandir(path)
+
+            with mock.patch("functions.search_index.os.scandir", counting_scandir):
+                self.assertEqual(index.refresh(), 0)
+                self.assertEqual(listed, [])
+
+                # Edits in place are found by stat, without listing the directory
+                with open(os.path.join(working_dir, "b/two.py"), "w") as f:
+                    f.write("gamma delta")
+                self.assertEqual(index.refresh("a"), 0)
+                self.assertEqual(index.refresh("b"), 1)
+                self.assertEqual(index.candidates("gamma"), ["b/two.py"])
+                self.assertEqual(listed, [])
+
+                with open(os.path.join(working_dir, "a/three.py"), "w") as f:
+                    f.write("alpha")
+                self.assertEqual(index.refresh(), 1)
+                self.assertEqual(listed, ["a"])
+
+                # A changed .gitignore above a directory lists it again
+                with open(os.path.join(working_dir, ".gitignore"), "w") as f:
+                    f.write("*.txt\n")
+                self.assertEqual(index.refresh("b"), 1)
+                self.assertNotIn("b/notes.txt", index.candidates("alpha"))
+        finally:
+            shutil.rmtree(working_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Unit tests for the worker_pool module.
+
+This module contains tests for running Python files on pre-warmed worker interpreters.
+"""
+
+import os
+import subprocess
+import tempfile
+import signal
+import time
+import unittest
+from unittest import mock
+
+from functions.run_python import run_python_file
+from functions.worker_pool import PythonWorkerPool, disable_worker_pool, enable_worker_pool
+
+
+class TestWorkerPool(unittest.TestCase):
+    """Test suite for the PythonWorkerPool class."""
+
+    def setUp(self) -> None:
+        """Create a working directory with a small package and pool for it."""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.working_dir = self.tmp.name
+        os.makedirs(os.path.join(self.working_dir, "pkg"))
+        self.write("pkg/__init__.py", "")
+        self.write("pkg/values.py", "VALUE = 1\n")
+        self.write("show.py", "from pkg.values import VALUE\nprint(VALUE)\n")
+        self.pool = PythonWorkerPool(size=1, max_runs=3, preload=["pkg.values"])
+
+    def tearDown(self) -> None:
+        """Stop the workers and remove the working directory."""
+        self.pool.close()
+        disable_worker_pool()
+        self.tmp.cleanup()
+
+    def write(self, file_path: str, content: str) -> None:
+        """Write a file in the working directory."""
+        with open(os.path.join(self.working_dir, file_path), "w") as f:
+            f.write(content)
+
+    def run_file(self, file_path: str) -> subprocess.CompletedProcess:
+        """Run a file of the working directory on the pool."""
+        return self.pool.run(self.working_dir, os.path.join(self.working_dir, file_path), 10)
+
+    def test_matches_subprocess(self) -> None:
+        """Test that output and exit codes match a fresh interpreter."""
+        self.write("fail.py", "import sys\nprint('out')\nprint('err', file=sys.stderr)\nsys.exit(3)\n")
+        for file_path in ("show.py", "fail.py"):
+            expected = subprocess.run(["python", file_path], cwd=self.working_dir, capture_output=True, text=True)
+            result = self.run_file(file_path)
+            self.assertEqual((result.stdout, result.stderr, result.returncode),
+                             (expected.stdout, expected.stderr, expected.returncode))
+
+    def test_uncaught_exception(self) -> None:
+        """Test that an uncaught exception reports a traceback and exit code 1."""
+        self.write("boom.py", "raise RuntimeError('boom')\n")
+        result = self.run_file("boom.py")
+        self.assertEqual(result.returncode, 1)
+        self.assertIn("Traceback (most recent call last):", result.stderr)
+        self.assertIn("RuntimeError: boom", result.stderr)
+        self.assertNotIn("runpy", result.stderr)
+
+    def test_fresh_namespace(self) -> None:
+        """Test that globals from one run are not visible to the next."""
+        self.write("leak.py", "print('leaked' in globals())\nleaked = True\n")
+        self.assertEqual(self.run_file("leak.py").stdout, "False\n")
+        self.assertEqual(self.run_file("leak.py").stdout, "False\n")
+
+    def test_output_limit(self) -> None:
+        """Test that a script flooding its output is stopped and its output bounded."""
+        self.write("flood.py", "while True:\n    print('z' * 100000)\n")
+        result = self.run_file("flood.py")
+        self.assertTrue(result.output_limit_exceeded)
+        self.assertIn("bytes dropped", result.stdout)
+        self.assertLess(len(result.stdout), 20000)
+
+    def test_output_limit_while_reporting_exit(self) -> None:
+        """Test that reaching the limit in a traceback or exit message does not kill the worker."""
+        self.write("raise.py", "print('x' * 90)\nraise ValueError('y' * 200)\n")
+        self.write("exit.py", "import sys\nprint('x' * 90)\nsys.exit('y' * 200)\n")
+        with mock.patch("functions.worker_pool.RUN_OUTPUT_MAX_BYTES", 100):
+            for file_path in ("raise.py", "exit.py"):
+                result = self.run_file(file_path)
+                self.assertTrue(result.output_limit_exceeded)
+                self.assertEqual(result.returncode, -signal.SIGKILL)
+
+    def test_reloads_changed_modules(self) -> None:
+        """Test that a preloaded module is re-imported once its source changes."""
+        self.assertEqual(self.run_file("show.py").stdout, "1\n")
+        self.write("pkg/values.py", "VALUE = 2\n")
+        # Make sure the mtime changes even on filesystems with coarse timestamps
+        future = time.time_ns() + 10**9
+        os.utime(os.path.join(self.working_dir, "pkg/values.py"), ns=(future, future))
+        self.assertEqual(self.run_file("show.py").stdout, "2\n")
+
+    def test_recycles_workers(self) -> None:
+        """Test that a worker is replaced after max_runs runs and after a timeout."""
+        self.write("pid.py", "import os\nprint(os.getpid())\n")
+        pids = [self.run_file("pid.py").stdout for _ in range(4)]
+        self.assertEqual(len(set(pids[:3])), 1)
+        self.assertNotEqual(pids[2], pids[3])
+
+        self.write("slow.py", "import time\ntime.sleep(5)\n")
+        with self.assertRaises(subprocess.TimeoutExpired):
+            self.pool.run(self.working_dir, os.path.join(self.working_dir, "slow.py"), 0.2)
+        self.assertEqual(self.run_file("show.py").stdout, "1\n")
+
+    def test_run_python_file_uses_pool(self) -> None:
+        """Test that run_python_file returns the same format through an enabled pool."""
+        expected = run_python_file(self.working_dir, "show.py")
+        enable_worker_pool(self.working_dir, self.pool)
+        self.assertEqual(run_python_file(self.working_dir, "show.py"), expected)
+
+    def test_script_ending_the_worker(self) -> None:
+        """Test that a script calling os._exit reports its output and exit code like a cold run."""
+        self.write("exit.py", "import os\nprint('hello', flush=True)\nos._exit(3)\n")
+        expected = run_python_file(self.working_dir, "exit.py")
+        self.assertEqual(expected, "STDOUT:\nhello\n\nProcess exited with code 3")
+        enable_worker_pool(self.working_dir, self.pool)
+        self.assertEqual(run_python_file(self.working_dir, "exit.py"), expected)
+        # The pool replaces the worker and keeps serving runs
+        self.assertEqual(run_python_file(self.working_dir, "show.py"), "STDOUT:\n1\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
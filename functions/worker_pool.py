@@ -0,0 +1,250 @@
+"""
+Warm Python worker pool module.
+
+This module provides a pool of long-lived, pre-warmed Python interpreters that
+run_python_file can use instead of starting a new interpreter for every call.
+Workers are recycled after a fixed number of runs, or as soon as one fails.
+"""
+
+import json
+import os
+import select
+import subprocess
+import threading
+from typing import Dict, List, Optional, Sequence
+
+from config import (
+    PYTHON_WORKER_MAX_RUNS,
+    PYTHON_WORKER_POOL_SIZE,
+    PYTHON_WORKER_PRELOAD,
+    RUN_OUTPUT_HEAD_BYTES,
+    RUN_OUTPUT_MAX_BYTES,
+    RUN_OUTPUT_TAIL_BYTES,
+)
+from functions.output_buffer import BoundedCompletedProcess
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+
+
+class WorkerError(Exception):
+    """Raised when a worker dies or answers with a malformed response."""
+
+
+class PythonWorker:
+    """A single pre-warmed interpreter serving run requests for one working directory."""
+
+    def __init__(self, working_directory: str, preload: Sequence[str]) -> None:
+        """
+        Start the worker process.
+
+        Args:
+            working_directory: The absolute working directory.
+            preload: The modules to import before serving requests.
+        """
+        self.runs = 0
+        self.process = subprocess.Popen(
+            ["python", WORKER_SCRIPT, working_directory, *preload],
+            cwd=working_directory,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+
+    def run(self, abs_file_path: str, timeout: float) -> BoundedCompletedProcess:
+        """
+        Run a Python file in the worker.
+
+        Args:
+            abs_file_path: The absolute path of the file to run.
+            timeout: The number of seconds to wait for the run to finish.
+
+        Returns:
+            A BoundedCompletedProcess with the head and tail of the run's output.
+
+        Raises:
+            subprocess.TimeoutExpired: If the run takes longer than timeout.
+            WorkerError: If the worker died or sent a malformed response.
+        """
+        args = ["python", abs_file_path]
+        try:
+            request = {
+                "file_path": abs_file_path,
+                "head_bytes": RUN_OUTPUT_HEAD_BYTES,
+                "tail_bytes": RUN_OUTPUT_TAIL_BYTES,
+                "max_bytes": RUN_OUTPUT_MAX_BYTES,
+            }
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except OSError as e:
+            raise WorkerError(f"worker is not accepting requests: {e}")
+
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            raise subprocess.TimeoutExpired(args, timeout)
+
+        line = self.process.stdout.readline()
+        if not line:
+            raise WorkerError(f"worker exited with code {self.process.wait()}")
+        try:
+            response = json.loads(line)
+        except ValueError as e:
+            raise WorkerError(f"malformed worker response: {e}")
+
+        self.runs += 1
+        return BoundedCompletedProcess(
+            args,
+            response["returncode"],
+            response["stdout"],
+            response["stderr"],
+            response["output_limit_exceeded"],
+        )
+
+    def close(self) -> None:
+        """Stop the worker process."""
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+
+class PythonWorkerPool:
+    """
+    Pool of pre-warmed Python workers, kept per working directory.
+
+    At most size runs execute at once. A worker is replaced after max_runs runs,
+    or immediately if a run times out or the worker fails, so state leaked by one
+    script cannot accumulate indefinitely.
+    """
+
+    def __init__(
+        self,
+        size: int = PYTHON_WORKER_POOL_SIZE,
+        max_runs: int = PYTHON_WORKER_MAX_RUNS,
+        preload: Sequence[str] = PYTHON_WORKER_PRELOAD,
+    ) -> None:
+        """
+        Initialize the pool.
+
+        Args:
+            size: The maximum number of workers per working directory.
+            max_runs: The number of runs after which a worker is recycled.
+            preload: The modules each worker imports before serving requests.
+        """
+        self.size = size
+        self.max_runs = max_runs
+        self.preload = list(preload)
+        self._idle: Dict[str, List[PythonWorker]] = {}
+        self._slots: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def start(self, working_directory: str) -> None:
+        """
+        Pre-fork the workers of a working directory so the first runs are warm.
+
+        Args:
+            working_directory: The working directory the workers run files in.
+        """
+        abs_working_dir = os.path.realpath(working_directory)
+        workers = [PythonWorker(abs_working_dir, self.preload) for _ in range(self.size)]
+        with self._lock:
+            self._slots.setdefault(abs_working_dir, threading.Semaphore(self.size))
+            self._idle.setdefault(abs_working_dir, []).extend(workers)
+
+    def run(self, working_directory: str, abs_file_path: str, timeout: float) -> BoundedCompletedProcess:
+        """
+        Run a Python file on a warm worker.
+
+        Args:
+            working_directory: The working directory to run the file in.
+            abs_file_path: The absolute path of the file to run.
+            timeout: The number of seconds to wait for the run to finish.
+
+        Returns:
+            A BoundedCompletedProcess with the head and tail of the run's output.
+
+        Raises:
+            subprocess.TimeoutExpired: If the run takes longer than timeout.
+            WorkerError: If the worker failed.
+        """
+        abs_working_dir = os.path.realpath(working_directory)
+        with self._lock:
+            slots = self._slots.setdefault(abs_working_dir, threading.Semaphore(self.size))
+
+        with slots:
+            worker = self._acquire(abs_working_dir)
+            try:
+                result = worker.run(abs_file_path, timeout)
+            except BaseException:
+                worker.close()
+                raise
+
+            if worker.runs >= self.max_runs:
+                worker.close()
+            else:
+                with self._lock:
+                    self._idle[abs_working_dir].append(worker)
+            return result
+
+    def _acquire(self, abs_working_dir: str) -> PythonWorker:
+        """Take an idle worker for the working directory, starting one if none is idle."""
+        with self._lock:
+            idle = self._idle.setdefault(abs_working_dir, [])
+            while idle:
+                worker = idle.pop()
+                if worker.process.poll() is None:
+                    return worker
+                worker.close()
+        return PythonWorker(abs_working_dir, self.preload)
+
+    def close(self) -> None:
+        """Stop all idle workers."""
+        with self._lock:
+            workers = [worker for idle in self._idle.values() for worker in idle]
+            self._idle.clear()
+        for worker in workers:
+            worker.close()
+
+
+_worker_pool: Optional[PythonWorkerPool] = None
+
+
+def enable_worker_pool(working_directory: Optional[str] = None, pool: Optional[PythonWorkerPool] = None) -> PythonWorkerPool:
+    """
+    Make run_python_file run files on a warm worker pool.
+
+    Args:
+        working_directory: A working directory whose workers are pre-forked now.
+        pool: The pool to use. Defaults to a pool configured from config.py.
+
+    Returns:
+        The enabled pool.
+    """
+    global _worker_pool
+    disable_worker_pool()
+    _worker_pool = pool or PythonWorkerPool()
+    if working_directory:
+        _worker_pool.start(working_directory)
+    return _worker_pool
+
+
+def disable_worker_pool() -> None:
+    """Stop the enabled worker pool, so run_python_file starts a new interpreter per run."""
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.close()
+        _worker_pool = None
+
+
+def get_worker_pool() -> Optional[PythonWorkerPool]:
+    """
+    Get the enabled worker pool.
+
+    Returns:
+        The enabled pool, or None if run_python_file starts a new interpreter per run.
+    """
+    return _worker_pool
@@ -11,26 +11,29 @@ from typing import Any
 
 from google.genai import types
 
-from functions.helper_functions import extract_absolute_paths
+from functions.helper_functions import atomic_write, count_changed_bytes, get_working_directory
 
 
 def write_file(working_directory: str, file_path: str, content: str) -> str:
     """
     Write content to a file within the permitted working directory.
 
+    The file is replaced atomically, so an interrupted write never leaves it truncated.
+
     Args:
         working_directory: The base directory that contains or will contain the file.
         file_path: The path to the file, relative to the working directory or absolute.
         content: The content to write to the file.
 
     Returns:
-        A success message with the number of characters written or an error message.
+        A success message with the number of characters written and bytes changed, or an error message.
     """
     try:
-        abs_file_path, abs_working_dir = extract_absolute_paths(file_path, working_directory)
+        working_dir = get_working_directory(working_directory)
+        abs_file_path = working_dir.resolve(file_path)
 
         # Check if the file is within the permitted working directory
-        if not abs_file_path.startswith(abs_working_dir + os.path.sep) and abs_file_path != abs_working_dir:
+        if abs_file_path is None:
             return f'Error: Cannot write to "{file_path}" as it is outside the permitted working directory'
 
         # Check if the directory for the file exists and create it if not
@@ -38,11 +41,18 @@ def write_file(working_directory: str, file_path: str, content: str) -> str:
         if directory and not os.path.exists(directory):
             os.makedirs(directory)
 
-        # Overwrite the contents of the file with the content argument
-        with open(abs_file_path, "w") as f:
-            f.write(content)
+        # Read the previous contents to report how much changed
+        try:
+            with open(abs_file_path, "rb") as f:
+                old_data = f.read()
+        except FileNotFoundError:
+            old_data = b""
+
+        # Replace the contents of the file with the content argument
+        data = content.encode()
+        atomic_write(abs_file_path, data)
 
-        return f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
+        return f'Successfully wrote to "{file_path}" ({len(content)} characters written, {count_changed_bytes(old_data, data)} bytes changed)'
 
     except Exception as e:
         return f"Error: {e}"
@@ -0,0 +1,341 @@
+"""
+Conversation history module for the AI Code Assistant.
+
+This module provides a HistoryManager that compacts the conversation sent to the
+model on each iteration, so prompt tokens stay within a budget instead of growing
+with every turn. The full history is kept; only the view sent to the model is
+compacted.
+"""
+
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from google.genai import types
+
+from config import HISTORY_KEEP_RECENT_TURNS, HISTORY_TOKEN_BUDGET, HISTORY_TOOL_OUTPUT_CHARS
+
+# Rough number of characters per token, used until usage metadata is available
+CHARS_PER_TOKEN = 4
+
+# Tools that change the file named by their file_path argument
+WRITE_TOOLS = ("write_file", "patch_file")
+
+# Header of each file's section in a get_files_content result
+FILE_SECTION_HEADER = re.compile(r"^==> (.+) <==$", re.MULTILINE)
+
+
+def estimate_tokens(messages: Sequence[types.Content]) -> int:
+    """
+    Estimate the number of prompt tokens a conversation will use.
+
+    Args:
+        messages: The conversation history.
+
+    Returns:
+        The estimated token count.
+    """
+    chars = 0
+    for content in messages:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+            elif part.function_response:
+                chars += len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return chars // CHARS_PER_TOKEN
+
+
+def function_turns(messages: Sequence[types.Content]) -> List[Tuple[int, int]]:
+    """
+    Find the model contents whose function calls are answered by the following tool content.
+
+    Args:
+        messages: The conversation history.
+
+    Returns:
+        A list of (model_index, tool_index) pairs, oldest first.
+    """
+    turns = []
+    for index in range(len(messages) - 1):
+        if messages[index].role == "model" and messages[index + 1].role == "tool":
+            turns.append((index, index + 1))
+    return turns
+
+
+def replace_response(part: types.Part, response: Dict[str, Any]) -> types.Part:
+    """
+    Copy a function response part with a new response payload.
+
+    Args:
+        part: The original function response part.
+        response: The replacement response.
+
+    Returns:
+        A new Part; the original is left untouched.
+    """
+    return types.Part.from_function_response(name=part.function_response.name, response=response)
+
+
+class HistoryPolicy(ABC):
+    """A compaction step that rewrites the conversation view sent to the model."""
+
+    @abstractmethod
+    def apply(self, messages: List[types.Content]) -> List[types.Content]:
+        """
+        Compact a conversation.
+
+        Args:
+            messages: The conversation view. Content objects must not be modified in place.
+
+        Returns:
+            The compacted conversation view.
+        """
+
+
+def normalize_path(path: Any) -> Optional[str]:
+    """
+    Normalize a file_path argument, so "./pkg/a.py" and "pkg/a.py" compare equal.
+
+    Args:
+        path: The argument, as the model passed it.
+
+    Returns:
+        The normalized path, or None if the argument is not a non-empty string.
+    """
+    return os.path.normpath(path) if isinstance(path, str) and path else None
+
+
+def stale_note(path: str) -> str:
+    """
+    Build the placeholder that replaces a stale read.
+
+    Args:
+        path: The path of the file that was read.
+
+    Returns:
+        The placeholder text.
+    """
+    return f'[stale: "{path}" was overwritten later in the conversation]'
+
+
+class DropStaleReads(HistoryPolicy):
+    """Replace file reads with a placeholder once a later write_file or patch_file changed the file."""
+
+    def apply(self, messages: List[types.Content]) -> List[types.Content]:
+        # Walk the turns newest first, remembering which paths are written later on
+        written_later: set = set()
+        messages = list(messages)
+        for model_index, tool_index in reversed(function_turns(messages)):
+            calls = [part.function_call for part in messages[model_index].parts or [] if part.function_call]
+            responses = list(messages[tool_index].parts or [])
+            changed = False
+
+            for position, (call, part) in enumerate(zip(calls, responses)):
+                if not part.function_response:
+                    continue
+                if call.name == "get_file_content":
+                    path = (call.args or {}).get("file_path")
+                    if normalize_path(path) in written_later:
+                        responses[position] = replace_response(part, {"result": stale_note(path)})
+                        changed = True
+                elif call.name == "get_files_content":
+                    result = (part.function_response.response or {}).get("result")
+                    if isinstance(result, str):
+                        compacted = self.drop_stale_sections(result, written_later)
+                        if compacted != result:
+                            responses[position] = replace_response(part, {"result": compacted})
+                            changed = True
+
+            written_later.update(
+                normalize_path((call.args or {}).get("file_path")) for call in calls if call.name in WRITE_TOOLS
+            )
+            if changed:
+                messages[tool_index] = types.Content(role="tool", parts=responses)
+        return messages
+
+    @staticmethod
+    def drop_stale_sections(result: str, written_later: set) -> str:
+        """
+        Replace the sections of a get_files_content result whose file was written later.
+
+        Args:
+            result: The get_files_content result, a "==> path <==" section per file.
+            written_later: The normalized paths written later in the conversation.
+
+        Returns:
+            The result with each stale section's content replaced by a placeholder.
+        """
+        # Splitting on the headers gives the text before the first one, then (path, content) pairs
+        pieces = FILE_SECTION_HEADER.split(result)
+        for index in range(1, len(pieces), 2):
+            if normalize_path(pieces[index]) in written_later:
+                pieces[index + 1] = "\n" + stale_note(pieces[index]) + ("\n" if index + 2 < len(pieces) else "")
+        return "".join(
+            piece if position % 2 == 0 else f"==> {piece} <=="
+            for position, piece in enumerate(pieces)
+        )
+
+
+class TruncateToolOutputs(HistoryPolicy):
+    """Truncate the function responses of all but the most recent turns."""
+
+    def __init__(self, keep_recent_turns: int = HISTORY_KEEP_RECENT_TURNS, max_chars: int = HISTORY_TOOL_OUTPUT_CHARS) -> None:
+        """
+        Initialize the policy.
+
+        Args:
+            keep_recent_turns: The number of most recent turns left untouched.
+            max_chars: The number of characters kept from each older function response.
+        """
+        self.keep_recent_turns = keep_recent_turns
+        self.max_chars = max_chars
+
+    def apply(self, messages: List[types.Content]) -> List[types.Content]:
+        messages = list(messages)
+        turns = function_turns(messages)
+        old_turns = turns[: max(len(turns) - self.keep_recent_turns, 0)]
+
+        for _, tool_index in old_turns:
+            responses = list(messages[tool_index].parts or [])
+            changed = False
+            for position, part in enumerate(responses):
+                if not part.function_response:
+                    continue
+                result = (part.function_response.response or {}).get("result")
+                if isinstance(result, str) and len(result) > self.max_chars:
+                    dropped = len(result) - self.max_chars
+                    responses[position] = replace_response(
+                        part, {"result": result[: self.max_chars] + f"\n[...{dropped} characters truncated from history]"}
+                    )
+                    changed = True
+            if changed:
+                messages[tool_index] = types.Content(role="tool", parts=responses)
+        return messages
+
+
+class SummarizeOldTurns(HistoryPolicy):
+    """Collapse all but the most recent turns into a short text summary of the calls made."""
+
+    def __init__(self, keep_recent_turns: int = HISTORY_KEEP_RECENT_TURNS) -> None:
+        """
+        Initialize the policy.
+
+        Args:
+            keep_recent_turns: The number of most recent turns kept verbatim.
+        """
+        self.keep_recent_turns = keep_recent_turns
+
+    def apply(self, messages: List[types.Content]) -> List[types.Content]:
+        turns = function_turns(messages)
+        if len(turns) <= self.keep_recent_turns or not messages or messages[0].role != "user":
+            return list(messages)
+
+        # Keep the opening user prompt and resume at a model turn, so roles still alternate
+        first_kept = turns[-self.keep_recent_turns][0] if self.keep_recent_turns else len(messages)
+        lines = ["Summary of earlier turns:"]
+        for content in messages[1:first_kept]:
+            for part in content.parts or []:
+                if part.function_call:
+                    args = ", ".join(f"{key}={value!r}" for key, value in (part.function_call.args or {}).items())
+                    lines.append(f"- called {part.function_call.name}({args})")
+                elif part.function_response:
+                    result = json.dumps(part.function_response.response or {}, default=str)
+                    lines.append(f"  -> {part.function_response.name} returned {len(result)} characters")
+                elif part.text and content.role == "model":
+                    lines.append(f"- said: {part.text[:200]}")
+
+        opening = messages[0]
+        summary = types.Content(
+            role="user", parts=list(opening.parts or []) + [types.Part(text="\n".join(lines))]
+        )
+        return [summary] + list(messages[first_kept:])
+
+
+@dataclass
+class TurnUsage:
+    """Token usage of one model request."""
+
+    prompt_tokens: int
+    saved_tokens: int
+    response_tokens: int = 0
+
+
+class HistoryManager:
+    """
+    Build the conversation view sent to the model within a token budget.
+
+    Policies are applied in order, cheapest first, and compaction stops as soon
+    as the estimated prompt fits in the budget.
+    """
+
+    def __init__(
+        self,
+        policies: Optional[Sequence[HistoryPolicy]] = None,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+    ) -> None:
+        """
+        Initialize the history manager.
+
+        Args:
+            policies: The compaction policies, in the order they are tried.
+                      Defaults to dropping stale reads, truncating old tool outputs
+                      and then summarizing old turns.
+            token_budget: The estimated prompt size above which history is compacted.
+        """
+        if policies is None:
+            policies = [DropStaleReads(), TruncateToolOutputs(), SummarizeOldTurns()]
+        self.policies = list(policies)
+        self.token_budget = token_budget
+        self.turns: List[TurnUsage] = []
+        self._sent_estimate = 0
+        self._saved_estimate = 0
+
+    def compact(self, messages: List[types.Content]) -> List[types.Content]:
+        """
+        Compact the conversation to send to the model.
+
+        Args:
+            messages: The full conversation history, which is not modified.
+
+        Returns:
+            The conversation view to send.
+        """
+        full_estimate = estimate_tokens(messages)
+        compacted = list(messages)
+        estimate = full_estimate
+        for policy in self.policies:
+            if estimate <= self.token_budget:
+                break
+            compacted = policy.apply(compacted)
+            estimate = estimate_tokens(compacted)
+
+        self._sent_estimate = estimate
+        self._saved_estimate = full_estimate - estimate
+        return compacted
+
+    def record_usage(self, usage_metadata: Optional[types.GenerateContentResponseUsageMetadata], verbose: bool = False) -> None:
+        """
+        Record the actual tokens of the last request and the prompt tokens compaction saved.
+
+        The saving is the estimated size of the removed history, scaled by how the
+        estimate compared to the prompt token count reported by the API.
+
+        Args:
+            usage_metadata: The usage metadata of the model response.
+            verbose: Whether to print the per-turn saving.
+        """
+        if not usage_metadata or not usage_metadata.prompt_token_count:
+            return
+
+        prompt_tokens = usage_metadata.prompt_token_count
+        scale = prompt_tokens / self._sent_estimate if self._sent_estimate else 1.0
+        saved_tokens = round(self._saved_estimate * scale)
+        self.turns.append(TurnUsage(prompt_tokens, saved_tokens, usage_metadata.candidates_token_count or 0))
+
+        if verbose and saved_tokens:
+            print(f"History compaction saved ~{saved_tokens} prompt tokens")
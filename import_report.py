@@ -0,0 +1,95 @@
+"""
+Import time report module for the AI Code Assistant.
+
+This module re-runs a command under `python -X importtime` and summarizes where
+its startup time went, so regressions in CLI startup are easy to spot. It only
+uses the standard library, so loading it adds nothing to the measurement.
+"""
+
+import re
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+from config import IMPORT_REPORT_TOP_MODULES
+
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$")
+
+
+@dataclass
+class ImportTiming:
+    """The time spent importing one module, in microseconds."""
+
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_import_times(stderr: str) -> Tuple[List[ImportTiming], List[str]]:
+    """
+    Separate the -X importtime lines of a process's stderr from its other output.
+
+    Args:
+        stderr: The process's standard error.
+
+    Returns:
+        A tuple containing (timings, other_lines).
+    """
+    timings: List[ImportTiming] = []
+    other: List[str] = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            timings.append(ImportTiming(module, int(self_us), int(cumulative_us), len(indent) // 2))
+        elif not line.startswith("import time: self [us]"):
+            other.append(line)
+    return timings, other
+
+
+def format_report(timings: Sequence[ImportTiming], top: int = IMPORT_REPORT_TOP_MODULES) -> str:
+    """
+    Summarize import timings.
+
+    Args:
+        timings: The parsed timings.
+        top: The number of top-level imports to list.
+
+    Returns:
+        The total import time and the slowest top-level imports by cumulative time.
+    """
+    top_level = [timing for timing in timings if timing.depth == 0]
+    total_us = sum(timing.cumulative_us for timing in top_level)
+    lines = [
+        "Import time report (python -X importtime):",
+        f"  Total: {total_us / 1000:.1f} ms importing {len(timings)} modules",
+        "  Slowest top-level imports (cumulative):",
+    ]
+    for timing in sorted(top_level, key=lambda timing: timing.cumulative_us, reverse=True)[:top]:
+        lines.append(f"  {timing.cumulative_us / 1000:9.1f} ms  {timing.module}")
+    return "\n".join(lines)
+
+
+def run_import_report(script: str, args: Sequence[str]) -> int:
+    """
+    Run a script under -X importtime, pass its output through and print the report.
+
+    Args:
+        script: The path of the script to run.
+        args: The script's arguments.
+
+    Returns:
+        The script's exit code.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", script, *args],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    timings, other = parse_import_times(result.stderr)
+    if other:
+        print("\n".join(other), file=sys.stderr)
+    print(format_report(timings))
+    return result.returncode
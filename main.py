@@ -1,64 +1,297 @@
+from __future__ import annotations
 
+import argparse
 import os
 import sys
+from typing import TYPE_CHECKING, Iterator, List, Optional, TextIO
 
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
+from config import BATCH_CONCURRENCY, MAX_ITERS, MODEL_NAME, RATE_LIMIT_RPM, RATE_LIMIT_TPM, WORKING_DIR
 
-from call_function import call_function, available_functions
-from config import MAX_ITERS
-from prompts import system_prompt
+# The Gemini SDK, the agent and the tool modules are imported inside main() once a
+# session is about to start, so --help, usage errors and --import-report stay fast.
+if TYPE_CHECKING:
+    from google import genai
+    from google.genai import types
 
+    from call_function import ToolResultCache
+    from history import HistoryManager
+    from model_client import ModelClient
+    from rate_limiter import RateLimitScheduler
+    from response_cache import ResponseCache
 
-def main() -> None:
+# Same values as ResponseCache.MODES, repeated so parsing arguments imports nothing heavy
+CACHE_MODES = ("record", "replay", "passthrough")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the command line parser.
+
+    Returns:
+        The parser for main.py's arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="AI Code Assistant",
+        epilog='Example: python main.py "How do I fix the calculator?"',
+    )
+    parser.add_argument("prompt", nargs="*", help="The prompt to send to the model")
+    parser.add_argument("--verbose", action="store_true", help="Print the prompt, token usage and cache statistics")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Run the session on the asyncio agent loop")
+    parser.add_argument("--stream", action="store_true", help="Stream responses, starting function calls as they arrive")
+    parser.add_argument("--warm-workers", action="store_true", help="Run Python files on pre-started interpreters")
+    parser.add_argument("--sandbox", action="store_true", help="Run Python files under resource limits")
+    parser.add_argument("--cache", choices=CACHE_MODES, metavar="MODE", help="Record or replay model responses: record, replay or passthrough")
+    parser.add_argument("--batch", metavar="FILE", help="Run each prompt of a JSONL file, or of stdin for -, as a concurrent session and write JSONL results")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, metavar="N", help=f"Maximum number of concurrent sessions with --batch (default: {BATCH_CONCURRENCY})")
+    parser.add_argument("--rpm", type=int, default=RATE_LIMIT_RPM, metavar="N", help=f"Requests per minute to stay within, or 0 for no limit (default: {RATE_LIMIT_RPM})")
+    parser.add_argument("--tpm", type=int, default=RATE_LIMIT_TPM, metavar="N", help=f"Tokens per minute to stay within, or 0 for no limit (default: {RATE_LIMIT_TPM})")
+    parser.add_argument("--trace", metavar="FILE", help="Record where each session's time goes, write it to FILE as a Chrome trace and print a summary")
+    parser.add_argument("--import-report", action="store_true", help="Re-run under python -X importtime and report where startup time went")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
     """
     Main entry point for the AI Code Assistant.
 
     Processes command line arguments, initializes the Gemini API client,
     and handles the conversation loop with the AI model.
+
+    Args:
+        argv: The command line arguments. Defaults to sys.argv[1:].
     """
-    load_dotenv()
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Checked before parsing, so the report also covers runs that stop in the parser, such as --help
+    if "--import-report" in argv:
+        from import_report import run_import_report
+
+        sys.exit(run_import_report(os.path.abspath(__file__), [arg for arg in argv if arg != "--import-report"]))
 
-    verbose = "--verbose" in sys.argv
-    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    parser = build_parser()
+    args = parser.parse_intermixed_args(argv)
+    if args.batch and args.prompt:
+        parser.error("a prompt cannot be given with --batch")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
 
-    if not args:
+    if not args.prompt and not args.batch:
         print("AI Code Assistant")
-        print('\nUsage: python main.py "your prompt here" [--verbose]')
+        print('\nUsage: python main.py "your prompt here" [--verbose] [--async] [--stream] [--warm-workers] [--sandbox] [--cache=record|replay|passthrough] [--import-report]')
+        print("       python main.py --batch prompts.jsonl [--concurrency=N] [...]")
         print('Example: python main.py "How do I fix the calculator?"')
         sys.exit(1)
 
-    api_key = os.environ.get("GEMINI_API_KEY")
-    client = genai.Client(api_key=api_key)
+    import asyncio
+    import atexit
+
+    from google.genai import types
+
+    from agent import run_session
+    from call_function import ToolResultCache
+    from functions.sandbox import enable_sandbox
+    from functions.worker_pool import disable_worker_pool, enable_worker_pool
+    from history import HistoryManager
+    from model_client import LazyGeminiClient, create_gemini_client
+    from rate_limiter import RateLimitScheduler
+    from response_cache import ResponseCache, ResponseCacheMiss
+    from tracing import span
 
-    user_prompt = " ".join(args)
+    verbose = args.verbose
+    stream = args.stream
+    response_cache = ResponseCache(args.cache) if args.cache else None
+    if args.sandbox:
+        enable_sandbox()
+    elif args.warm_workers:
+        enable_worker_pool(WORKING_DIR)
+        atexit.register(disable_worker_pool)
+
+    if args.trace:
+        # atexit runs handlers last in, first out, so the trace is written before the
+        # worker pool registered above is stopped
+        start_tracing(args.trace, sys.stderr if args.batch else sys.stdout)
+
+    # The client is only built when the first request actually reaches the API
+    client = LazyGeminiClient(create_gemini_client)
+    # Shared by every session, since they all draw on the same API quota
+    scheduler = RateLimitScheduler(args.rpm, args.tpm)
+
+    if args.batch:
+        model_client = build_model_client(client, scheduler, response_cache)
+        all_completed = run_batch_file(model_client, args.batch, args.concurrency, verbose, stream)
+        if verbose:
+            print(scheduler.summary(), file=sys.stderr)
+            if response_cache:
+                print(response_cache.summary(), file=sys.stderr)
+        if not all_completed:
+            sys.exit(1)
+        return
+
+    user_prompt = " ".join(args.prompt)
 
     if verbose:
         print(f"User prompt: {user_prompt}\n")
 
+    if args.use_async:
+        model_client = build_model_client(client, scheduler, response_cache)
+        final_response = asyncio.run(
+            run_session(model_client, user_prompt, verbose, stream=stream)
+        )
+        if verbose:
+            print(scheduler.summary())
+            if response_cache:
+                print(response_cache.summary())
+        if final_response is None:
+            print(f"Maximum iterations ({MAX_ITERS}) reached.")
+            sys.exit(1)
+        if not stream:
+            print("Final response:")
+            print(final_response)
+        return
+
     messages = [
         types.Content(role="user", parts=[types.Part(text=user_prompt)]),
     ]
+    history = HistoryManager()
+    cache = ToolResultCache()
 
     iters = 0
-    while True:
-        iters += 1
-        if iters > MAX_ITERS:
-            print(f"Maximum iterations ({MAX_ITERS}) reached.")
-            sys.exit(1)
+    with span("session", "session") as session_span:
+        while True:
+            iters += 1
+            if iters > MAX_ITERS:
+                print(f"Maximum iterations ({MAX_ITERS}) reached.")
+                if verbose:
+                    print(cache.summary())
+                    print(scheduler.summary())
+                    if response_cache:
+                        print(response_cache.summary())
+                sys.exit(1)
 
-        try:
-            final_response = generate_content(client, messages, verbose)
-            if final_response:
-                print("Final response:")
-                print(final_response)
-                break
-        except Exception as e:
-            print(f"Error in generate_content: {e}")
+            try:
+                with span("iteration", "agent", iteration=iters):
+                    final_response = generate_content(
+                        client, messages, verbose, stream, history, cache, response_cache, scheduler
+                    )
+                if final_response:
+                    # Streamed responses have already been printed as they arrived
+                    if not stream:
+                        print("Final response:")
+                        print(final_response)
+                    break
+            except ResponseCacheMiss as e:
+                # Retrying would send the same unrecorded request again
+                print(f"Error: {e}. Record it by running again with --cache=record.")
+                sys.exit(1)
+            except Exception as e:
+                print(f"Error in generate_content: {e}")
+        session_span.set(iterations=iters)
+
+    if verbose:
+        print(cache.summary())
+        print(scheduler.summary())
+        if response_cache:
+            print(response_cache.summary())
 
 
-def generate_content(client: genai.Client, messages: list[types.Content], verbose: bool) -> str | None:
+def start_tracing(path: str, summary_stream: TextIO) -> None:
+    """
+    Enable tracing, and write the trace and print its summary when the process exits.
+
+    Args:
+        path: The path the Chrome trace is written to.
+        summary_stream: The stream the summary table is printed to.
+    """
+    import atexit
+
+    from tracing import enable_tracing
+
+    tracer = enable_tracing()
+
+    def finish() -> None:
+        tracer.export(path)
+        print(tracer.summary(), file=summary_stream)
+        print(f"Trace written to {path}", file=summary_stream)
+
+    atexit.register(finish)
+
+
+def build_model_client(
+    client: genai.Client, scheduler: RateLimitScheduler, response_cache: ResponseCache | None
+) -> ModelClient:
+    """
+    Build the async model client used by the asyncio agent loop and batch mode.
+
+    Requests go through the scheduler, below the response cache, so responses served
+    from the cache do not count against the rate limits.
+
+    Args:
+        client: The Gemini API client.
+        scheduler: The rate limit scheduler.
+        response_cache: The cache used to record and replay model responses, if any.
+
+    Returns:
+        The model client.
+    """
+    from model_client import GeminiModelClient
+    from rate_limiter import RateLimitedModelClient
+    from response_cache import CachedModelClient
+
+    model_client: ModelClient = RateLimitedModelClient(GeminiModelClient(client), scheduler)
+    if response_cache:
+        model_client = CachedModelClient(model_client, response_cache, MODEL_NAME)
+    return model_client
+
+
+def run_batch_file(model_client: ModelClient, path: str, concurrency: int, verbose: bool, stream: bool) -> bool:
+    """
+    Run the prompts of a JSONL file as concurrent sessions, writing JSONL results to stdout.
+
+    Everything the sessions print, such as the functions they call, goes to stderr
+    so stdout holds only the results.
+
+    Args:
+        model_client: The model client shared by all sessions.
+        path: The path of the JSONL file, or - for stdin.
+        concurrency: The maximum number of sessions running at once.
+        verbose: Whether to print verbose output.
+        stream: Whether to stream model responses.
+
+    Returns:
+        Whether every session produced a final response.
+    """
+    import asyncio
+    import contextlib
+
+    from batch import read_prompts, run_batch
+
+    output = sys.stdout
+    try:
+        with contextlib.ExitStack() as stack:
+            source = sys.stdin if path == "-" else stack.enter_context(open(path, encoding="utf-8"))
+            stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+            sessions_run, sessions_completed = asyncio.run(
+                run_batch(model_client, read_prompts(source), output, concurrency, verbose, stream=stream)
+            )
+    except (OSError, ValueError) as e:
+        print(f"Error: batch input {path}: {e}", file=sys.stderr)
+        return False
+
+    print(f"Batch finished: {sessions_completed} of {sessions_run} sessions completed", file=sys.stderr)
+    return sessions_completed == sessions_run
+
+
+def generate_content(
+    client: genai.Client,
+    messages: list[types.Content],
+    verbose: bool,
+    stream: bool = False,
+    history: HistoryManager | None = None,
+    cache: ToolResultCache | None = None,
+    response_cache: ResponseCache | None = None,
+    scheduler: RateLimitScheduler | None = None,
+) -> str | None:
     """
     Generate content using the Gemini API.
 
@@ -66,6 +299,13 @@ def generate_content(client: genai.Client, messages: list[types.Content], verbos
         client: The Gemini API client.
         messages: The conversation history.
         verbose: Whether to print verbose output.
+        stream: Whether to stream the response, printing text and starting
+                function calls as their parts arrive.
+        history: The history manager used to compact the conversation sent to the model.
+        cache: The session's tool result cache.
+        response_cache: The cache used to record and replay model responses.
+        scheduler: The scheduler that paces requests within the rate limits and retries
+                   them when they fail transiently.
 
     Returns:
         The generated text response or None if a function call was made.
@@ -73,41 +313,51 @@ def generate_content(client: genai.Client, messages: list[types.Content], verbos
     Raises:
         Exception: If there's an error in function call processing.
     """
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-001",
-        contents=messages,
-        config=types.GenerateContentConfig(
-            tools=[available_functions], system_instruction=system_prompt
-        ),
-    )
-    if verbose:
-        print("Prompt tokens:", response.usage_metadata.prompt_token_count)
-        print("Response tokens:", response.usage_metadata.candidates_token_count)
-
-    if response.candidates:
-        for candidate in response.candidates:
-            function_call_content = candidate.content
-            messages.append(function_call_content)
-
-    if not response.function_calls:
-        return response.text
-
-    function_responses = []
-    for function_call_part in response.function_calls:
-        function_call_result = call_function(function_call_part, verbose)
-        if (
-            not function_call_result.parts
-            or not function_call_result.parts[0].function_response
-        ):
-            raise Exception("empty function call result")
-        if verbose:
-            print(f"-> {function_call_result.parts[0].function_response.response}")
-        function_responses.append(function_call_result.parts[0])
+    from agent import StreamedResponse, build_config, handle_response, trace_usage
+    from history import estimate_tokens
+    from tracing import span
+
+    contents = history.compact(messages) if history else messages
+    config = build_config()
+    tokens = estimate_tokens(contents)
+
+    def send() -> types.GenerateContentResponse:
+        return client.models.generate_content(model=MODEL_NAME, contents=contents, config=config)
 
-    if not function_responses:
-        raise Exception("no function responses generated, exiting.")
+    def send_stream() -> Iterator[types.GenerateContentResponse]:
+        return client.models.generate_content_stream(model=MODEL_NAME, contents=contents, config=config)
+
+    def request() -> types.GenerateContentResponse:
+        return scheduler.call(send, tokens) if scheduler else send()
+
+    if response_cache and response_cache.mode != "passthrough":
+        # Only whole responses are recorded, so a streamed turn replays as a single chunk
+        with span("generate_content", "model", messages=len(contents), cache=response_cache.mode) as model_span:
+            response = response_cache.fetch(MODEL_NAME, contents, config, request)
+            trace_usage(model_span, response.usage_metadata)
+        if stream:
+            streamed_response = StreamedResponse(verbose, history, cache)
+            streamed_response.add_chunk(response)
+            return streamed_response.finish(messages)
+        return handle_response(response, messages, verbose, history, cache)
+
+    if stream:
+        streamed_response = StreamedResponse(verbose, history, cache)
+        try:
+            chunks = scheduler.stream(send_stream, tokens) if scheduler else send_stream()
+            with span("generate_content_stream", "model", messages=len(contents)) as model_span:
+                for chunk in chunks:
+                    streamed_response.add_chunk(chunk)
+                trace_usage(model_span, streamed_response.usage_metadata)
+        except BaseException:
+            streamed_response.dispatcher.close()
+            raise
+        return streamed_response.finish(messages)
 
-    messages.append(types.Content(role="tool", parts=function_responses))
+    with span("generate_content", "model", messages=len(contents)) as model_span:
+        response = request()
+        trace_usage(model_span, response.usage_metadata)
+    return handle_response(response, messages, verbose, history, cache)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,201 @@
+"""
+Model client module for the AI Code Assistant.
+
+This module defines the interface the agent loop uses to request content from a
+language model, an implementation backed by the async Gemini client, a stand-in
+that defers building the Gemini client until it is used, and a local fake client
+that lets the agent loop run without network access.
+"""
+
+import asyncio
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, List, Optional, Sequence
+
+from google import genai
+from google.genai import types
+
+from config import MODEL_NAME
+
+
+class ModelClient(ABC):
+    """Interface for non-blocking model clients used by the async agent loop."""
+
+    @abstractmethod
+    async def generate_content(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> types.GenerateContentResponse:
+        """
+        Generate the next model response for a conversation.
+
+        Args:
+            contents: The conversation history.
+            config: The generation config, including tools and system instruction.
+
+        Returns:
+            The model response.
+        """
+
+    async def generate_content_stream(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> AsyncIterator[types.GenerateContentResponse]:
+        """
+        Generate the next model response as a stream of partial responses.
+
+        Clients without a streaming surface yield the full response as one chunk.
+
+        Args:
+            contents: The conversation history.
+            config: The generation config, including tools and system instruction.
+
+        Yields:
+            Partial model responses, in the order they were generated.
+        """
+        yield await self.generate_content(contents, config)
+
+
+class GeminiModelClient(ModelClient):
+    """Model client backed by the async surface of the Gemini API client."""
+
+    def __init__(self, client: genai.Client, model: str = MODEL_NAME) -> None:
+        """
+        Initialize the client.
+
+        Args:
+            client: The Gemini API client.
+            model: The name of the model to use.
+        """
+        self.client = client
+        self.model = model
+
+    async def generate_content(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> types.GenerateContentResponse:
+        return await self.client.aio.models.generate_content(
+            model=self.model, contents=contents, config=config
+        )
+
+    async def generate_content_stream(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> AsyncIterator[types.GenerateContentResponse]:
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model, contents=contents, config=config
+        )
+        async for chunk in stream:
+            yield chunk
+
+
+class LazyGeminiClient:
+    """
+    Stand-in for a Gemini API client that builds the real client on first use.
+
+    Runs served entirely from the response cache, or that fail before their first
+    model call, never pay for constructing the client.
+    """
+
+    def __init__(self, factory: Callable[[], genai.Client]) -> None:
+        """
+        Initialize the stand-in.
+
+        Args:
+            factory: Builds the real client.
+        """
+        self._factory = factory
+        self._client: Optional[genai.Client] = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name: str) -> Any:
+        with self._lock:
+            if self._client is None:
+                self._client = self._factory()
+        return getattr(self._client, name)
+
+
+def create_gemini_client() -> genai.Client:
+    """
+    Build a Gemini API client from GEMINI_API_KEY, loading a .env file first if present.
+
+    Returns:
+        The client.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+
+
+class FakeModelClient(ModelClient):
+    """
+    Local model client that replays a fixed script of function calls.
+
+    Each response requests the next turn of function calls from the script,
+    and once the script is exhausted the client answers with final_text.
+    Useful for load-testing the agent loop without network access.
+    """
+
+    def __init__(
+        self,
+        script: Optional[Sequence[Sequence[types.FunctionCall]]] = None,
+        final_text: str = "Done.",
+        latency: float = 0.0,
+    ) -> None:
+        """
+        Initialize the fake client.
+
+        Args:
+            script: The function calls to request, one sequence per turn.
+                    Defaults to a single turn listing the working directory.
+            final_text: The text returned once the script is exhausted.
+            latency: Simulated model latency in seconds per request.
+        """
+        if script is None:
+            script = [[types.FunctionCall(name="get_files_info", args={"directory": "."})]]
+        self.script = [list(turn) for turn in script]
+        self.final_text = final_text
+        self.latency = latency
+
+    async def generate_content(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> types.GenerateContentResponse:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        turn = sum(1 for content in contents if content.role == "tool")
+        if turn < len(self.script):
+            parts = [types.Part(function_call=function_call) for function_call in self.script[turn]]
+        else:
+            parts = [types.Part(text=self.final_text)]
+
+        # Approximate token counts at four characters per token
+        prompt_chars = sum(
+            len(str(part.to_json_dict())) for content in contents for part in content.parts or []
+        )
+        response_chars = sum(len(str(part.to_json_dict())) for part in parts)
+
+        return types.GenerateContentResponse(
+            candidates=[types.Candidate(content=types.Content(role="model", parts=parts))],
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_chars // 4,
+                candidates_token_count=response_chars // 4,
+            ),
+        )
+
+    async def generate_content_stream(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> AsyncIterator[types.GenerateContentResponse]:
+        response = await self.generate_content(contents, config)
+        parts = response.candidates[0].content.parts
+
+        # Stream each function call as its own chunk and text word by word
+        for index, part in enumerate(parts):
+            pieces = [part]
+            if part.text:
+                words = part.text.split(" ")
+                pieces = [types.Part(text=word + " ") for word in words[:-1]]
+                pieces.append(types.Part(text=words[-1]))
+            for piece in pieces:
+                yield types.GenerateContentResponse(
+                    candidates=[types.Candidate(content=types.Content(role="model", parts=[piece]))],
+                    usage_metadata=response.usage_metadata if index == len(parts) - 1 else None,
+                )
@@ -0,0 +1,599 @@
+"""
+Rate limiter module for the AI Code Assistant.
+
+This module schedules model requests within the API's per-minute request and token
+quotas, so concurrent sessions stay close to the quota without tripping it. Waiting
+requests are granted in priority order, and requests that fail with a rate-limit or
+transient server error are retried with exponential backoff and jitter instead of
+costing the session an iteration.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import random
+import re
+import threading
+import time
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from google.genai import errors, types
+
+from config import (
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_RPM,
+    RATE_LIMIT_TPM,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    RETRY_MAX_RETRIES,
+)
+from history import estimate_tokens
+from model_client import ModelClient
+from tracing import span
+
+T = TypeVar("T")
+
+# Status codes worth retrying: request timeout, rate limit and transient server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# Priority of the requests made from the current context; lower values are granted first
+request_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=0)
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to capacity units, refilled continuously at a fixed rate.
+
+    The level may go negative when a request turns out to use more than was taken
+    for it; later requests then wait until the debt is repaid.
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        Initialize a full bucket.
+
+        Args:
+            capacity: The most units the bucket holds.
+            refill_per_second: The units added per second.
+            clock: Returns the current time in seconds.
+        """
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.clock = clock
+        self.level = capacity
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.refill_per_second)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """
+        Compute how long until the bucket holds an amount.
+
+        Amounts larger than the capacity only wait for a full bucket.
+
+        Args:
+            amount: The units needed.
+
+        Returns:
+            The wait in seconds, or 0 if the amount is available now.
+        """
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(missing, 0.0) / self.refill_per_second
+
+    def consume(self, amount: float) -> None:
+        """
+        Take units from the bucket, or return them if the amount is negative.
+
+        Args:
+            amount: The units to take.
+        """
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+def quota_bucket(per_minute: int, burst: float, clock: Callable[[], float]) -> Optional[TokenBucket]:
+    """
+    Build a bucket that never lets more than a per-minute quota through in any minute.
+
+    A bucket holding B units that refills at R per minute can pass B + R units in
+    one minute, so the refill rate is the quota less the burst.
+
+    Args:
+        per_minute: The quota, or 0 for no limit.
+        burst: The fraction of the quota that may be sent at once.
+        clock: Returns the current time in seconds.
+
+    Returns:
+        The bucket, or None if there is no limit.
+    """
+    if per_minute <= 0:
+        return None
+    capacity = min(max(per_minute * burst, 1.0), per_minute / 2)
+    return TokenBucket(capacity, (per_minute - capacity) / 60.0, clock)
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Decide whether a failed model request is worth retrying.
+
+    Args:
+        error: The exception raised by the request.
+
+    Returns:
+        True for rate-limit, timeout and transient server errors, and for connection failures.
+    """
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # Connection failures inside the SDK's HTTP client, recognized by class so the
+    # client library does not have to be imported here
+    return any(
+        cls.__name__ == "TransportError" and cls.__module__.split(".")[0] == "httpx"
+        for cls in type(error).__mro__
+    )
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Read the delay the API asked for before retrying, if it gave one.
+
+    Args:
+        error: The exception raised by the request.
+
+    Returns:
+        The delay in seconds from a RetryInfo detail or a Retry-After header, or None.
+    """
+    if not isinstance(error, errors.APIError):
+        return None
+
+    error_json = error.details.get("error", {}) if isinstance(error.details, dict) else {}
+    for detail in error_json.get("details", []) if isinstance(error_json, dict) else []:
+        if isinstance(detail, dict) and str(detail.get("@type", "")).endswith("RetryInfo"):
+            match = re.fullmatch(r"(\d+(?:\.\d+)?)s", str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+
+    headers = getattr(error.response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def usage_tokens(response: Any) -> Optional[int]:
+    """
+    Read the total tokens a model response used.
+
+    Args:
+        response: The model response, or the last chunk of a streamed one.
+
+    Returns:
+        The total token count, or None if the response does not report it.
+    """
+    usage_metadata = getattr(response, "usage_metadata", None)
+    if usage_metadata is None:
+        return None
+    if usage_metadata.total_token_count:
+        return usage_metadata.total_token_count
+    if usage_metadata.prompt_token_count is None:
+        return None
+    return usage_metadata.prompt_token_count + (usage_metadata.candidates_token_count or 0)
+
+
+class _Waiter:
+    """A request waiting for the scheduler to grant it, from a thread or an event loop."""
+
+    def __init__(self, tokens: int, loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        self.tokens = tokens
+        self.loop = loop
+        self.event = asyncio.Event() if loop else threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+    def wake(self) -> None:
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.event.set)
+        else:
+            self.event.set()
+
+
+class RateLimitScheduler:
+    """
+    Client-side scheduler for model requests.
+
+    Requests are granted once both the requests-per-minute and the tokens-per-minute
+    buckets have room, highest priority first and in arrival order within a priority.
+    A request's tokens are estimated from its prompt when it is granted and corrected
+    from the usage the response reports. Failed requests are retried with exponential
+    backoff and jitter, and a rate-limit error holds back every waiting request, since
+    the quota is shared. The scheduler can be used from threads and event loops at once.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = RATE_LIMIT_RPM,
+        tokens_per_minute: int = RATE_LIMIT_TPM,
+        burst: float = RATE_LIMIT_BURST,
+        max_retries: int = RETRY_MAX_RETRIES,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Initialize the scheduler.
+
+        Args:
+            requests_per_minute: The request quota, or 0 for no limit.
+            tokens_per_minute: The token quota, or 0 for no limit.
+            burst: The fraction of each quota that may be sent at once.
+            max_retries: The number of times a failed request is retried.
+            base_delay: The backoff before the first retry, in seconds, doubled on each retry.
+            max_delay: The longest backoff, in seconds.
+            clock: Returns the current time in seconds.
+        """
+        self.requests = quota_bucket(requests_per_minute, burst, clock)
+        self.tokens = quota_bucket(tokens_per_minute, burst, clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.clock = clock
+        self.paused_until = 0.0
+        self.granted = 0
+        self.retries = 0
+        self.wait_seconds = 0.0
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+
+    def _delay(self, tokens: int) -> float:
+        """Compute how long until a request of a number of tokens fits. Called with the lock held."""
+        delay = self.paused_until - self.clock()
+        if self.requests is not None:
+            delay = max(delay, self.requests.time_until(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.time_until(tokens))
+        return max(delay, 0.0)
+
+    def _grant(self) -> float:
+        """
+        Grant waiting requests in priority order while they fit. Called with the lock held.
+
+        Returns:
+            How long until the first request still waiting fits, or 0 if none is waiting.
+        """
+        while self._queue:
+            waiter = self._queue[0][2]
+            if waiter.cancelled:
+                heapq.heappop(self._queue)
+                continue
+            delay = self._delay(waiter.tokens)
+            if delay > 0:
+                return delay
+            heapq.heappop(self._queue)
+            if self.requests is not None:
+                self.requests.consume(1)
+            if self.tokens is not None:
+                self.tokens.consume(waiter.tokens)
+            self.granted += 1
+            waiter.granted = True
+            waiter.wake()
+        return 0.0
+
+    def _enqueue(self, tokens: int, priority: int, loop: Optional[asyncio.AbstractEventLoop]) -> _Waiter:
+        waiter = _Waiter(tokens, loop)
+        with self._lock:
+            heapq.heappush(self._queue, (priority, next(self._order), waiter))
+        return waiter
+
+    def _poll(self, waiter: _Waiter) -> Optional[float]:
+        """Grant what fits and return how long the waiter should sleep, or None once granted."""
+        with self._lock:
+            delay = self._grant()
+            if waiter.granted:
+                return None
+            waiter.event.clear()
+            return delay or self.max_delay
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        """Withdraw a waiter whose caller gave up, returning its share if it was already granted."""
+        with self._lock:
+            if waiter.granted:
+                self._release(waiter.tokens)
+            else:
+                waiter.cancelled = True
+            self._grant()
+
+    def _release(self, tokens: int) -> None:
+        """Return a granted request's share of the quota. Called with the lock held."""
+        if self.requests is not None:
+            self.requests.consume(-1)
+        if self.tokens is not None:
+            self.tokens.consume(-tokens)
+        self.granted -= 1
+
+    def acquire(self, tokens: int = 0, priority: int = 0) -> None:
+        """
+        Block until a request may be sent.
+
+        Args:
+            tokens: The estimated tokens of the request.
+            priority: The request's priority; lower values are granted first.
+        """
+        start = self.clock()
+        waiter = self._enqueue(tokens, priority, None)
+        try:
+            with span("wait", "rate_limit", priority=priority):
+                while (delay := self._poll(waiter)) is not None:
+                    waiter.event.wait(delay)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        self.wait_seconds += self.clock() - start
+
+    async def aacquire(self, tokens: int = 0, priority: int = 0) -> None:
+        """
+        Wait, without blocking the event loop, until a request may be sent.
+
+        Args:
+            tokens: The estimated tokens of the request.
+            priority: The request's priority; lower values are granted first.
+        """
+        start = self.clock()
+        waiter = self._enqueue(tokens, priority, asyncio.get_running_loop())
+        try:
+            with span("wait", "rate_limit", priority=priority):
+                while (delay := self._poll(waiter)) is not None:
+                    try:
+                        await asyncio.wait_for(waiter.event.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        self.wait_seconds += self.clock() - start
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        Correct the tokens taken for a request once its actual usage is known.
+
+        Args:
+            estimated_tokens: The tokens taken when the request was granted.
+            actual_tokens: The tokens the response reported, or None if unknown.
+        """
+        if self.tokens is None or actual_tokens is None:
+            return
+        with self._lock:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+            self._grant()
+
+    def backoff(self, attempt: int, error: BaseException) -> float:
+        """
+        Compute the wait before retrying a failed request.
+
+        The delay doubles with each attempt up to max_delay, and is drawn from the
+        upper half of that range so retries from concurrent sessions spread out.
+        A delay requested by the API takes precedence. After a rate-limit error, no
+        request is granted until the delay has passed.
+
+        Args:
+            attempt: The number of retries already made for the request.
+            error: The exception raised by the request.
+
+        Returns:
+            The wait in seconds.
+        """
+        delay = retry_after(error)
+        if delay is None:
+            ceiling = min(self.max_delay, self.base_delay * 2 ** attempt)
+            delay = random.uniform(ceiling / 2, ceiling)
+
+        with self._lock:
+            self.retries += 1
+            if isinstance(error, errors.APIError) and error.code == 429:
+                self.paused_until = max(self.paused_until, self.clock() + delay)
+        return delay
+
+    def _should_retry(self, attempt: int, error: BaseException) -> bool:
+        return attempt < self.max_retries and is_retryable(error)
+
+    def call(self, request: Callable[[], T], tokens: int = 0, priority: int = 0) -> T:
+        """
+        Send a request when the quota allows, retrying it if it fails transiently.
+
+        Args:
+            request: Sends the request and returns the response.
+            tokens: The estimated tokens of the request.
+            priority: The request's priority; lower values are granted first.
+
+        Returns:
+            The response.
+
+        Raises:
+            Exception: The request's error, if it is not retryable or the retries ran out.
+        """
+        for attempt in itertools.count():
+            self.acquire(tokens, priority)
+            try:
+                response = request()
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                with span("backoff", "rate_limit", attempt=attempt + 1, error=type(e).__name__):
+                    time.sleep(self.backoff(attempt, e))
+                continue
+            self.settle(tokens, usage_tokens(response))
+            return response
+
+    async def acall(self, request: Callable[[], Awaitable[T]], tokens: int = 0, priority: int = 0) -> T:
+        """
+        Async version of call.
+
+        Args:
+            request: Returns an awaitable sending the request.
+            tokens: The estimated tokens of the request.
+            priority: The request's priority; lower values are granted first.
+
+        Returns:
+            The response.
+
+        Raises:
+            Exception: The request's error, if it is not retryable or the retries ran out.
+        """
+        for attempt in itertools.count():
+            await self.aacquire(tokens, priority)
+            try:
+                response = await request()
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                with span("backoff", "rate_limit", attempt=attempt + 1, error=type(e).__name__):
+                    await asyncio.sleep(self.backoff(attempt, e))
+                continue
+            self.settle(tokens, usage_tokens(response))
+            return response
+
+    def stream(self, request: Callable[[], Iterable[T]], tokens: int = 0, priority: int = 0) -> Iterator[T]:
+        """
+        Send a streamed request when the quota allows.
+
+        A failure is only retried before the first chunk arrives, since chunks already
+        handed to the caller cannot be taken back.
+
+        Args:
+            request: Sends the request and returns its chunks.
+            tokens: The estimated tokens of the request.
+            priority: The request's priority; lower values are granted first.
+
+        Yields:
+            The response chunks.
+
+        Raises:
+            Exception: The request's error, if it is not retryable, the retries ran out
+                       or chunks had already arrived.
+        """
+        for attempt in itertools.count():
+            self.acquire(tokens, priority)
+            last_chunk = None
+            try:
+                for chunk in request():
+                    last_chunk = chunk
+                    yield chunk
+            except Exception as e:
+                if last_chunk is not None or not self._should_retry(attempt, e):
+                    raise
+                with span("backoff", "rate_limit", attempt=attempt + 1, error=type(e).__name__):
+                    time.sleep(self.backoff(attempt, e))
+                continue
+            self.settle(tokens, usage_tokens(last_chunk))
+            return
+
+    async def astream(
+        self, request: Callable[[], AsyncIterator[T]], tokens: int = 0, priority: int = 0
+    ) -> AsyncIterator[T]:
+        """
+        Async version of stream.
+
+        Args:
+            request: Sends the request and returns an async iterator of its chunks.
+            tokens: The estimated tokens of the request.
+            priority: The request's priority; lower values are granted first.
+
+        Yields:
+            The response chunks.
+
+        Raises:
+            Exception: The request's error, if it is not retryable, the retries ran out
+                       or chunks had already arrived.
+        """
+        for attempt in itertools.count():
+            await self.aacquire(tokens, priority)
+            last_chunk = None
+            try:
+                async for chunk in request():
+                    last_chunk = chunk
+                    yield chunk
+            except Exception as e:
+                if last_chunk is not None or not self._should_retry(attempt, e):
+                    raise
+                with span("backoff", "rate_limit", attempt=attempt + 1, error=type(e).__name__):
+                    await asyncio.sleep(self.backoff(attempt, e))
+                continue
+            self.settle(tokens, usage_tokens(last_chunk))
+            return
+
+    def summary(self) -> str:
+        """
+        Describe the scheduler counters.
+
+        Returns:
+            A one-line summary of requests granted, retries and time spent waiting.
+        """
+        return f"Rate limiter: {self.granted} requests, {self.retries} retries, {self.wait_seconds:.1f}s waiting"
+
+
+def request_order(contents: List[types.Content]) -> int:
+    """
+    Compute the scheduling priority of a request from the current context and its conversation.
+
+    Within a priority set with request_priority, sessions further into their
+    conversation go first, so sessions already under way finish before new ones start.
+
+    Args:
+        contents: The conversation sent to the model.
+
+    Returns:
+        The priority; lower values are granted first.
+    """
+    turns = sum(1 for content in contents if content.role == "tool")
+    return request_priority.get() * 1_000_000 - turns
+
+
+class RateLimitedModelClient(ModelClient):
+    """Model client that sends requests through a RateLimitScheduler."""
+
+    def __init__(self, client: ModelClient, scheduler: RateLimitScheduler) -> None:
+        """
+        Initialize the client.
+
+        Args:
+            client: The model client that sends the requests.
+            scheduler: The scheduler, which may be shared with other clients on the same quota.
+        """
+        self.client = client
+        self.scheduler = scheduler
+
+    async def generate_content(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> types.GenerateContentResponse:
+        return await self.scheduler.acall(
+            lambda: self.client.generate_content(contents, config),
+            estimate_tokens(contents),
+            request_order(contents),
+        )
+
+    async def generate_content_stream(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> AsyncIterator[types.GenerateContentResponse]:
+        async for chunk in self.scheduler.astream(
+            lambda: self.client.generate_content_stream(contents, config),
+            estimate_tokens(contents),
+            request_order(contents),
+        ):
+            yield chunk
@@ -0,0 +1,301 @@
+"""
+Model response cache module for the AI Code Assistant.
+
+This module provides a disk-backed cache of model responses keyed by a stable
+hash of the request, so repeated runs on the same prompts can be replayed
+offline and deterministically instead of calling the Gemini API again.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zlib
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from google.genai import types
+
+from config import RESPONSE_CACHE_DIR, RESPONSE_CACHE_MAX_BYTES
+from model_client import ModelClient
+
+# Bump when the key derivation or the on-disk format changes
+CACHE_FORMAT_VERSION = 1
+CACHE_FILE_SUFFIX = ".json.z"
+
+
+class ResponseCacheMiss(Exception):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+class ResponseCache:
+    """
+    Disk-backed cache of model responses with size-bounded LRU eviction.
+
+    Modes:
+        record: Serve recorded responses and record the responses of new requests.
+        replay: Serve recorded responses only; new requests raise ResponseCacheMiss.
+        passthrough: Always call the model and record nothing.
+
+    Each response is stored as zlib-compressed JSON in its own file named after the
+    request key. A file's mtime is its last use, which drives the LRU eviction.
+    """
+
+    MODES = ("record", "replay", "passthrough")
+
+    def __init__(
+        self,
+        mode: str = "record",
+        directory: str = RESPONSE_CACHE_DIR,
+        max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+    ) -> None:
+        """
+        Initialize the cache.
+
+        Args:
+            mode: One of "record", "replay" or "passthrough".
+            directory: The directory holding the cached responses.
+            max_bytes: The total size of cached responses above which the least
+                       recently used ones are evicted.
+
+        Raises:
+            ValueError: If the mode is not supported.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown response cache mode: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    @staticmethod
+    def request_key(model: str, contents: List[types.Content], config: types.GenerateContentConfig) -> str:
+        """
+        Compute the stable key of a model request.
+
+        Args:
+            model: The model name.
+            contents: The conversation sent to the model.
+            config: The generation config, including tools and system instruction.
+
+        Returns:
+            A hex SHA-256 digest of the canonical JSON form of the request.
+        """
+        request = {
+            "version": CACHE_FORMAT_VERSION,
+            "model": model,
+            "contents": [content.model_dump(mode="json", exclude_none=True) for content in contents],
+            "config": config.model_dump(mode="json", exclude_none=True),
+        }
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + CACHE_FILE_SUFFIX)
+
+    def load(self, key: str) -> Optional[types.GenerateContentResponse]:
+        """
+        Load a recorded response and mark it as recently used.
+
+        Args:
+            key: The request key.
+
+        Returns:
+            The recorded response, or None if there is none.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = json.loads(zlib.decompress(f.read()))
+            os.utime(path)
+        except (OSError, ValueError, zlib.error):
+            return None
+        return types.GenerateContentResponse.model_validate(data)
+
+    def store(self, key: str, response: types.GenerateContentResponse) -> None:
+        """
+        Record a response, evicting the least recently used ones if the cache is full.
+
+        Args:
+            key: The request key.
+            response: The model response.
+        """
+        data = json.dumps(response.model_dump(mode="json", exclude_none=True), separators=(",", ":"))
+        payload = zlib.compress(data.encode(), 9)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write through a temporary file so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+
+        with self._lock:
+            # A re-recorded request replaces its old entry, whose size no longer counts
+            try:
+                replaced_bytes = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced_bytes = 0
+            os.replace(tmp_path, path)
+
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._total_bytes += len(payload) - replaced_bytes
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> List[tuple]:
+        """List the cached files as (mtime, size, path) tuples."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if not file_name.endswith(CACHE_FILE_SUFFIX):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+    def _lookup(self, key: str) -> Optional[types.GenerateContentResponse]:
+        """Load a response and count the hit or miss, raising on a miss in replay mode."""
+        response = self.load(key)
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if response is None and self.mode == "replay":
+            raise ResponseCacheMiss(f"No recorded response for request {key[:12]}")
+        return response
+
+    def fetch(
+        self,
+        model: str,
+        contents: List[types.Content],
+        config: types.GenerateContentConfig,
+        generate: Callable[[], types.GenerateContentResponse],
+    ) -> types.GenerateContentResponse:
+        """
+        Return the response to a request, calling the model only when the mode requires it.
+
+        Args:
+            model: The model name.
+            contents: The conversation sent to the model.
+            config: The generation config.
+            generate: Calls the model for this request.
+
+        Returns:
+            The recorded or freshly generated response.
+
+        Raises:
+            ResponseCacheMiss: In replay mode, if the request was never recorded.
+        """
+        if self.mode == "passthrough":
+            return generate()
+
+        key = self.request_key(model, contents, config)
+        response = self._lookup(key)
+        if response is None:
+            response = generate()
+            self.store(key, response)
+        return response
+
+    async def afetch(
+        self,
+        model: str,
+        contents: List[types.Content],
+        config: types.GenerateContentConfig,
+        generate: Callable[[], Awaitable[types.GenerateContentResponse]],
+    ) -> types.GenerateContentResponse:
+        """
+        Async version of fetch, for non-blocking model clients.
+
+        Args:
+            model: The model name.
+            contents: The conversation sent to the model.
+            config: The generation config.
+            generate: Returns an awaitable calling the model for this request.
+
+        Returns:
+            The recorded or freshly generated response.
+
+        Raises:
+            ResponseCacheMiss: In replay mode, if the request was never recorded.
+        """
+        if self.mode == "passthrough":
+            return await generate()
+
+        key = self.request_key(model, contents, config)
+        response = self._lookup(key)
+        if response is None:
+            response = await generate()
+            self.store(key, response)
+        return response
+
+    def summary(self) -> str:
+        """
+        Describe the cache counters.
+
+        Returns:
+            A one-line summary of response cache hits and misses.
+        """
+        return f"Response cache ({self.mode}): {self.hits} hits, {self.misses} misses"
+
+
+class CachedModelClient(ModelClient):
+    """
+    Model client that serves requests through a ResponseCache.
+
+    Streamed requests are served as a single chunk unless the cache is in
+    passthrough mode, since only whole responses are recorded.
+    """
+
+    def __init__(self, client: ModelClient, cache: ResponseCache, model: str) -> None:
+        """
+        Initialize the client.
+
+        Args:
+            client: The model client used on cache misses.
+            cache: The response cache.
+            model: The model name, which is part of every request key.
+        """
+        self.client = client
+        self.cache = cache
+        self.model = model
+
+    async def generate_content(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> types.GenerateContentResponse:
+        return await self.cache.afetch(
+            self.model, contents, config, lambda: self.client.generate_content(contents, config)
+        )
+
+    async def generate_content_stream(
+        self, contents: List[types.Content], config: types.GenerateContentConfig
+    ) -> AsyncIterator[types.GenerateContentResponse]:
+        if self.cache.mode == "passthrough":
+            async for chunk in self.client.generate_content_stream(contents, config):
+                yield chunk
+        else:
+            yield await self.generate_content(contents, config)
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+
+from google.genai import types
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import run_session, run_sessions
+from model_client import FakeModelClient
+
+
+class GatedClient(FakeModelClient):
+    """Fake client whose first requests wait until every session has one in flight."""
+
+    def __init__(self, sessions, **kwargs):
+        super().__init__(**kwargs)
+        self.sessions = sessions
+        self.in_flight = 0
+        self.peak = 0
+        self.all_in_flight = asyncio.Event()
+
+    async def generate_content(self, contents, config):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        if self.in_flight == self.sessions:
+            self.all_in_flight.set()
+        try:
+            if len(contents) == 1:
+                # Only sessions running concurrently can all get past this point
+                await asyncio.wait_for(self.all_in_flight.wait(), timeout=5)
+            return await super().generate_content(contents, config)
+        finally:
+            self.in_flight -= 1
+
+
+def test_run_session_with_fake_client():
+    """Test that a session runs the scripted function calls and returns the final text."""
+    client = FakeModelClient(
+        script=[
+            [types.FunctionCall(name="get_files_info", args={"directory": "pkg"})],
+            [types.FunctionCall(name="get_file_content", args={"file_path": "main.py"})],
+        ],
+        final_text="All done.",
+    )
+
+    result = asyncio.run(run_session(client, "explore the calculator"))
+    assert result == "All done."
+
+
+def test_run_session_max_iters():
+    """Test that a session stops once the iteration limit is reached."""
+    client = FakeModelClient(
+        script=[[types.FunctionCall(name="get_files_info", args={})]] * 5
+    )
+
+    result = asyncio.run(run_session(client, "keep listing", max_iters=3))
+    assert result is None
+
+
+def test_run_sessions_concurrently():
+    """Test that many sessions have their model requests in flight at the same time."""
+    prompts = [f"prompt {i}" for i in range(200)]
+    client = GatedClient(len(prompts))
+
+    results = asyncio.run(run_sessions(client, prompts))
+
+    assert results == ["Done."] * len(prompts)
+    assert client.peak == len(prompts)
+
+
+def test_run_session_streaming(capsys):
+    """Test that streamed text is printed as it arrives and tool calls still run."""
+    client = FakeModelClient(
+        script=[[
+            types.FunctionCall(name="get_file_content", args={"file_path": "main.py"}),
+            types.FunctionCall(name="get_files_info", args={"directory": "pkg"}),
+        ]],
+        final_text="The calculator looks fine.",
+    )
+
+    result = asyncio.run(run_session(client, "explore the calculator", stream=True))
+    assert result == "The calculator looks fine."
+    assert "The calculator looks fine.\n" in capsys.readouterr().out
@@ -0,0 +1,83 @@
+import asyncio
+import io
+import json
+import os
+import sys
+
+import pytest
+from google.genai import types
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import run_session_result
+from batch import read_prompts, run_batch
+from model_client import FakeModelClient
+
+
+class CountingClient(FakeModelClient):
+    """Fake client that records the peak number of requests in flight."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.in_flight = 0
+        self.peak = 0
+
+    async def generate_content(self, contents, config):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await super().generate_content(contents, config)
+        finally:
+            self.in_flight -= 1
+
+
+def test_read_prompts():
+    """Test that prompts are read from strings and objects, numbered by line when they have no id."""
+    lines = ['{"id": "a", "prompt": "first"}\n', '\n', '"second"\n']
+    assert list(read_prompts(lines)) == [("a", "first"), (3, "second")]
+
+    with pytest.raises(ValueError, match="line 1"):
+        list(read_prompts(['{"id": 1}']))
+    with pytest.raises(ValueError, match="line 2"):
+        list(read_prompts(['"ok"', "not json"]))
+
+
+def test_session_result_reports_usage():
+    """Test that a session reports its iterations, token usage and wall time."""
+    client = FakeModelClient(script=[[types.FunctionCall(name="get_files_info", args={})]])
+    result = asyncio.run(run_session_result(client, "list the files"))
+
+    assert result.completed and result.response == "Done."
+    assert result.iterations == 2
+    assert result.prompt_tokens > 0 and result.response_tokens > 0
+    assert result.wall_time > 0 and result.error is None
+
+
+def test_run_batch_limits_concurrency_and_streams_results():
+    """Test that a batch never runs more sessions than its limit and writes one record per prompt."""
+    client = CountingClient(latency=0.01)
+    prompts = [(i, f"prompt {i}") for i in range(20)]
+    output = io.StringIO()
+
+    sessions_run, sessions_completed = asyncio.run(run_batch(client, iter(prompts), output, concurrency=4))
+
+    assert (sessions_run, sessions_completed) == (20, 20)
+    assert client.peak == 4
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(record["id"] for record in records) == list(range(20))
+    assert all(record["completed"] and record["iterations"] == 2 for record in records)
+
+
+def test_run_batch_reports_incomplete_sessions():
+    """Test that sessions hitting the iteration limit are recorded as not completed."""
+    client = FakeModelClient(script=[[types.FunctionCall(name="get_files_info", args={})]] * 5)
+    output = io.StringIO()
+
+    sessions_run, sessions_completed = asyncio.run(
+        run_batch(client, [("x", "keep listing")], output, max_iters=2)
+    )
+
+    assert (sessions_run, sessions_completed) == (1, 0)
+    record = json.loads(output.getvalue())
+    assert record == {**record, "id": "x", "completed": False, "response": None, "iterations": 2}
@@ -5,7 +5,7 @@ from google.genai import types
 # Add the parent directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from call_function import call_function
+from call_function import ToolResultCache, call_function, call_functions, paths_conflict, touched_path
 
 def extract_result(content: types.Content | str) -> str:
     """
@@ -119,6 +119,136 @@ def test_extract_result():
     print(result)
     assert result == "Error: Test error"
 
+def test_paths_conflict():
+    """Test which pairs of calls must keep their requested order."""
+    assert paths_conflict(("/wd/a.py", False), ("/wd/a.py", False))
+    assert paths_conflict(("/wd/pkg", False), ("/wd/pkg/a.py", True))
+    assert not paths_conflict(("/wd/pkg", False), ("/wd/pkg/a.py", False))
+    assert not paths_conflict(("/wd/a.py", True), ("/wd/b.py", True))
+    assert not paths_conflict(("/wd/pkg", True), ("/wd/pkg2", False))
+
+
+def test_call_functions_keeps_request_order():
+    """Test that concurrent results come back in the order they were requested."""
+    function_calls = [
+        types.FunctionCall(name="get_file_content", args={"file_path": "main.py"}),
+        types.FunctionCall(name="get_files_info", args={"directory": "pkg"}),
+        types.FunctionCall(name="get_file_content", args={"file_path": "pkg/render.py"}),
+        types.FunctionCall(name="non_existent_function", args={}),
+    ]
+
+    results = call_functions(function_calls)
+    names = [result.parts[0].function_response.name for result in results]
+    assert names == [function_call.name for function_call in function_calls]
+    assert "Command-line interface" in extract_result(results[0])
+    assert "render.py" in extract_result(results[1])
+    assert "def render" in extract_result(results[2])
+
+
+def test_call_functions_write_after_read():
+    """Test that reads and writes of the same path run in the requested order."""
+    file_path = "test_call_functions_tmp.txt"
+    function_calls = [
+        types.FunctionCall(name="write_file", args={"file_path": file_path, "content": "first"}),
+        types.FunctionCall(name="get_file_content", args={"file_path": file_path}),
+        types.FunctionCall(name="write_file", args={"file_path": file_path, "content": "second"}),
+        types.FunctionCall(name="get_file_content", args={"file_path": file_path}),
+    ]
+
+    try:
+        results = call_functions(function_calls)
+    finally:
+        os.remove(os.path.join("calculator", file_path))
+
+    assert extract_result(results[1]) == "first"
+    assert extract_result(results[3]) == "second"
+
+def test_tool_result_cache_hits_and_invalidation():
+    """Test that repeated reads are cached and write_file invalidates them."""
+    cache = ToolResultCache()
+    file_path = "test_tool_result_cache_tmp.txt"
+    write = types.FunctionCall(name="write_file", args={"file_path": file_path, "content": "first"})
+    read = types.FunctionCall(name="get_file_content", args={"file_path": file_path})
+    listing = types.FunctionCall(name="get_files_info", args={"directory": "."})
+
+    try:
+        call_function(write, cache=cache)
+        assert extract_result(call_function(read, cache=cache)) == "first"
+        assert extract_result(call_function(read, cache=cache)) == "first"
+        call_function(listing, cache=cache)
+        call_function(listing, cache=cache)
+        assert (cache.hits, cache.misses) == (2, 2)
+
+        call_function(types.FunctionCall(name="write_file", args={"file_path": file_path, "content": "second!"}), cache=cache)
+        assert extract_result(call_function(read, cache=cache)) == "second!"
+        assert "file_size=7" in extract_result(call_function(listing, cache=cache))
+        assert (cache.hits, cache.misses) == (2, 4)
+    finally:
+        os.remove(os.path.join("calculator", file_path))
+
+
+def test_symlink_and_target_are_one_path():
+    """Test that a write through a symlink conflicts with, and invalidates, reads of its target."""
+    target, link = "test_symlink_target_tmp.txt", "test_symlink_link_tmp.txt"
+    with open(os.path.join("calculator", target), "w") as f:
+        f.write("first")
+    os.symlink(target, os.path.join("calculator", link))
+    cache = ToolResultCache()
+    read = types.FunctionCall(name="get_file_content", args={"file_path": target})
+    write = types.FunctionCall(name="write_file", args={"file_path": link, "content": "second"})
+
+    try:
+        assert touched_path(write)[0] == touched_path(read)[0]
+        assert paths_conflict(touched_path(read), touched_path(write))
+
+        assert extract_result(call_function(read, cache=cache)) == "first"
+        call_function(write, cache=cache)
+        assert extract_result(call_function(read, cache=cache)) == "second"
+        assert cache.hits == 0
+    finally:
+        os.remove(os.path.join("calculator", link))
+        os.remove(os.path.join("calculator", target))
+
+
+def test_tool_result_cache_python_runs():
+    """Test that run_python_file results are reused while the working directory is unchanged."""
+    cache = ToolResultCache()
+    run = types.FunctionCall(name="run_python_file", args={"file_path": "tests.py"})
+
+    first = extract_result(call_function(run, cache=cache))
+    second = extract_result(call_function(run, cache=cache))
+    assert first == second
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_search_files():
+    """Test that search_files is dispatched and finds a symbol in the working directory."""
+    function_call_part = types.FunctionCall(
+        name="search_files",
+        args={"pattern": "def evaluate", "glob": "*.py"},
+    )
+    content = extract_result(call_function(function_call_part))
+    assert "pkg/calculator.py:" in content
+
+
+def test_run_is_ordered_with_reads():
+    """Test that a read requested after a run waits for the run, which may write any file."""
+    script, output = "test_run_order_tmp.py", "test_run_order_tmp.txt"
+    with open(os.path.join("calculator", script), "w") as f:
+        f.write(f"import time\ntime.sleep(0.2)\nopen({output!r}, 'w').write('written by the run')\n")
+    run = types.FunctionCall(name="run_python_file", args={"file_path": script})
+    read = types.FunctionCall(name="get_file_content", args={"file_path": output})
+
+    try:
+        assert paths_conflict(touched_path(run), touched_path(read))
+        results = call_functions([run, read])
+    finally:
+        os.remove(os.path.join("calculator", script))
+        if os.path.exists(os.path.join("calculator", output)):
+            os.remove(os.path.join("calculator", output))
+
+    assert extract_result(results[1]) == "written by the run"
+
 
 if __name__ == "__main__":
     print("Testing call_function.py...")
@@ -126,4 +256,12 @@ if __name__ == "__main__":
     test_get_files_info()
     test_non_existent_function()
     test_extract_result()
+    test_paths_conflict()
+    test_call_functions_keeps_request_order()
+    test_call_functions_write_after_read()
+    test_tool_result_cache_hits_and_invalidation()
+    test_tool_result_cache_python_runs()
+    test_search_files()
+    test_run_is_ordered_with_reads()
     print("\nTests completed.")
+
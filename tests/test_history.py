@@ -0,0 +1,103 @@
+import os
+import sys
+
+from google.genai import types
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from history import (
+    DropStaleReads,
+    HistoryManager,
+    SummarizeOldTurns,
+    TruncateToolOutputs,
+    estimate_tokens,
+)
+
+
+def turn(name: str, args: dict, result: str) -> list[types.Content]:
+    """Build a model function call and the matching tool response."""
+    return [
+        types.Content(role="model", parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))]),
+        types.Content(role="tool", parts=[types.Part.from_function_response(name=name, response={"result": result})]),
+    ]
+
+
+def build_conversation() -> list[types.Content]:
+    """Build a conversation that reads a file, overwrites it and lists a directory."""
+    messages = [types.Content(role="user", parts=[types.Part(text="fix the calculator")])]
+    messages += turn("get_file_content", {"file_path": "main.py"}, "x" * 2000)
+    messages += turn("write_file", {"file_path": "main.py", "content": "y"}, "ok")
+    messages += turn("get_files_info", {"directory": "pkg"}, "z" * 2000)
+    return messages
+
+
+def results(messages: list[types.Content]) -> list[str]:
+    """Collect the function response results of a conversation."""
+    return [
+        part.function_response.response["result"]
+        for content in messages
+        for part in content.parts
+        if part.function_response
+    ]
+
+
+def test_drop_stale_reads():
+    """Test that a read overwritten later in the conversation is replaced."""
+    messages = build_conversation()
+    compacted = DropStaleReads().apply(messages)
+
+    assert results(compacted)[0].startswith("[stale:")
+    assert results(compacted)[2] == "z" * 2000
+    # The full history is left untouched
+    assert results(messages)[0] == "x" * 2000
+
+
+def test_drop_stale_reads_after_patch():
+    """Test that patch_file invalidates reads, comparing normalized paths."""
+    messages = [types.Content(role="user", parts=[types.Part(text="fix the calculator")])]
+    messages += turn("get_file_content", {"file_path": "./pkg/calc.py"}, "old")
+    messages += turn(
+        "get_files_content",
+        {"file_paths": ["pkg/calc.py", "main.py"]},
+        "==> pkg/calc.py <==\nold\n==> main.py <==\nfresh",
+    )
+    messages += turn("patch_file", {"file_path": "pkg//calc.py", "diff": "..."}, "ok")
+    compacted = results(DropStaleReads().apply(messages))
+
+    assert compacted[0] == '[stale: "./pkg/calc.py" was overwritten later in the conversation]'
+    assert compacted[1] == (
+        '==> pkg/calc.py <==\n[stale: "pkg/calc.py" was overwritten later in the conversation]\n'
+        "==> main.py <==\nfresh"
+    )
+
+
+def test_truncate_tool_outputs():
+    """Test that only responses outside the most recent turns are truncated."""
+    compacted = TruncateToolOutputs(keep_recent_turns=1, max_chars=100).apply(build_conversation())
+
+    assert len(results(compacted)[0]) < 200
+    assert results(compacted)[2] == "z" * 2000
+
+
+def test_summarize_old_turns():
+    """Test that old turns collapse into the opening prompt and roles still alternate."""
+    compacted = SummarizeOldTurns(keep_recent_turns=1).apply(build_conversation())
+
+    assert [content.role for content in compacted] == ["user", "model", "tool"]
+    summary = compacted[0].parts[-1].text
+    assert "called get_file_content(file_path='main.py')" in summary
+    assert "called write_file" in summary
+
+
+def test_history_manager_budget():
+    """Test that compaction only happens above the token budget and savings are recorded."""
+    messages = build_conversation()
+    assert HistoryManager(token_budget=10**6).compact(messages) == messages
+
+    history = HistoryManager(token_budget=100)
+    compacted = history.compact(messages)
+    assert estimate_tokens(compacted) < estimate_tokens(messages)
+
+    history.record_usage(types.GenerateContentResponseUsageMetadata(prompt_token_count=estimate_tokens(compacted)))
+    assert history.turns[-1].saved_tokens == estimate_tokens(messages) - estimate_tokens(compacted)
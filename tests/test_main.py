@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from import_report import format_report, parse_import_times
+from main import CACHE_MODES, build_parser
+from model_client import LazyGeminiClient
+from response_cache import ResponseCache
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def test_help_imports_no_sdk():
+    """Test that --help and a missing prompt exit without importing the Gemini SDK or any tool."""
+    code = (
+        "import sys, main\n"
+        "for argv in (['--help'], ['--verbose']):\n"
+        "    try:\n"
+        "        main.main(argv)\n"
+        "    except SystemExit:\n"
+        "        pass\n"
+        "print(sorted(m for m in sys.modules if m.startswith(('google', 'dotenv', 'functions', 'agent'))))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
+
+
+def test_parser_accepts_flags_between_prompt_words():
+    """Test that flags may appear before, between or after the prompt words."""
+    args = build_parser().parse_intermixed_args(["--verbose", "fix", "--cache=replay", "the", "bug", "--async"])
+    assert args.prompt == ["fix", "the", "bug"]
+    assert args.verbose and args.use_async and args.cache == "replay"
+    assert CACHE_MODES == ResponseCache.MODES
+
+
+def test_import_report():
+    """Test that -X importtime output is separated from other stderr and summarized by top-level import."""
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |   json.decoder\n"
+        "import time:       400 |        500 | json\n"
+        "import time:      2000 |       2000 | google.genai\n"
+        "a warning\n"
+    )
+    timings, other = parse_import_times(stderr)
+    assert other == ["a warning"]
+    assert [(t.module, t.depth) for t in timings] == [("json.decoder", 1), ("json", 0), ("google.genai", 0)]
+    report = format_report(timings, top=1)
+    assert "Total: 2.5 ms importing 3 modules" in report
+    assert "google.genai" in report and "json" not in report.split("cumulative):")[1]
+
+
+def test_lazy_client_is_built_once_on_first_use():
+    """Test that the client stand-in defers building the client until an attribute is used."""
+    built = []
+
+    class Client:
+        models = "models"
+
+    def factory():
+        built.append(True)
+        return Client()
+
+    client = LazyGeminiClient(factory)
+    assert built == []
+    assert client.models == "models"
+    assert client.models == "models"
+    assert built == [True]
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from google.genai import errors, types
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import run_session_result
+from model_client import FakeModelClient
+from rate_limiter import (
+    RateLimitedModelClient,
+    RateLimitScheduler,
+    TokenBucket,
+    is_retryable,
+    quota_bucket,
+    retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def rate_limit_error(retry_delay=None):
+    details = [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": retry_delay}] if retry_delay else []
+    return errors.ClientError(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED", "details": details}})
+
+
+class FlakyClient(FakeModelClient):
+    """Fake client whose first requests fail with a rate-limit error."""
+
+    def __init__(self, failures, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = failures
+        self.requests = 0
+
+    async def generate_content(self, contents, config):
+        self.requests += 1
+        if self.requests <= self.failures:
+            raise rate_limit_error()
+        return await super().generate_content(contents, config)
+
+
+def test_token_bucket_refills_over_time():
+    """Test that a bucket refills at its rate and that oversized amounts wait for a full bucket."""
+    clock = FakeClock()
+    bucket = TokenBucket(10, 2, clock)
+    bucket.consume(10)
+    assert bucket.time_until(4) == 2.0
+    clock.now = 2.0
+    assert bucket.time_until(4) == 0.0
+    assert bucket.time_until(100) == 3.0
+
+
+def test_quota_bucket_never_exceeds_quota_in_a_minute():
+    """Test that the burst plus one minute of refill equals the per-minute quota."""
+    bucket = quota_bucket(15, 0.1, FakeClock())
+    assert bucket.capacity + bucket.refill_per_second * 60 == pytest.approx(15)
+    assert quota_bucket(0, 0.1, FakeClock()) is None
+
+
+def test_requests_are_unlimited_by_default():
+    """Test that the default scheduler does not pace requests, only tokens."""
+    scheduler = RateLimitScheduler()
+    assert scheduler.requests is None
+    start = time.perf_counter()
+    for _ in range(20):
+        scheduler.call(lambda: "ok")
+    assert time.perf_counter() - start < 0.5
+    assert scheduler.granted == 20
+
+
+def test_retry_classification():
+    """Test which errors are retried and that the API's retry delay is honored."""
+    assert is_retryable(rate_limit_error())
+    assert is_retryable(errors.ServerError(503, {}))
+    assert not is_retryable(errors.ClientError(400, {}))
+    assert not is_retryable(ValueError("bad"))
+    assert retry_after(rate_limit_error("7s")) == 7.0
+    assert retry_after(rate_limit_error()) is None
+
+
+def test_http_client_connection_errors_are_retried():
+    """Test that the HTTP client's transport errors are retried without importing it."""
+    transport_error = type("TransportError", (Exception,), {"__module__": "httpx"})
+    connect_error = type("ConnectError", (transport_error,), {"__module__": "httpx"})
+    assert is_retryable(connect_error("connection refused"))
+    assert is_retryable(ConnectionResetError())
+    assert not is_retryable(type("TransportError", (Exception,), {})("elsewhere"))
+
+
+def test_requests_are_paced_within_the_quota():
+    """Test that requests beyond the burst wait for the bucket to refill."""
+    scheduler = RateLimitScheduler(requests_per_minute=600, tokens_per_minute=0, burst=0)
+    start = time.perf_counter()
+    for _ in range(4):
+        scheduler.call(lambda: "ok")
+    # One request passes at once, then one every 60 / 599 seconds
+    assert time.perf_counter() - start >= 0.25
+    assert scheduler.granted == 4
+
+
+def test_waiting_requests_are_granted_in_priority_order():
+    """Test that queued requests are granted by priority, then by arrival."""
+    scheduler = RateLimitScheduler(requests_per_minute=600, tokens_per_minute=0, burst=0)
+    order = []
+
+    async def request(name, priority):
+        await scheduler.aacquire(priority=priority)
+        order.append(name)
+
+    async def main():
+        await scheduler.aacquire()
+        await asyncio.gather(request("low", 5), request("high", 1), request("mid", 3), request("high2", 1))
+
+    asyncio.run(main())
+    assert order == ["high", "high2", "mid", "low"]
+
+
+def test_rate_limit_errors_are_retried_without_costing_iterations():
+    """Test that a session retries failed requests inside one iteration."""
+    client = FlakyClient(2, script=[])
+    scheduler = RateLimitScheduler(requests_per_minute=0, tokens_per_minute=0, base_delay=0.01)
+
+    result = asyncio.run(run_session_result(RateLimitedModelClient(client, scheduler), "hello"))
+
+    assert result.completed and result.iterations == 1
+    assert client.requests == 3 and scheduler.retries == 2
+
+
+def test_retries_give_up_after_max_retries():
+    """Test that the error surfaces once the retries run out."""
+    client = FlakyClient(10)
+    scheduler = RateLimitScheduler(requests_per_minute=0, tokens_per_minute=0, max_retries=2, base_delay=0.01)
+    contents = [types.Content(role="user", parts=[types.Part(text="hello")])]
+
+    with pytest.raises(errors.ClientError):
+        asyncio.run(RateLimitedModelClient(client, scheduler).generate_content(contents, types.GenerateContentConfig()))
+    assert client.requests == 3
+
+
+def test_settle_corrects_token_estimate():
+    """Test that the token bucket is charged the usage the response reports."""
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(requests_per_minute=0, tokens_per_minute=6000, burst=0.5, clock=clock)
+    response = types.GenerateContentResponse(
+        usage_metadata=types.GenerateContentResponseUsageMetadata(total_token_count=2000)
+    )
+    scheduler.call(lambda: response, tokens=100)
+    assert scheduler.tokens.level == 1000
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+from google.genai import types
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent import build_config, run_session, run_session_result
+from model_client import FakeModelClient
+from response_cache import CachedModelClient, ResponseCache, ResponseCacheMiss
+
+
+def prompt(text: str) -> list[types.Content]:
+    """Build a single-message conversation."""
+    return [types.Content(role="user", parts=[types.Part(text=text)])]
+
+
+def test_request_key_is_stable():
+    """Test that identical requests share a key and different ones do not."""
+    key = ResponseCache.request_key("model", prompt("hello"), build_config())
+    assert key == ResponseCache.request_key("model", prompt("hello"), build_config())
+    assert key != ResponseCache.request_key("model", prompt("hello!"), build_config())
+    assert key != ResponseCache.request_key("other-model", prompt("hello"), build_config())
+
+
+def test_record_then_replay():
+    """Test that a recorded session replays offline with identical results."""
+    with tempfile.TemporaryDirectory() as directory:
+        recorder = ResponseCache("record", directory)
+        result = asyncio.run(run_session(CachedModelClient(FakeModelClient(), recorder, "fake"), "list files"))
+        assert result == "Done."
+        assert (recorder.hits, recorder.misses) == (0, 2)
+
+        # A client that would answer differently proves the responses come from disk
+        replayer = ResponseCache("replay", directory)
+        replay_client = CachedModelClient(FakeModelClient(final_text="Different."), replayer, "fake")
+        assert asyncio.run(run_session(replay_client, "list files")) == "Done."
+        assert (replayer.hits, replayer.misses) == (2, 0)
+
+        try:
+            asyncio.run(replay_client.generate_content(prompt("never recorded"), build_config()))
+            assert False, "expected a replay miss"
+        except ResponseCacheMiss:
+            pass
+
+
+def test_replay_miss_stops_the_session():
+    """Test that a replay miss ends the session instead of retrying the same request."""
+    with tempfile.TemporaryDirectory() as directory:
+        replayer = ResponseCache("replay", directory)
+        client = CachedModelClient(FakeModelClient(), replayer, "fake")
+        result = asyncio.run(run_session_result(client, "never recorded", max_iters=5))
+
+        assert result.iterations == 1
+        assert not result.completed
+        assert "No recorded response" in result.error
+        assert replayer.misses == 1
+
+
+def test_lru_eviction():
+    """Test that the least recently used responses are evicted once the cache is full."""
+    response = types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text="x" * 100)]))]
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache("record", directory, max_bytes=10**6)
+        cache.store("aa01", response)
+        entry_size = os.path.getsize(cache._path("aa01"))
+        cache.max_bytes = entry_size * 2
+
+        cache.store("bb02", response)
+        os.utime(cache._path("aa01"), ns=(0, 0))
+        os.utime(cache._path("bb02"), ns=(1, 1))
+        assert cache.load("aa01") is not None  # refreshes aa01, leaving bb02 the oldest
+        cache.store("cc03", response)
+
+        assert cache.load("aa01") is not None
+        assert cache.load("bb02") is None
+        assert cache.load("cc03") is not None
+
+
+def test_re_recording_replaces_the_entry_size():
+    """Test that storing a request again does not count its old entry against the cache size, or evict."""
+    response = types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[types.Part(text="x" * 100)]))]
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        cache = ResponseCache("record", directory, max_bytes=10**6)
+        cache.store("aa01", response)
+        cache.store("bb02", response)
+        entry_size = os.path.getsize(cache._path("aa01"))
+        cache.max_bytes = entry_size * 2
+
+        evictions = []
+        cache._evict = lambda: evictions.append(cache._total_bytes)
+        for _ in range(5):
+            cache.store("aa01", response)
+        assert evictions == []
+        assert cache._total_bytes == entry_size * 2
+
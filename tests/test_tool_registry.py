@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from google.genai import types
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from call_function import call_function
+from tool_registry import ToolArgumentError, register_tool, registry
+
+
+def test_tool_modules_are_imported_lazily():
+    """Test that importing the dispatcher imports no tool module until a tool is used."""
+    code = (
+        "import sys, call_function; "
+        "print(any(m.startswith('functions.') for m in sys.modules)); "
+        "call_function.registry.get('get_file_content').function; "
+        "print(sorted(m for m in sys.modules if m.startswith('functions.')))"
+    )
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True).stdout
+    before, after = output.splitlines()
+    assert before == "False"
+    assert "functions.get_file_content" in after
+    assert "functions.run_python" not in after
+
+
+def test_validate_converts_and_drops():
+    """Test that arguments are converted to their declared types and injected or schema-only ones dropped."""
+    spec = registry.get("get_file_content")
+    args = spec.validate({"file_path": "main.py", "start_line": 3.0, "end_line": "5", "working_directory": "/"})
+    assert args == {"file_path": "main.py", "start_line": 3, "end_line": 5}
+    assert spec.validate({"file_path": "main.py", "directory": "."}) == {"file_path": "main.py"}
+
+
+def test_validate_rejects_bad_arguments():
+    """Test that missing, unknown and mistyped arguments are rejected."""
+    spec = registry.get("get_file_content")
+    with pytest.raises(ToolArgumentError, match="missing required argument 'file_path'"):
+        spec.validate({})
+    with pytest.raises(ToolArgumentError, match="unexpected argument 'path'"):
+        spec.validate({"file_path": "main.py", "path": "x"})
+    with pytest.raises(ToolArgumentError, match="must be an integer"):
+        spec.validate({"file_path": "main.py", "offset": 1.5})
+
+
+def test_invalid_arguments_are_reported_to_the_model():
+    """Test that call_function answers invalid arguments with an error response instead of raising."""
+    result = call_function(types.FunctionCall(name="get_file_content", args={}))
+    assert "Invalid arguments for get_file_content" in result.parts[0].function_response.response["error"]
+
+
+def test_register_third_party_tool():
+    """Test that a tool registered from outside call_function.py is offered and dispatched."""
+    def word_count(working_directory: str, text: str) -> str:
+        return str(len(text.split()))
+
+    schema = types.FunctionDeclaration(
+        name="word_count",
+        description="Count the words of a text.",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={"text": types.Schema(type=types.Type.STRING)},
+        ),
+    )
+    register_tool("word_count", word_count, schema)
+    try:
+        assert "word_count" in [declaration.name for declaration in registry.tool().function_declarations]
+        with pytest.raises(ValueError):
+            register_tool("word_count", word_count, schema)
+        result = call_function(types.FunctionCall(name="word_count", args={"text": "one two three"}))
+        assert result.parts[0].function_response.response["result"] == "3"
+    finally:
+        registry.unregister("word_count")
+    assert "word_count" not in [declaration.name for declaration in registry.tool().function_declarations]
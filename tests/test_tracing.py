@@ -0,0 +1,76 @@
+import asyncio
+import io
+import json
+import os
+import sys
+
+import pytest
+from google.genai import types
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batch import run_batch
+from model_client import FakeModelClient
+from tracing import Tracer, disable_tracing, enable_tracing, span
+
+
+@pytest.fixture
+def tracer():
+    tracer = enable_tracing()
+    yield tracer
+    disable_tracing()
+
+
+def test_span_is_free_when_tracing_is_off():
+    """Test that spans record nothing while tracing is off."""
+    with span("work", "tool") as work_span:
+        work_span.set(payload_chars=10)
+    assert work_span.attributes == {}
+
+
+def test_span_records_duration_attributes_and_errors(tracer):
+    """Test that spans keep their attributes and note the exception that ended them."""
+    with span("work", "tool", path="a.py") as work_span:
+        work_span.set(payload_chars=10)
+    with pytest.raises(ValueError):
+        with span("broken", "tool"):
+            raise ValueError("boom")
+
+    work, broken = tracer.spans
+    assert work.attributes == {"path": "a.py", "payload_chars": 10}
+    assert work.duration >= 0
+    assert broken.attributes == {"error": "ValueError"}
+
+
+def test_batch_trace_covers_model_calls_and_tools(tracer, tmp_path):
+    """Test that a traced batch records each session's model requests and tool runs."""
+    client = FakeModelClient(script=[[types.FunctionCall(name="get_files_info", args={})]])
+    asyncio.run(run_batch(client, [("a", "one"), ("b", "two")], io.StringIO()))
+
+    counts = {}
+    for recorded in tracer.spans:
+        counts[(recorded.category, recorded.name)] = counts.get((recorded.category, recorded.name), 0) + 1
+    assert counts[("session", "session")] == 2
+    assert counts[("model", "generate_content")] == 4
+    assert counts[("call_function", "get_files_info")] == 2
+    assert counts[("tool", "get_files_info")] == 2
+    assert {recorded.session for recorded in tracer.spans} == {"a", "b"}
+
+    model_spans = [recorded for recorded in tracer.spans if recorded.category == "model"]
+    assert all(recorded.attributes["prompt_tokens"] > 0 for recorded in model_spans)
+
+    summary = tracer.summary()
+    assert "model:generate_content" in summary and "tool:get_files_info" in summary
+
+    path = tmp_path / "trace.json"
+    tracer.export(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    sessions = {event["args"]["name"] for event in events if event["name"] == "process_name"}
+    assert sessions == {"session a", "session b"}
+    assert all(event["dur"] >= 0 for event in events if event["ph"] == "X")
+
+
+def test_empty_summary():
+    """Test the summary of a tracer without spans."""
+    assert Tracer().summary() == "Trace summary: no spans recorded"
@@ -0,0 +1,343 @@
+"""
+Tool registry module for the AI Code Assistant.
+
+This module declares every tool the model can call in one place: its schema, its
+callable, how its arguments are validated, and the metadata the dispatcher and the
+tool result cache need. Tool modules are imported lazily, the first time their
+schema or callable is needed, and tools from other packages can be added with
+register_tool without editing call_function.py.
+"""
+
+import importlib
+import inspect
+import threading
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from google.genai import types
+
+# Arguments injected by the dispatcher rather than passed by the model
+INJECTED_ARGUMENTS = {"working_directory"}
+
+
+class ToolArgumentError(ValueError):
+    """Raised when the model calls a tool with missing, unknown or mistyped arguments."""
+
+
+def load_reference(reference: Union[str, Any]) -> Any:
+    """
+    Load an object given as a "module:attribute" reference.
+
+    Args:
+        reference: The reference, or the object itself.
+
+    Returns:
+        The referenced object, importing its module if needed.
+    """
+    if not isinstance(reference, str):
+        return reference
+    module_name, _, attribute = reference.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def coerce_argument(name: str, value: Any, schema: Optional[types.Schema]) -> Any:
+    """
+    Convert an argument from the model to the type its schema declares.
+
+    JSON has a single number type, so integers may arrive as floats, and models
+    sometimes send booleans and numbers as strings.
+
+    Args:
+        name: The argument name, for error messages.
+        value: The argument value.
+        schema: The argument's schema, or None if it has none.
+
+    Returns:
+        The converted value.
+
+    Raises:
+        ToolArgumentError: If the value does not fit the declared type.
+    """
+    declared = schema.type if schema is not None else None
+    if value is None or declared is None:
+        return value
+
+    if declared == types.Type.INTEGER:
+        if isinstance(value, bool):
+            raise ToolArgumentError(f"argument '{name}' must be an integer")
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+            return int(value)
+        if not isinstance(value, int):
+            raise ToolArgumentError(f"argument '{name}' must be an integer")
+    elif declared == types.Type.BOOLEAN:
+        if isinstance(value, str) and value.lower() in ("true", "false"):
+            return value.lower() == "true"
+        if not isinstance(value, bool):
+            raise ToolArgumentError(f"argument '{name}' must be a boolean")
+    elif declared == types.Type.STRING:
+        if not isinstance(value, str):
+            raise ToolArgumentError(f"argument '{name}' must be a string")
+    elif declared == types.Type.ARRAY:
+        if isinstance(value, tuple):
+            return list(value)
+        if not isinstance(value, list):
+            raise ToolArgumentError(f"argument '{name}' must be a list")
+    return value
+
+
+class ToolSpec:
+    """
+    The declaration of one tool.
+
+    The callable and schema may be given directly or as "module:attribute"
+    references, which are imported on first use.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        function: Union[str, Callable[..., str]],
+        schema: Union[str, types.FunctionDeclaration],
+        path_argument: Optional[str] = None,
+        writes: bool = False,
+        cacheable: bool = False,
+        executes: bool = False,
+        validator: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        Declare a tool.
+
+        Args:
+            name: The name the model calls the tool by.
+            function: The callable, which receives the validated arguments and working_directory.
+            schema: The FunctionDeclaration shown to the model.
+            path_argument: The argument holding the path the tool operates on. Tools without
+                           one are treated as operating on the whole working directory.
+            writes: Whether the tool modifies the path it operates on.
+            cacheable: Whether results can be reused while the path is unchanged.
+            executes: Whether the tool runs code, which may read or modify anything in the
+                      working directory.
+            validator: An extra check run after the generic one. It receives the arguments
+                       and returns them, possibly changed, or raises ToolArgumentError.
+        """
+        self.name = name
+        self.path_argument = path_argument
+        self.writes = writes
+        self.cacheable = cacheable
+        self.executes = executes
+        self.validator = validator
+        self._function = function
+        self._schema = schema
+        self._parameters: Optional[Dict[str, Optional[types.Schema]]] = None
+        self._required: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def function(self) -> Callable[..., str]:
+        """The tool's callable, imported on first use."""
+        if isinstance(self._function, str):
+            self._function = load_reference(self._function)
+        return self._function
+
+    @property
+    def schema(self) -> types.FunctionDeclaration:
+        """The tool's schema, imported on first use."""
+        if isinstance(self._schema, str):
+            self._schema = load_reference(self._schema)
+        return self._schema
+
+    def validate(self, args: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Check the model's arguments against the callable's signature and the schema.
+
+        Arguments the callable does not accept are dropped if the schema declares them
+        or the dispatcher injects them, and rejected otherwise.
+
+        Args:
+            args: The arguments from the model.
+
+        Returns:
+            A new dictionary of arguments, converted to their declared types.
+
+        Raises:
+            ToolArgumentError: If an argument is missing, unknown or of the wrong type.
+        """
+        if self._parameters is None:
+            self._compile()
+
+        validated: Dict[str, Any] = {}
+        for name, value in (args or {}).items():
+            if name in self._parameters:
+                validated[name] = coerce_argument(name, value, self._parameters[name])
+            elif name not in INJECTED_ARGUMENTS and name not in (self.schema.parameters.properties or {}):
+                expected = ", ".join(sorted(self._parameters)) or "none"
+                raise ToolArgumentError(f"unexpected argument '{name}'; expected arguments: {expected}")
+
+        missing = [name for name in self._required if name not in validated]
+        if missing:
+            raise ToolArgumentError(f"missing required argument '{missing[0]}'")
+
+        if self.validator is not None:
+            validated = self.validator(validated)
+        return validated
+
+    def _compile(self) -> None:
+        """Derive the accepted arguments and their schemas once, on first validation."""
+        with self._lock:
+            if self._parameters is not None:
+                return
+            properties = (self.schema.parameters.properties if self.schema.parameters else None) or {}
+            parameters: Dict[str, Optional[types.Schema]] = {}
+            required: List[str] = []
+            for name, parameter in inspect.signature(self.function).parameters.items():
+                if name in INJECTED_ARGUMENTS or parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+                    continue
+                parameters[name] = properties.get(name)
+                if parameter.default is parameter.empty:
+                    required.append(name)
+            self._required = required
+            self._parameters = parameters
+
+
+class ToolRegistry:
+    """Registry of the tools offered to the model, keyed by name."""
+
+    def __init__(self) -> None:
+        """Initialize an empty registry."""
+        self._tools: Dict[str, ToolSpec] = {}
+        self._declarations: Optional[types.Tool] = None
+        self._lock = threading.Lock()
+
+    def register(self, spec: ToolSpec, replace: bool = False) -> ToolSpec:
+        """
+        Add a tool.
+
+        Args:
+            spec: The tool declaration.
+            replace: Whether to replace an existing tool of the same name.
+
+        Returns:
+            The registered spec.
+
+        Raises:
+            ValueError: If a tool of the same name exists and replace is False.
+        """
+        with self._lock:
+            if spec.name in self._tools and not replace:
+                raise ValueError(f"A tool named {spec.name!r} is already registered")
+            self._tools[spec.name] = spec
+            self._declarations = None
+        return spec
+
+    def unregister(self, name: str) -> None:
+        """
+        Remove a tool, if it is registered.
+
+        Args:
+            name: The tool name.
+        """
+        with self._lock:
+            if self._tools.pop(name, None) is not None:
+                self._declarations = None
+
+    def get(self, name: str) -> Optional[ToolSpec]:
+        """
+        Look up a tool.
+
+        Args:
+            name: The tool name.
+
+        Returns:
+            The tool's spec, or None if no such tool is registered.
+        """
+        return self._tools.get(name)
+
+    def tool(self) -> types.Tool:
+        """
+        Build the Tool listing every registered schema, importing tool modules as needed.
+
+        Returns:
+            The Tool to pass in the model's config, rebuilt only after registrations change.
+        """
+        declarations = self._declarations
+        if declarations is None:
+            with self._lock:
+                specs = list(self._tools.values())
+            declarations = types.Tool(function_declarations=[spec.schema for spec in specs])
+            self._declarations = declarations
+        return declarations
+
+
+registry = ToolRegistry()
+
+
+def register_tool(
+    name: str,
+    function: Union[str, Callable[..., str]],
+    schema: Union[str, types.FunctionDeclaration],
+    replace: bool = False,
+    **options: Any,
+) -> ToolSpec:
+    """
+    Register a tool with the default registry.
+
+    Args:
+        name: The name the model calls the tool by.
+        function: The callable, or a "module:attribute" reference to it.
+        schema: The FunctionDeclaration, or a "module:attribute" reference to it.
+        replace: Whether to replace an existing tool of the same name.
+        **options: The other ToolSpec options, such as path_argument and writes.
+
+    Returns:
+        The registered spec.
+    """
+    return registry.register(ToolSpec(name, function, schema, **options), replace=replace)
+
+
+register_tool(
+    "get_files_info",
+    "functions.get_files_info:get_files_info",
+    "functions.get_files_info:schema_get_files_info",
+    path_argument="directory",
+    cacheable=True,
+)
+register_tool(
+    "get_file_content",
+    "functions.get_file_content:get_file_content",
+    "functions.get_file_content:schema_get_file_content",
+    path_argument="file_path",
+    cacheable=True,
+)
+register_tool(
+    "get_files_content",
+    "functions.get_files_content:get_files_content",
+    "functions.get_files_content:schema_get_files_content",
+)
+register_tool(
+    "write_file",
+    "functions.write_file:write_file",
+    "functions.write_file:schema_write_file",
+    path_argument="file_path",
+    writes=True,
+)
+register_tool(
+    "patch_file",
+    "functions.patch_file:patch_file",
+    "functions.patch_file:schema_patch_file",
+    path_argument="file_path",
+    writes=True,
+)
+register_tool(
+    "run_python_file",
+    "functions.run_python:run_python_file",
+    "functions.run_python:schema_run_python_file",
+    cacheable=True,
+    executes=True,
+)
+register_tool(
+    "search_files",
+    "functions.search_files:search_files",
+    "functions.search_files:schema_search_files",
+    path_argument="directory",
+)
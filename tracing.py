@@ -0,0 +1,244 @@
+"""
+Tracing module for the AI Code Assistant.
+
+This module records where a session's wall-clock time goes: spans around each
+iteration, model request, rate limit wait, function call and tool run, with their
+token counts and payload sizes. Spans can be exported as a Chrome trace, which
+chrome://tracing and https://ui.perfetto.dev open, and summarized as a table.
+Tracing is off until enable_tracing is called, and spans cost next to nothing
+while it is off.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Tuple
+
+# The session the spans recorded in the current context belong to
+trace_session: contextvars.ContextVar[str] = contextvars.ContextVar("trace_session", default="main")
+
+# Numeric span attributes summed per row of the summary table
+SUMMED_ATTRIBUTES = ("prompt_tokens", "response_tokens", "payload_chars")
+
+
+@dataclass
+class Span:
+    """One timed operation."""
+
+    name: str
+    category: str
+    start: float
+    duration: float = 0.0
+    session: str = "main"
+    thread_id: int = 0
+    thread_name: str = ""
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any) -> None:
+        """
+        Add attributes to the span, such as counts known only once the operation ends.
+
+        Args:
+            **attributes: The attributes to add.
+        """
+        self.attributes.update(attributes)
+
+
+class _NullSpan(Span):
+    """Span handed out while tracing is off, which discards its attributes."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan("", "", 0.0)
+
+
+class Tracer:
+    """Collects spans from any thread or task of the process."""
+
+    def __init__(self) -> None:
+        """Initialize an empty tracer whose timeline starts now."""
+        self.origin = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Time the body of a with statement as a span.
+
+        Args:
+            name: The span name, such as the tool name.
+            category: The kind of operation, such as "model" or "tool".
+            **attributes: Attributes known when the operation starts.
+
+        Yields:
+            The span, to which attributes can be added.
+        """
+        thread = threading.current_thread()
+        span = Span(
+            name,
+            category,
+            time.perf_counter(),
+            session=trace_session.get(),
+            thread_id=thread.ident or 0,
+            thread_name=thread.name,
+            attributes=attributes,
+        )
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.start
+            with self._lock:
+                self.spans.append(span)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """
+        Convert the spans to the Chrome trace event format.
+
+        Each session becomes a process and each thread within it a track.
+
+        Returns:
+            The trace, ready to be serialized as JSON.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+
+        sessions: Dict[str, int] = {}
+        threads: Dict[Tuple[int, int], str] = {}
+        events: List[Dict[str, Any]] = []
+        for span in spans:
+            pid = sessions.setdefault(span.session, len(sessions) + 1)
+            threads.setdefault((pid, span.thread_id), span.thread_name)
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self.origin) * 1e6, 1),
+                "dur": round(span.duration * 1e6, 1),
+                "pid": pid,
+                "tid": span.thread_id,
+                "args": span.attributes,
+            })
+
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"session {session}"}}
+            for session, pid in sessions.items()
+        ]
+        metadata.extend(
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for (pid, tid), name in threads.items()
+        )
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> None:
+        """
+        Write the spans to a Chrome trace JSON file.
+
+        Args:
+            path: The path of the file.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+    def summary(self) -> str:
+        """
+        Summarize the spans by category and name.
+
+        Returns:
+            A table of call counts, total, mean and maximum durations, token counts
+            and payload sizes, slowest rows first.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        if not spans:
+            return "Trace summary: no spans recorded"
+
+        rows: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for span in spans:
+            row = rows.setdefault(
+                (span.category, span.name), {"calls": 0, "total": 0.0, "max": 0.0, **dict.fromkeys(SUMMED_ATTRIBUTES, 0)}
+            )
+            row["calls"] += 1
+            row["total"] += span.duration
+            row["max"] = max(row["max"], span.duration)
+            for attribute in SUMMED_ATTRIBUTES:
+                value = span.attributes.get(attribute)
+                if isinstance(value, (int, float)):
+                    row[attribute] += value
+
+        wall = max(span.start + span.duration for span in spans) - min(span.start for span in spans)
+        header = f"  {'Span':<32} {'Calls':>6} {'Total ms':>10} {'Mean ms':>9} {'Max ms':>9} {'Tokens in/out':>15} {'Payload':>9}"
+        lines = [f"Trace summary (wall time {wall * 1000:.1f} ms):", header, "  " + "-" * (len(header) - 2)]
+        for (category, name), row in sorted(rows.items(), key=lambda item: item[1]["total"], reverse=True):
+            tokens = f"{int(row['prompt_tokens'])}/{int(row['response_tokens'])}" if row["prompt_tokens"] or row["response_tokens"] else "-"
+            payload = str(int(row["payload_chars"])) if row["payload_chars"] else "-"
+            lines.append(
+                f"  {(category + ':' + name)[:32]:<32} {int(row['calls']):>6} {row['total'] * 1000:>10.1f} "
+                f"{row['total'] * 1000 / row['calls']:>9.1f} {row['max'] * 1000:>9.1f} {tokens:>15} {payload:>9}"
+            )
+        return "\n".join(lines)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable_tracing(tracer: Optional[Tracer] = None) -> Tracer:
+    """
+    Start recording spans.
+
+    Args:
+        tracer: The tracer to record into. Defaults to a new tracer.
+
+    Returns:
+        The enabled tracer.
+    """
+    global _tracer
+    _tracer = tracer or Tracer()
+    return _tracer
+
+
+def disable_tracing() -> None:
+    """Stop recording spans."""
+    global _tracer
+    _tracer = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    """
+    Get the enabled tracer.
+
+    Returns:
+        The enabled tracer, or None if tracing is off.
+    """
+    return _tracer
+
+
+def span(name: str, category: str, **attributes: Any) -> ContextManager[Span]:
+    """
+    Time the body of a with statement on the enabled tracer, if any.
+
+    Args:
+        name: The span name, such as the tool name.
+        category: The kind of operation, such as "model" or "tool".
+        **attributes: Attributes known when the operation starts.
+
+    Returns:
+        A context manager yielding the span, or a span that discards its
+        attributes while tracing is off.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return nullcontext(_NULL_SPAN)
+    return tracer.span(name, category, **attributes)